@@ -0,0 +1 @@
+"""Benchmarks that run against fake audio devices and a local fake API server."""
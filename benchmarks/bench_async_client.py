@@ -0,0 +1,106 @@
+"""Run many concurrent conversions with the threaded and the asyncio client.
+
+The threaded client needs one thread per conversion in flight; the asyncio
+client runs them all as tasks on one event loop. Also measures how quickly a
+superseded conversion is cancelled.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_async_client --concurrency 32
+"""
+
+import argparse
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter import config
+from voice_converter.api.async_client import AsyncElevenLabsClient
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+
+
+def transport(concurrency):
+    return HttpTransport(max_connections=concurrency)
+
+
+def unlimited():
+    """Scheduler that lets every request through at once, to measure the clients alone"""
+    return RequestScheduler(rate=None, max_concurrent=None)
+
+
+def client_threads():
+    """Threads alive in this process, not counting the fake server's handlers"""
+    return sum("process_request" not in thread.name for thread in threading.enumerate())
+
+
+def run_threaded(server, concurrency):
+    client = ElevenLabsClient(base_url=server.base_url, transport=transport(concurrency), scheduler=unlimited())
+    client.set_api_key("benchmark")
+    peak_threads = client_threads()
+
+    def convert(_):
+        nonlocal peak_threads
+        peak_threads = max(peak_threads, client_threads())
+        return client.convert_speech(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(convert, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed, peak_threads, sum(isinstance(result, bytes) for result in results)
+
+
+async def run_async(server, concurrency):
+    client = AsyncElevenLabsClient(base_url=server.base_url, transport=transport(concurrency), scheduler=unlimited())
+    client.set_api_key("benchmark")
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        client.convert_speech(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    peak_threads = client_threads()
+
+    # Cancel a conversion while it is streaming and time how long that takes
+    first_chunk = asyncio.Event()
+
+    async def consume():
+        async for _ in client.convert_speech_stream(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT):
+            first_chunk.set()
+
+    task = asyncio.ensure_future(consume())
+    await first_chunk.wait()
+    cancel_start = time.perf_counter()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    cancel_time = time.perf_counter() - cancel_start
+
+    await client.aclose()
+    return elapsed, peak_threads, sum(isinstance(result, bytes) for result in results), cancel_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32, help="Conversions in flight at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="Server time to first byte (s)")
+    args = parser.parse_args()
+
+    with FakeSpeechServer(latency=args.latency, chunk_interval=0.01) as server:
+        elapsed, threads, completed = run_threaded(server, args.concurrency)
+        print(f"  threaded: {completed}/{args.concurrency} conversions in {elapsed:.2f} s, "
+              f"{threads} threads")
+
+        elapsed, threads, completed, cancel_time = asyncio.run(run_async(server, args.concurrency))
+        print(f"   asyncio: {completed}/{args.concurrency} conversions in {elapsed:.2f} s, "
+              f"{threads} threads, streaming request cancelled in {cancel_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare threshold calibration methods and check that calibration does not block.
+
+1. Two seconds of background noise with a cough in it: the old calibration
+   (2.5 x the RMS of everything) against the percentile noise floor, scored
+   by the noise each threshold would take for speech and the quiet speech it
+   would still detect.
+2. AudioManager.calibrate() on a fake microphone: time the call takes
+   (the UI thread used to block for the whole capture) and until on_done.
+3. Automatic recalibration while recording, with the background noise
+   getting louder halfway through.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_calibration
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.fakes import FakePyAudio
+from voice_converter import config
+from voice_converter.audio.audio_manager import AudioManager
+from voice_converter.audio.calibration import NoiseFloorEstimator
+from voice_converter.audio.energy import batch_rms
+
+
+def noise(seconds, level, rng):
+    return rng.normal(0, level, int(seconds * config.RATE))
+
+
+def with_cough(samples, at, seconds, rng):
+    start, count = int(at * config.RATE), int(seconds * config.RATE)
+    t = np.arange(count) / config.RATE
+    samples[start:start + count] += 4000 * np.sin(2 * np.pi * 180 * t) * rng.uniform(0.5, 1, count)
+    return samples
+
+
+def to_pcm(samples):
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+def buffer_levels(samples):
+    usable = len(samples) - len(samples) % config.FRAMES_PER_BUFFER
+    return batch_rms(samples[:usable].reshape(-1, config.FRAMES_PER_BUFFER))
+
+
+def compare_methods(rng):
+    recording = to_pcm(with_cough(noise(2.0, 60, rng), at=0.8, seconds=0.3, rng=rng))
+    rms = float(np.sqrt(np.mean(recording.astype(float) ** 2)))
+    old = max(int(rms * 2.5), 150)
+
+    estimator = NoiseFloorEstimator()
+    for level in buffer_levels(recording):
+        estimator.add(level)
+    new = estimator.threshold()
+
+    # Judge both on fresh noise at the same level
+    test_levels = buffer_levels(to_pcm(noise(10.0, 60, rng)))
+    speech_levels = buffer_levels(to_pcm(with_cough(np.zeros(config.RATE), 0, 1.0, rng) * 0.1))
+    for label, threshold in (("RMS x 2.5", old), ("percentile", new)):
+        print(f"{label:>11}: threshold {threshold:4d}, noise taken for speech "
+              f"{np.mean(test_levels >= threshold):.1%}, quiet speech detected {np.mean(speech_levels >= threshold):.1%}")
+
+
+def time_calibration(rng):
+    pa = FakePyAudio(input_audio=to_pcm(noise(3.0, 60, rng)).tobytes())
+    audio_manager = AudioManager(pyaudio_instance=pa)
+    done = threading.Event()
+    result = {}
+
+    def on_done(threshold, stats):
+        result.update(stats, finished=time.perf_counter())
+        done.set()
+
+    start = time.perf_counter()
+    audio_manager.calibrate(on_progress=lambda progress: None, on_done=on_done)
+    returned = time.perf_counter() - start
+    done.wait(timeout=10)
+    print(f"calibrate(): returned after {returned * 1000:.1f} ms, result after "
+          f"{result['finished'] - start:.2f} s: threshold {result['threshold']}, noise p50 {result['p50']:.0f}")
+
+
+def auto_calibration(rng, seconds):
+    half = seconds / 2
+    recording = np.concatenate([noise(half, 60, rng), noise(half, 200, rng)])
+    for at in np.arange(1.0, seconds - 1, 4.0):
+        with_cough(recording, at, 1.0, rng)  # Speech now and then
+    # Faster than real time, but not so fast that the analysis thread drops buffers
+    pa = FakePyAudio(input_audio=to_pcm(recording).tobytes(), speed=20)
+    audio_manager = AudioManager(pyaudio_instance=pa)
+    updates = []
+    audio_manager.start_auto_calibration(
+        on_update=lambda threshold: updates.append((audio_manager.capture.processed, threshold)))
+    audio_manager.start_recording(callback=lambda segment: None)
+    pa.input_streams[-1].finished.wait()
+    audio_manager.stop_recording()
+
+    seconds_per_buffer = config.FRAMES_PER_BUFFER / config.RATE
+    trail = ", ".join(f"{buffers * seconds_per_buffer:.0f} s: {threshold}" for buffers, threshold in updates)
+    print(f"automatic recalibration (noise 60 -> 200 RMS at {half:.0f} s): {trail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seconds", type=float, default=120, help="Length of the recalibration recording")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    compare_methods(rng)
+    time_calibration(rng)
+    auto_calibration(rng, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
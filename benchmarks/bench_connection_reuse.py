@@ -0,0 +1,80 @@
+"""Count the connections and time to first byte of API requests with and without pooling.
+
+Each utterance is one speech-to-speech request. With a fresh HTTP session per
+request every utterance opens a new connection; with the pooled transport all
+of them share the keep-alive connections opened by the warm-up.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_connection_reuse --requests 20
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+
+
+def first_byte_time(client):
+    """Send one conversion and return the seconds until the first chunk"""
+    start = time.perf_counter()
+    chunks = client.convert_speech_stream(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT)
+    elapsed = None
+    for _ in chunks:
+        if elapsed is None:
+            elapsed = time.perf_counter() - start
+    return elapsed
+
+
+def new_client(server):
+    # No rate limit, so only the connection setup shows in the timings
+    client = ElevenLabsClient(base_url=server.base_url, scheduler=RequestScheduler(rate=None))
+    client.set_api_key("benchmark")
+    return client
+
+
+def run_fresh(server, requests):
+    """A new session for every request, as when each request builds its own client"""
+    times = []
+    for _ in range(requests):
+        client = new_client(server)
+        times.append(first_byte_time(client))
+        client.close()
+    return times
+
+
+def run_pooled(server, requests):
+    client = new_client(server)
+    client.warm_up(background=False)
+    times = [first_byte_time(client) for _ in range(requests)]
+    client.close()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.01, help="Server time to first byte (s)")
+    args = parser.parse_args()
+
+    results = {}
+    for label, run in (("fresh session", run_fresh), ("pooled", run_pooled)):
+        with FakeSpeechServer(latency=args.latency, chunk_interval=0) as server:
+            times = run(server, args.requests)
+            results[label] = server.connections
+            print(f"{label:>14}: {server.connections:3d} connections for {server.requests} requests, "
+                  f"first byte median {statistics.median(times) * 1000:.1f} ms, "
+                  f"first request {times[0] * 1000:.1f} ms")
+
+    if results["pooled"] > config.API_MAX_CONNECTIONS:
+        raise SystemExit(f"Pooled transport opened {results['pooled']} connections "
+                         f"(pool size {config.API_MAX_CONNECTIONS})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Convert a set of segments repeatedly with and without the conversion cache.
+
+Every round uploads the same segments (as a looped prompt or a re-run batch
+job would), so after the first round every conversion should come from the
+cache. Reports API requests, wall time and the cache statistics; a second
+cache over the same directory shows the disk store being reused.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_conversion_cache --segments 8 --rounds 5
+"""
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.eval_vad import synthetic_recording
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.transport import HttpTransport
+from voice_converter.audio.encoders import UploadEncoder
+from voice_converter.audio.segment_buffer import SegmentBuffer
+from voice_converter.utils.conversion_cache import ConversionCache
+
+
+def make_segments(count, seconds=2.0):
+    segments = []
+    for seed in range(count):
+        samples, rate, _ = synthetic_recording(rate=config.RATE, seconds=seconds, seed=seed)
+        segments.append(SegmentBuffer.from_frames([samples.tobytes()], sample_rate=rate))
+    return segments
+
+
+def run(server, segments, rounds, cache):
+    client = ElevenLabsClient(base_url=server.base_url, transport=HttpTransport(), cache=cache)
+    client.set_api_key("benchmark")
+    encoder = UploadEncoder()
+    requests_before = server.requests
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for segment in segments:
+            result = client.convert_speech(encoder.encode(segment), output_format=config.STREAM_OUTPUT_FORMAT)
+            assert isinstance(result, bytes) and len(result) == len(server.response_audio)
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed, server.requests - requests_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=8, help="Distinct segments per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Times every segment is converted")
+    parser.add_argument("--latency", type=float, default=0.1, help="Server time to first byte (s)")
+    args = parser.parse_args()
+
+    segments = make_segments(args.segments)
+    conversions = args.segments * args.rounds
+
+    with FakeSpeechServer(latency=args.latency, chunk_interval=0.005) as server, \
+            tempfile.TemporaryDirectory() as directory:
+        elapsed, requests = run(server, segments, args.rounds, cache=None)
+        print(f"   no cache: {conversions} conversions, {requests} API requests, {elapsed:.2f} s")
+
+        cache = ConversionCache(directory)
+        elapsed, requests = run(server, segments, args.rounds, cache)
+        stats = cache.stats()
+        print(f"      cache: {conversions} conversions, {requests} API requests, {elapsed:.2f} s, "
+              f"hit rate {stats['hit_rate']:.0%}, {stats['memory_bytes'] / 1024:.0f} KiB in memory, "
+              f"{stats['disk_bytes'] / 1024:.0f} KiB on disk")
+
+        # A new process would start with an empty memory LRU and find the entries on disk
+        cache = ConversionCache(directory, mmap_threshold=0)
+        elapsed, requests = run(server, segments, 1, cache)
+        stats = cache.stats()
+        print(f"disk reload: {args.segments} conversions, {requests} API requests, {elapsed:.2f} s, "
+              f"{stats['disk_hits']} memory-mapped disk hits")
+
+
+if __name__ == "__main__":
+    main()
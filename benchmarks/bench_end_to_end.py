@@ -0,0 +1,233 @@
+"""Run the whole pipeline on a recording and report latency, drops, CPU and memory.
+
+AudioManager captures from a fake microphone that replays a WAV file (or a
+seeded synthetic recording), VoiceConverter sends the segments through an
+ElevenLabsClient to a fake speech-to-speech server, and the converted audio
+is played on a fake output device. Nothing needs a sound card or network
+access, and the same arguments give the same segments and server behaviour.
+The server runs in a child process so its CPU time is not counted.
+
+Reported:
+
+- end-to-end latency, end of an utterance to its first converted sample played
+- segments detected, played and lost (queue overflow, deadline, API errors)
+- CPU seconds of the client process per second of input audio
+- peak resident memory of the client process
+- longest time spent in the audio callback, and captured buffers dropped
+  because the analysis thread fell behind
+
+--speed replays the input and plays the output faster than real time; the
+server's latency is not scaled, so compare latencies between runs at the same
+speed. --json writes the results for comparison between commits, and the
+--max-* limits make the run exit with status 1 when exceeded, so a CI job can
+catch regressions.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_end_to_end --seconds 30
+    python -m benchmarks.bench_end_to_end --wav speech.wav --speed 4 --max-e2e-p95 0.6 --max-lost 0
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+from benchmarks.eval_vad import synthetic_recording
+from benchmarks.fakes import FakePyAudio, FakeSpeechServer, read_wav
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+from voice_converter.audio.audio_manager import AudioManager
+from voice_converter.utils.latency import LatencyTracer
+from voice_converter.voice_converter import VoiceConverter
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _serve(connection, options):
+    """Child process: run the fake server until the parent asks for its counters"""
+    with FakeSpeechServer(**options) as server:
+        connection.send(server.base_url)
+        connection.recv()
+        connection.send({"requests": server.requests, "rejected": server.rejected})
+
+
+class ServerProcess:
+    """FakeSpeechServer in a child process"""
+
+    def __init__(self, **options):
+        self._connection, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child, options), daemon=True)
+        self.counters = None
+
+    def __enter__(self):
+        self._process.start()
+        self.base_url = self._connection.recv()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._connection.send("stop")
+        self.counters = self._connection.recv()
+        self._process.join(timeout=5)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MiB, None where unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)  # Bytes on macOS, KiB elsewhere
+
+
+def lost_segments(converter):
+    queue_stats = converter.get_queue_stats()
+    api_stats = converter.get_api_stats()
+    return {
+        "queue_dropped": queue_stats["dropped"],
+        "queue_merged": queue_stats["merged"],
+        "deadline": api_stats["stale_dropped"],
+        "api_failed": api_stats["failed"],
+    }
+
+
+def run(args, pcm, base_url):
+    tracer = LatencyTracer()
+    client = ElevenLabsClient(base_url=base_url, transport=HttpTransport(), scheduler=RequestScheduler())
+    client.set_api_key("benchmark")
+    pa = FakePyAudio(real_time=True, input_audio=pcm, speed=args.speed)
+    audio_manager = AudioManager(pyaudio_instance=pa)
+    audio_manager.set_silence_threshold(args.threshold)
+    converter = VoiceConverter(audio_manager, client, max_in_flight=args.in_flight, latency=tracer)
+    converter.voice_id = config.DEFAULT_VOICE_ID
+
+    audio_seconds = len(pcm) / 2 / config.RATE
+    rss_before = peak_rss_mb()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    converter.start_recording()
+    stream = pa.input_streams[-1]
+    stream.finished.wait()
+    audio_manager.stop_recording()
+    segment = audio_manager.segmenter.flush()  # An utterance still open at the end of the file
+    if segment:
+        converter.add_audio_to_queue(segment)
+
+    # Wait until every segment has been played or given up on
+    segments = audio_manager.get_segmentation_stats()["segments"]
+    settle_until = time.monotonic() + args.drain_timeout
+    while time.monotonic() < settle_until:
+        if tracer.completed + sum(lost_segments(converter).values()) >= segments:
+            break
+        time.sleep(0.02)
+    audio_manager.playback.wait_until_drained(timeout=args.drain_timeout)
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    converter.stop_processing()
+    client.close()
+
+    lost = lost_segments(converter)
+    e2e = tracer.stats().get("end_to_end", {})
+    return {
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall,
+        "segments": segments,
+        "played": tracer.completed,
+        "lost": segments - tracer.completed,
+        "lost_reasons": lost,
+        "e2e_p50": e2e.get("p50"),
+        "e2e_p95": e2e.get("p95"),
+        "e2e_p99": e2e.get("p99"),
+        "cpu_per_audio_second": cpu / audio_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": peak_rss_mb() - rss_before if rss_before is not None else None,
+        "callback_max_ms": stream.max_callback_seconds * 1000,
+        "callback_budget_ms": config.FRAMES_PER_BUFFER / config.RATE * 1000,
+        "capture": audio_manager.get_capture_stats(),
+        "latency": tracer.stats(),
+    }
+
+
+def report(results, counters):
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f} ms"
+
+    print(f"{results['audio_seconds']:.1f} s of audio in {results['wall_seconds']:.1f} s, "
+          f"{counters['requests']} API requests ({counters['rejected']} rejected)")
+    reasons = ", ".join(f"{count} {reason}" for reason, count in results["lost_reasons"].items() if count)
+    print(f"segments: {results['segments']} detected, {results['played']} played, {results['lost']} lost"
+          + (f" ({reasons})" if reasons else ""))
+    print(f"end-to-end latency: p50 {ms(results['e2e_p50'])}, p95 {ms(results['e2e_p95'])}, "
+          f"p99 {ms(results['e2e_p99'])}")
+    print(f"CPU: {results['cpu_per_audio_second'] * 1000:.1f} ms per audio second; audio callback max "
+          f"{results['callback_max_ms']:.2f} ms of a {results['callback_budget_ms']:.1f} ms buffer")
+    capture = results["capture"]
+    print(f"capture: {capture['buffers']} buffers, {capture['dropped']} dropped (analysis behind), "
+          f"analysis backlog max {capture['max_backlog']} buffers")
+    if results["peak_rss_mb"] is not None:
+        print(f"memory: peak RSS {results['peak_rss_mb']:.1f} MiB ({results['rss_growth_mb']:+.1f} MiB during the run)")
+
+
+def check_limits(args, results):
+    """Return the limits the results exceed, as messages"""
+    limits = [
+        ("end-to-end p95", args.max_e2e_p95, results["e2e_p95"]),
+        ("lost segments", args.max_lost, results["lost"]),
+        ("CPU per audio second", args.max_cpu, results["cpu_per_audio_second"]),
+        ("peak RSS (MiB)", args.max_rss_mb, results["peak_rss_mb"]),
+    ]
+    return [f"{name} {value:.3f} exceeds {limit}" for name, limit, value in limits
+            if limit is not None and value is not None and value > limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wav", help="16-bit WAV recording to replay (default: a synthetic recording)")
+    parser.add_argument("--seconds", type=float, default=30, help="Length of the synthetic recording")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic recording and the server")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, 0 for as fast as possible (drops buffers the analysis cannot keep up with)")
+    parser.add_argument("--threshold", type=float, default=config.DEFAULT_SILENCE_THRESHOLD)
+    parser.add_argument("--in-flight", type=int, default=config.MAX_IN_FLIGHT_CONVERSIONS)
+    parser.add_argument("--latency", type=float, default=0.2, help="Server time to first byte (s)")
+    parser.add_argument("--chunk-size", type=int, default=4096, help="Bytes per response chunk")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="Delay between chunks (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests the server rejects")
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="Longest wait for playback to finish (s)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--max-e2e-p95", type=float, help="Fail if the p95 end-to-end latency exceeds this (s)")
+    parser.add_argument("--max-lost", type=int, help="Fail if more segments are lost")
+    parser.add_argument("--max-cpu", type=float, help="Fail if CPU seconds per audio second exceed this")
+    parser.add_argument("--max-rss-mb", type=float, help="Fail if peak resident memory exceeds this")
+    args = parser.parse_args()
+
+    if args.wav:
+        pcm = read_wav(args.wav, config.RATE)
+    else:
+        samples, _, _ = synthetic_recording(rate=config.RATE, seconds=args.seconds, seed=args.seed)
+        pcm = samples.tobytes()
+
+    server = ServerProcess(latency=args.latency, chunk_size=args.chunk_size, chunk_interval=args.chunk_interval,
+                           error_rate=args.error_rate, seed=args.seed)
+    with server:
+        results = run(args, pcm, server.base_url)
+    report(results, server.counters)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results, server=server.counters, arguments=vars(args)), f, indent=2)
+
+    failures = check_limits(args, results)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
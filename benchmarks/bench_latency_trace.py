@@ -0,0 +1,88 @@
+"""Trace segments through the whole pipeline and print per-stage latencies.
+
+A synthetic recording is fed to the segmenter in real time, the segments go
+through VoiceConverter to a fake API server and are played on a fake output
+device. Every segment's trace is collected by the converter's LatencyTracer;
+the percentiles of each stage are printed, optionally with the Prometheus
+exposition and the JSONL traces.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_latency_trace --seconds 20 --jsonl traces.jsonl
+"""
+
+import argparse
+import time
+
+from benchmarks.eval_vad import synthetic_recording
+from benchmarks.fakes import FakePyAudio, FakeSpeechServer
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+from voice_converter.audio.audio_manager import AudioManager
+from voice_converter.audio.vad import SpeechSegmenter, create_vad
+from voice_converter.utils.latency import SPANS, LatencyTracer
+from voice_converter.voice_converter import VoiceConverter
+
+
+def run(server, seconds, tracer):
+    client = ElevenLabsClient(base_url=server.base_url, transport=HttpTransport(),
+                              scheduler=RequestScheduler(rate=None, max_concurrent=None))
+    client.set_api_key("benchmark")
+    audio_manager = AudioManager(pyaudio_instance=FakePyAudio(real_time=True))
+    converter = VoiceConverter(audio_manager, client, latency=tracer)
+    converter.voice_id = "benchmark"
+    converter.start_processing()
+
+    samples, rate, _ = synthetic_recording(rate=config.RATE, seconds=seconds)
+    segmenter = SpeechSegmenter(create_vad(config.VAD_ENGINE, rate, config.DEFAULT_SILENCE_THRESHOLD))
+    frame = config.FRAMES_PER_BUFFER
+    start = time.monotonic()
+    for index, offset in enumerate(range(0, len(samples) - frame + 1, frame)):
+        # Deliver buffers at the rate a microphone would
+        time.sleep(max(0.0, start + index * frame / rate - time.monotonic()))
+        segment = segmenter.process(samples[offset:offset + frame].tobytes())
+        if segment:
+            converter.add_audio_to_queue(segment)
+    segment = segmenter.flush()
+    if segment:
+        converter.add_audio_to_queue(segment)
+
+    # Let the last segments convert and play out
+    expected = segmenter.segments
+    waited_until = time.monotonic() + 30
+    while tracer.completed < expected and time.monotonic() < waited_until:
+        time.sleep(0.05)
+    converter.stop_processing()
+    client.close()
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20, help="Length of the synthetic recording")
+    parser.add_argument("--latency", type=float, default=0.2, help="Server time to first byte (s)")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="Delay between chunks (s)")
+    parser.add_argument("--jsonl", help="Append the segment traces to this file")
+    parser.add_argument("--prometheus", action="store_true", help="Also print the Prometheus exposition")
+    args = parser.parse_args()
+
+    tracer = LatencyTracer(jsonl_path=args.jsonl)
+    with FakeSpeechServer(latency=args.latency, chunk_interval=args.chunk_interval) as server:
+        segments = run(server, args.seconds, tracer)
+
+    print(f"{tracer.completed}/{segments} segments traced to the last played sample")
+    stats = tracer.stats()
+    print(f"{'span':>15} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, _, _ in SPANS:
+        if name in stats:
+            span = stats[name]
+            print(f"{name:>15} {span['count']:>6} {span['p50'] * 1000:>8.1f} {span['p95'] * 1000:>8.1f} "
+                  f"{span['p99'] * 1000:>8.1f} {span['max'] * 1000:>8.1f}")
+    if args.prometheus:
+        print(tracer.prometheus_text(), end="")
+
+
+if __name__ == "__main__":
+    main()
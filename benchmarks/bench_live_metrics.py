@@ -0,0 +1,85 @@
+"""Time publishing live meter values on the capture thread while a display reads them.
+
+The capture thread publishes the input level of every buffer; the GUI reads
+a snapshot up to METERS_FPS times a second. Compares LiveMetrics (one
+reference assignment, no lock) with a dict guarded by a lock, with readers
+polling much faster than a display would, so any waiting shows up on the
+publishing side.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_live_metrics --buffers 20000 --readers 2
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from voice_converter import config
+from voice_converter.audio.energy import EnergyMeter
+from voice_converter.utils.metrics import LiveMetrics
+
+
+class LockedMetrics:
+    """The obvious alternative: one dict updated and copied under a lock"""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def publish(self, section, **values):
+        values["time"] = time.monotonic()
+        with self._lock:
+            self._values.setdefault(section, {}).update(values)
+
+    def snapshot(self):
+        with self._lock:
+            return {section: dict(values) for section, values in self._values.items()}
+
+
+def run(metrics, buffers, readers, read_interval):
+    meter = EnergyMeter(config.FRAMES_PER_BUFFER)
+    samples = (np.random.default_rng(0).normal(0, 2000, config.FRAMES_PER_BUFFER)).astype(np.int16)
+    stop = threading.Event()
+    reads = [0] * readers
+
+    def reader(index):
+        while not stop.is_set():
+            snapshot = metrics.snapshot()
+            if "input" in snapshot:
+                reads[index] += 1
+            time.sleep(read_interval)
+
+    threads = [threading.Thread(target=reader, args=(index,)) for index in range(readers)]
+    for thread in threads:
+        thread.start()
+    durations = np.empty(buffers)
+    for index in range(buffers):
+        start = time.perf_counter()
+        metrics.publish("input", rms=meter.rms(samples), peak=meter.peak(samples), speech=False, threshold=300)
+        durations[index] = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return durations, sum(reads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buffers", type=int, default=20000, help="Buffers published")
+    parser.add_argument("--readers", type=int, default=2, help="Threads reading snapshots")
+    parser.add_argument("--read-interval", type=float, default=0.0, help="Pause between reads (s)")
+    args = parser.parse_args()
+
+    budget = config.FRAMES_PER_BUFFER / config.RATE
+    for label, metrics in (("LiveMetrics", LiveMetrics()), ("locked dict", LockedMetrics())):
+        durations, reads = run(metrics, args.buffers, args.readers, args.read_interval)
+        p50, p99 = np.percentile(durations, [50, 99])
+        print(f"{label:>11}: publish p50 {p50 * 1e6:.1f} us, p99 {p99 * 1e6:.1f} us, max {durations.max() * 1e6:.0f} us "
+              f"({durations.max() / budget:.1%} of a buffer), {reads} snapshots read")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Time log calls on the calling thread while the console is slow to write.
+
+Emulates the audio callback logging a message per buffer while stderr is
+blocked (a busy terminal, a paused pipe): print() waits for every write,
+the queued logger only formats and enqueues the record. Also shows repeated
+messages being rate-limited (LOG_REPEAT_INTERVAL, LOG_REPEAT_BURST).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_logging --messages 500 --write-delay 0.002
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from voice_converter import config
+from voice_converter.utils import log
+
+
+class SlowStream:
+    """Text stream whose writes block for a while, like a console that is not keeping up"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        time.sleep(self.delay)
+        self.lines += text.count("\n")
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def timed_calls(call, messages, interval):
+    durations = []
+    for index in range(messages):
+        start = time.perf_counter()
+        call(index)
+        durations.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return durations
+
+
+def report(label, durations, lines):
+    ordered = sorted(durations)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(f"{label:>8}: per call median {statistics.median(durations) * 1e6:.0f} us, "
+          f"p99 {p99 * 1e6:.0f} us, max {max(durations) * 1e6:.0f} us, {lines} lines written")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500, help="Messages logged")
+    parser.add_argument("--interval", type=float, default=0.001, help="Time between messages (s)")
+    parser.add_argument("--write-delay", type=float, default=0.002, help="Time each console write blocks (s)")
+    args = parser.parse_args()
+
+    console = sys.stderr
+    try:
+        stream = SlowStream(args.write_delay)
+        durations = timed_calls(lambda index: print(f"Segment {index} queued", file=stream),
+                                args.messages, args.interval)
+        report("print", durations, stream.lines)
+
+        for label, repeat_interval in (("logger", 0), ("limited", config.LOG_REPEAT_INTERVAL)):
+            config.LOG_REPEAT_INTERVAL = repeat_interval
+            stream = sys.stderr = SlowStream(args.write_delay)
+            logger = log.setup_logging("INFO")
+            durations = timed_calls(lambda index: logger.info("Segment %d queued", index),
+                                    args.messages, args.interval)
+            log.shutdown_logging()  # Waits until the writer has caught up
+            report(label, durations, stream.lines)
+    finally:
+        sys.stderr = console
+
+
+if __name__ == "__main__":
+    main()
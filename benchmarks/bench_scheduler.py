@@ -0,0 +1,81 @@
+"""Send a burst of conversions to a fake API that rejects some of them.
+
+The fake server answers a share of the requests with 429 (or another
+status). Compares a client without retries, which loses those segments,
+with the request scheduler's rate limit and jittered retries, and shows
+segments being dropped instead of retried once they pass their deadline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scheduler --segments 40 --error-rate 0.3
+"""
+
+import argparse
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+
+
+def run(server, segments, concurrency, scheduler, deadline=None):
+    client = ElevenLabsClient(base_url=server.base_url, transport=HttpTransport(max_connections=concurrency),
+                              scheduler=scheduler)
+    client.set_api_key("benchmark")
+
+    def convert(_):
+        start = time.monotonic()
+        result = client.convert_speech(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT,
+                                       deadline=start + deadline if deadline else None)
+        return isinstance(result, bytes), time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(convert, range(segments)))
+    client.close()
+
+    latencies = [elapsed for converted, elapsed in results if converted]
+    return sum(converted for converted, _ in results), latencies
+
+
+def report(label, segments, converted, latencies, scheduler):
+    stats = scheduler.stats()
+    line = f"{label:>16}: {converted}/{segments} converted, {stats['retries']} retries, " \
+           f"{stats['stale_dropped']} dropped as stale"
+    if latencies:
+        line += f", median {statistics.median(latencies) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms"
+    line += f", {stats['credits_used']} credits"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=40, help="Conversions in the burst")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conversions submitted at the same time")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="Share of requests rejected")
+    parser.add_argument("--status", type=int, default=429, help="HTTP status of the rejections")
+    parser.add_argument("--latency", type=float, default=0.1, help="Server time to first byte (s)")
+    parser.add_argument("--deadline", type=float, default=2.0, help="Deadline of the last run (s)")
+    args = parser.parse_args()
+
+    def server():
+        return FakeSpeechServer(latency=args.latency, chunk_interval=0.005, error_rate=args.error_rate,
+                                error_status=args.status, seed=1)
+
+    runs = [
+        ("no retries", RequestScheduler(rate=None, max_concurrent=None, max_retries=0), None),
+        ("scheduler", RequestScheduler(max_concurrent=args.concurrency), None),
+        ("with deadline", RequestScheduler(max_concurrent=args.concurrency), args.deadline),
+    ]
+    for label, scheduler, deadline in runs:
+        with server() as api:
+            converted, latencies = run(api, args.segments, args.concurrency, scheduler, deadline)
+        report(label, args.segments, converted, latencies, scheduler)
+
+
+if __name__ == "__main__":
+    main()
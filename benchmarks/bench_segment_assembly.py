@@ -0,0 +1,109 @@
+"""Measure the memory allocated while assembling, encoding and reading a segment for upload.
+
+Compares the old path (a list of frames joined with b''.join and written
+through the wave module into a BytesIO) with SegmentBuffer, which copies each
+frame once into a preallocated buffer and uploads it as a memoryview. The
+SegmentBuffer path is measured in three steps: assembly, encoding at
+--upload-rate (resampling into a second buffer unless it is the capture
+rate) and reading the whole upload the way the HTTP client does.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_segment_assembly --seconds 5
+
+Exits with an error if assembly or the upload read allocates more than
+--max-extra bytes beyond the buffers themselves.
+"""
+
+import argparse
+import io
+import tracemalloc
+import wave
+
+from benchmarks.eval_vad import synthetic_recording
+from voice_converter import config
+from voice_converter.audio.encoders import UploadEncoder
+from voice_converter.audio.segment_buffer import WAV_HEADER_SIZE, SegmentBuffer
+
+
+def frames_of(pcm, frame_bytes):
+    return [pcm[i:i + frame_bytes] for i in range(0, len(pcm), frame_bytes)]
+
+
+def join_and_wrap(frames):
+    """The previous assembly: list of frames -> joined bytes -> WAV in a BytesIO"""
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as wf:
+        wf.setnchannels(config.CHANNELS)
+        wf.setsampwidth(2)
+        wf.setframerate(config.RATE)
+        wf.writeframes(b''.join(frames))
+    output.seek(0)
+    return output
+
+
+def assemble(frames):
+    segment = SegmentBuffer(config.RATE, config.CHANNELS)
+    for frame in frames:
+        segment.append(frame)
+    return segment
+
+
+def read_upload(upload, chunk_size=65536):
+    """Read the upload in chunks like httpx's multipart encoder, return the bytes read"""
+    total = 0
+    chunk = upload.read(chunk_size)
+    while chunk:
+        total += len(chunk)
+        chunk = upload.read(chunk_size)
+    return total
+
+
+def peak_allocation(func, *args):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of the segment")
+    parser.add_argument("--upload-rate", type=int, default=config.UPLOAD_SAMPLE_RATE,
+                        help="Upload sample rate (default UPLOAD_SAMPLE_RATE; the capture rate skips resampling)")
+    parser.add_argument("--max-extra", type=int, default=16 * 1024,
+                        help="Allowed bytes allocated beyond the segment buffers")
+    args = parser.parse_args()
+
+    samples, rate, _ = synthetic_recording(seconds=args.seconds)
+    frames = frames_of(samples.tobytes(), config.FRAMES_PER_BUFFER * 2)
+    pcm_bytes = sum(len(frame) for frame in frames)
+    encoder = UploadEncoder(sample_rate=args.upload_rate, codec="wav")
+
+    _, old_peak = peak_allocation(join_and_wrap, frames)
+    segment, assembly_peak = peak_allocation(assemble, frames)
+    upload, encode_peak = peak_allocation(encoder.encode, segment)
+    read, read_peak = peak_allocation(read_upload, upload)
+
+    upload_bytes = upload.getbuffer().nbytes
+    assert read == upload_bytes
+    assembly_extra = assembly_peak - (WAV_HEADER_SIZE + segment.capacity)
+    resampled = encoder.sample_rate != config.RATE
+
+    print(f"{args.seconds:.1f} s segment, {len(frames)} frames, {pcm_bytes / 1024:.0f} KiB PCM, "
+          f"{upload_bytes / 1024:.0f} KiB upload at {encoder.sample_rate} Hz")
+    print(f"join + wave:    peak {old_peak / 1024:8.0f} KiB ({old_peak / pcm_bytes:.1f}x the audio)")
+    print(f"SegmentBuffer:  peak {assembly_peak / 1024:8.0f} KiB ({assembly_peak / pcm_bytes:.1f}x the audio, "
+          f"{assembly_extra} bytes beyond the buffer)")
+    print(f"encode:         peak {encode_peak / 1024:8.0f} KiB "
+          f"({'resampled into a new buffer' if resampled else 'header filled in place'})")
+    print(f"upload read:    peak {read_peak / 1024:8.0f} KiB ({read_peak} bytes)")
+
+    for label, extra in (("Assembly", assembly_extra), ("Reading the upload", read_peak)):
+        if extra > args.max_extra:
+            raise SystemExit(f"{label} allocated {extra} bytes beyond the buffers (limit {args.max_extra})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Simulate dragging a slider and count the settings file writes.
+
+A Tk slider calls its command for every step of a drag, and each call used
+to rewrite user_settings.json on the UI thread. Compares writing on every
+set() with the debounced background flush, timing the set() calls.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_settings --seconds 2 --rate 60
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from voice_converter.utils.settings_manager import SettingsManager
+
+
+def drag(settings, seconds, rate, save_every_change):
+    durations = []
+    steps = int(seconds * rate)
+    for step in range(steps):
+        start = time.perf_counter()
+        settings.set("volume", step / steps)
+        if save_every_change:
+            settings.save_settings()  # What set() used to do
+        durations.append(time.perf_counter() - start)
+        time.sleep(1 / rate)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="Length of the drag")
+    parser.add_argument("--rate", type=float, default=60, help="Slider callbacks per second")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, save_every_change in (("every set", True), ("debounced", False)):
+            path = os.path.join(directory, f"{label.replace(' ', '_')}.json")
+            settings = SettingsManager(path)
+            durations = drag(settings, args.seconds, args.rate, save_every_change)
+            settings.flush()
+            print(f"{label:>10}: {len(durations)} changes, {settings.writes} file writes, "
+                  f"set() median {statistics.median(durations) * 1e6:.0f} us, max {max(durations) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Measure the per-callback cost and allocations of silence detection.
+
+Compares the silence check the audio callback used to run (float copy,
+square, mean) with the EnergyMeter kernel the capture path uses now.
+Run from the repository root:
+
+    python -m benchmarks.bench_silence
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from voice_converter.audio.energy import EnergyMeter, batch_rms
+
+
+def previous_is_silence(audio_data, threshold):
+    """The silence check used before EnergyMeter"""
+    audio_array = np.frombuffer(audio_data, dtype=np.int16)
+    if len(audio_array) == 0 or np.all(audio_array == 0):
+        return True
+    amplitude = np.sqrt(np.mean(np.square(audio_array.astype(float))))
+    return amplitude < threshold
+
+
+def allocated_bytes(func, buffers):
+    """Total bytes allocated by calling func on every buffer"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    for buffer in buffers:
+        func(buffer)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buffer-size", type=int, default=1024)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 300, size=(args.calls, args.buffer_size)).astype(np.int16)
+    buffers = [row.tobytes() for row in samples]
+    threshold = 200
+    meter = EnergyMeter(args.buffer_size)
+
+    def new_is_silence(audio_data):
+        return meter.is_silence(np.frombuffer(audio_data, dtype=np.int16), threshold)
+
+    def old_is_silence(audio_data):
+        return previous_is_silence(audio_data, threshold)
+
+    # Both must agree before timing means anything
+    mismatches = sum(old_is_silence(b) != new_is_silence(b) for b in buffers[:1000])
+    if mismatches:
+        raise SystemExit(f"Implementations disagree on {mismatches} buffers")
+
+    for name, func in (("previous", old_is_silence), ("EnergyMeter", new_is_silence)):
+        seconds = timeit.timeit(lambda: [func(b) for b in buffers], number=1)
+        peak = allocated_bytes(func, buffers[:1000])
+        print(f"{name:>12}: {seconds / args.calls * 1e6:.2f} us/callback, "
+              f"peak allocation {peak} bytes over 1000 callbacks")
+
+    seconds = timeit.timeit(lambda: batch_rms(samples), number=1)
+    print(f"{'batch_rms':>12}: {seconds / args.calls * 1e6:.2f} us/buffer for {args.calls} buffers at once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare first-byte-to-first-sample latency of buffered and streaming playback.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_streaming_latency
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+from benchmarks.fakes import FakePyAudio, FakeSpeechServer
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.audio.audio_manager import AudioManager
+from voice_converter import config
+
+
+def timed_chunks(chunks, marks):
+    """Pass chunks through, remembering when the first one arrived"""
+    for chunk in chunks:
+        marks.setdefault("first_byte", time.perf_counter())
+        yield chunk
+
+
+def run_once(client, audio_manager, streaming):
+    marks = {}
+    chunks = timed_chunks(
+        client.convert_speech_stream(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT),
+        marks
+    )
+    if streaming:
+        audio_manager.play_audio_stream(chunks)
+    else:
+        # Previous behaviour: wait for the whole response, then play it
+        audio_manager.play_audio_stream([b"".join(chunks)])
+
+    audio_manager.playback.wait_until_drained(timeout=30)
+    first_sample = next(t for t in audio_manager.p.write_times if t >= marks["first_byte"])
+    return first_sample - marks["first_byte"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="Server time to first byte (s)")
+    parser.add_argument("--chunk-interval", type=float, default=0.05, help="Delay between chunks (s)")
+    args = parser.parse_args()
+
+    with FakeSpeechServer(latency=args.latency, chunk_interval=args.chunk_interval) as server:
+        client = ElevenLabsClient(base_url=server.base_url)
+        client.set_api_key("benchmark")
+        audio_manager = AudioManager(pyaudio_instance=FakePyAudio())
+
+        for streaming in (False, True):
+            results = [run_once(client, audio_manager, streaming) for _ in range(args.runs)]
+            label = "streaming" if streaming else "buffered"
+            print(f"{label:>10}: first byte -> first sample "
+                  f"median {statistics.median(results) * 1000:.1f} ms, "
+                  f"max {max(results) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
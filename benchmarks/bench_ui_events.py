@@ -0,0 +1,130 @@
+"""Compare handing worker status updates to the UI per message and through UIEventBridge.
+
+Worker threads post status messages in bursts (as the conversion pipeline
+does when many segments fail at once) to a stand-in for the Tk mainloop
+whose widget updates take --update-cost seconds each. With root.after(0, ...)
+per message the UI thread redraws every message and falls behind; the
+bridge applies only the latest message per field once per tick. Reported:
+widget updates, UI thread time spent on them, how long the latest message
+took to appear, and the time post() blocks the worker.
+
+Needs no display. Run from the repository root:
+
+    python -m benchmarks.bench_ui_events --messages 2000 --update-cost 0.001
+"""
+
+import argparse
+import heapq
+import itertools
+import statistics
+import threading
+import time
+
+from voice_converter import config
+from voice_converter.gui.event_bridge import UIEventBridge
+
+
+class FakeRoot:
+    """Single-threaded after() timer loop like Tk's mainloop"""
+
+    def __init__(self):
+        self._timers = []
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.running = True
+
+    def after(self, ms, callback, *args):
+        timer_id = next(self._ids)
+        with self._lock:
+            heapq.heappush(self._timers, (time.perf_counter() + ms / 1000, timer_id, callback, args))
+        return timer_id
+
+    def after_cancel(self, timer_id):
+        with self._lock:
+            self._timers = [timer for timer in self._timers if timer[1] != timer_id]
+            heapq.heapify(self._timers)
+
+    def mainloop(self, until):
+        while self.running and not until():
+            with self._lock:
+                due = self._timers and self._timers[0][0] <= time.perf_counter()
+                timer = heapq.heappop(self._timers) if due else None
+            if timer:
+                timer[2](*timer[3])
+            else:
+                time.sleep(0.0005)
+
+
+class StatusBar:
+    """Status line whose update costs a fixed time on the UI thread"""
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.message = None
+        self.updates = 0
+        self.busy = 0.0
+        self.shown_at = {}
+
+    def set_status(self, message):
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.cost:
+            pass  # Layout and redraw
+        self.message = message
+        self.updates += 1
+        self.busy += time.perf_counter() - start
+        self.shown_at[message] = time.perf_counter()
+
+
+def run(label, post, status_bar, root, args):
+    post_times = []
+    sent = []  # (message, time posted), in posting order
+
+    def worker(index):
+        for number in range(args.messages // args.workers):
+            message = (index, number)
+            start = time.perf_counter()
+            post(message)
+            post_times.append(time.perf_counter() - start)
+            sent.append((message, start))
+            if number % args.burst == args.burst - 1:
+                time.sleep(args.pause)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(args.workers)]
+    for thread in workers:
+        thread.start()
+    root.mainloop(until=lambda: not any(thread.is_alive() for thread in workers) and status_bar.message == sent[-1][0])
+    for thread in workers:
+        thread.join()
+
+    last, posted_at = sent[-1]
+    print(f"{label:>11}: {status_bar.updates:5d} widget updates, UI busy {status_bar.busy:.2f} s, "
+          f"last message shown after {(status_bar.shown_at[last] - posted_at) * 1000:.0f} ms, "
+          f"post() median {statistics.median(post_times) * 1e6:.1f} us, max {max(post_times) * 1e6:.0f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000, help="Status messages posted in total")
+    parser.add_argument("--workers", type=int, default=4, help="Threads posting messages")
+    parser.add_argument("--burst", type=int, default=50, help="Messages per burst")
+    parser.add_argument("--pause", type=float, default=0.01, help="Pause between bursts (s)")
+    parser.add_argument("--update-cost", type=float, default=0.001, help="UI thread time per status update (s)")
+    args = parser.parse_args()
+
+    root = FakeRoot()
+    status_bar = StatusBar(args.update_cost)
+    run("root.after", lambda message: root.after(0, status_bar.set_status, message), status_bar, root, args)
+
+    root = FakeRoot()
+    status_bar = StatusBar(args.update_cost)
+    bridge = UIEventBridge(root)
+    bridge.start()
+    run("bridge", lambda message: bridge.post("status", status_bar.set_status, message), status_bar, root, args)
+    bridge.stop()
+    stats = bridge.stats()
+    print(f"{'':>11}  {stats['posted']} posted, {stats['coalesced']} replaced before they were shown "
+          f"(tick every {config.UI_UPDATE_INTERVAL_MS} ms)")
+
+
+if __name__ == "__main__":
+    main()
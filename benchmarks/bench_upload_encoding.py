@@ -0,0 +1,52 @@
+"""Compare upload size and encode time of the upload encoder options.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_upload_encoding --seconds 5
+"""
+
+import argparse
+import time
+
+from benchmarks.eval_vad import synthetic_recording
+from voice_converter import config
+from voice_converter.audio.encoders import UploadEncoder, available_codecs
+
+OPTIONS = [
+    ("wav", None),
+    ("wav", 22050),
+    ("wav", 16000),
+    ("flac", 22050),
+    ("flac", 16000),
+    ("opus", 16000),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of the encoded segment")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples, rate, _ = synthetic_recording(seconds=args.seconds)
+    pcm = samples.tobytes()
+    codecs = available_codecs()
+
+    print(f"{args.seconds:.1f} s segment captured at {rate} Hz")
+    for codec, sample_rate in OPTIONS:
+        label = f"{codec} @ {sample_rate or config.RATE} Hz"
+        if codec not in codecs:
+            print(f"{label:>20}: not available (install soundfile)")
+            continue
+
+        encoder = UploadEncoder(rate, sample_rate, codec)
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            size = len(encoder.encode(pcm).getbuffer())
+        encode_ms = (time.perf_counter() - started) / args.runs * 1000
+        print(f"{label:>20}: {size / 1024:8.1f} KiB on the wire "
+              f"({size / args.seconds / 1024:5.1f} KiB/s), encode {encode_ms:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Time until the voice list is available at startup, with and without the disk cache.
+
+Simulates three application starts against the fake API: a first start with
+no cache (the list has to be fetched), a start within the cache TTL (no
+request at all) and a start after the TTL (shown from the cache, then
+checked with a conditional request that is answered with 304).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_voice_catalog --latency 0.3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.transport import HttpTransport
+from voice_converter.api.voice_catalog import VoiceCatalogCache
+
+
+def start(server, cache_path, ttl):
+    """Return (seconds until voices can be shown, seconds until they are up to date, changed)"""
+    client = ElevenLabsClient(base_url=server.base_url, transport=HttpTransport(),
+                              voice_cache=VoiceCatalogCache(cache_path, ttl))
+    client.set_api_key("benchmark")
+
+    begin = time.perf_counter()
+    shown = None
+    if client.cached_voices():
+        shown = time.perf_counter() - begin
+    catalog, changed = client.refresh_voices()
+    current = time.perf_counter() - begin
+    client.close()
+    assert len(catalog) == len(server.voices)
+    return shown if shown is not None else current, current, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="Server response time (s)")
+    parser.add_argument("--voices", type=int, default=200, help="Voices in the account")
+    args = parser.parse_args()
+
+    voices = [(f"Voice {i}", f"voice{i:06d}") for i in range(args.voices)]
+    with FakeSpeechServer(latency=args.latency, voices=voices) as server, \
+            tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, "voice_cache.json")
+        for label, ttl in (("cold start", 3600), ("within TTL", 3600), ("TTL expired", 0)):
+            requests = server.voice_requests
+            shown, current, changed = start(server, cache_path, ttl)
+            print(f"{label:>12}: voices shown after {shown * 1000:6.1f} ms, up to date after "
+                  f"{current * 1000:6.1f} ms, {server.voice_requests - requests} requests, "
+                  f"{'changed' if changed else 'unchanged'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Run every VAD engine over WAV files and compare the segments they produce.
+
+Run from the repository root with WAV files or directories of WAV files:
+
+    python -m benchmarks.eval_vad recordings/ --threshold 200
+
+Without arguments a synthetic recording (harmonic bursts in background noise)
+is used. Fewer seconds sent means fewer API seconds and credits; the
+"speech kept" column shows how much of the labelled speech a segment
+covers when the synthetic signal is used.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+import wave
+
+import numpy as np
+
+from voice_converter import config
+from voice_converter.audio.vad import ENGINES, SpeechSegmenter, create_vad
+
+
+def read_wav(path):
+    """Return (int16 mono samples, sample rate) of a 16-bit WAV file"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit WAV files are supported")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        channels = wf.getnchannels()
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return samples, wf.getframerate()
+
+
+def synthetic_recording(rate=config.RATE, seconds=30, seed=0):
+    """Speech-like harmonic bursts in noise, with a mask of where the bursts are"""
+    rng = np.random.default_rng(seed)
+    count = int(seconds * rate)
+    signal = rng.normal(0, 60, count)
+    mask = np.zeros(count, dtype=bool)
+
+    position = int(rate * 0.5)
+    while position < count - rate:
+        length = int(rng.uniform(0.3, 3.0) * rate)
+        t = np.arange(length) / rate
+        # Syllable-rate modulation with short fades at the burst edges
+        envelope = 0.4 + 0.6 * np.abs(np.sin(np.pi * t * rng.uniform(2, 5)))
+        envelope *= np.minimum(1.0, np.minimum(t, t[::-1]) / 0.01)
+        # Voiced speech: a fundamental with decaying harmonics reaching into the speech band
+        fundamental = rng.uniform(100, 250)
+        burst = sum(np.sin(2 * np.pi * fundamental * k * t) / k for k in range(1, 16))
+        burst *= 1500 * envelope
+        end = min(count, position + length)
+        signal[position:end] += burst[:end - position]
+        mask[position:end] = True
+        position = end + int(rng.uniform(0.2, 2.0) * rate)
+
+    return np.clip(signal, -32768, 32767).astype(np.int16), rate, mask
+
+
+def evaluate(engine, samples, rate, threshold, mask=None):
+    """Segment samples with one engine and summarise the result"""
+    buffer_size = config.FRAMES_PER_BUFFER
+    segmenter = SpeechSegmenter(create_vad(engine, rate, threshold), frames_per_buffer=buffer_size)
+
+    segments = []  # (start sample, length in samples)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for offset in range(0, len(samples) - buffer_size + 1, buffer_size):
+            trimmed = segmenter.samples_trimmed
+            segment = segmenter.process(samples[offset:offset + buffer_size].tobytes())
+            if segment:
+                # The segment ends before the trimmed tail and any audio already carried over
+                pending = segmenter.pending_bytes() // 2
+                end = offset + buffer_size - (segmenter.samples_trimmed - trimmed) - pending
+                length = len(segment) // 2
+                segments.append((end - length, length))
+
+        processed = len(samples) - len(samples) % buffer_size
+        trimmed = segmenter.samples_trimmed
+        segment = segmenter.flush()
+        if segment:
+            length = len(segment) // 2
+            end = processed - (segmenter.samples_trimmed - trimmed)
+            segments.append((end - length, length))
+    elapsed = time.perf_counter() - started
+
+    lengths = [length / rate for _, length in segments]
+    result = {
+        "segments": len(segments),
+        "sent_seconds": sum(lengths),
+        "mean_seconds": sum(lengths) / len(lengths) if lengths else 0.0,
+        "cpu_per_audio_second": elapsed / (len(samples) / rate),
+    }
+    if mask is not None:
+        covered = np.zeros(len(samples), dtype=bool)
+        for start, length in segments:
+            covered[start:start + length] = True
+        result["speech_kept"] = (covered & mask).sum() / max(1, mask.sum())
+    return result
+
+
+def collect_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(".wav"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="WAV files or directories")
+    parser.add_argument("--threshold", type=float, default=config.DEFAULT_SILENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.paths:
+        recordings = [(path, *read_wav(path), None) for path in collect_files(args.paths)]
+    else:
+        recordings = [("synthetic", *synthetic_recording())]
+
+    for name, samples, rate, mask in recordings:
+        print(f"{name}: {len(samples) / rate:.1f} s at {rate} Hz")
+        for engine in ENGINES:
+            result = evaluate(engine, samples, rate, args.threshold, mask)
+            line = (f"  {engine:>10}: {result['segments']:3d} segments, "
+                    f"{result['sent_seconds']:6.1f} s sent, "
+                    f"mean {result['mean_seconds']:4.2f} s, "
+                    f"{result['cpu_per_audio_second'] * 1000:.2f} ms CPU per audio second")
+            if "speech_kept" in result:
+                line += f", speech kept {result['speech_kept'] * 100:.1f}%"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""Fake audio devices and a fake ElevenLabs API server for benchmarks.
+
+Nothing in here needs a sound card or network access, so the benchmarks can
+run headless and give repeatable numbers.
+"""
+
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class FakeOutputStream:
+    """Output stream that records when samples were written
+
+    With real_time, writes block for as long as the samples take to play,
+    divided by speed.
+    """
+
+    def __init__(self, rate, real_time=False, write_times=None, speed=1.0):
+        self.rate = rate
+        self.real_time = real_time
+        self.speed = speed
+        self.write_times = write_times if write_times is not None else []
+        self.opened_at = time.perf_counter()
+        self.first_write_at = None
+        self.last_write_at = None
+        self.bytes_written = 0
+        self.closed = False
+
+    def write(self, data):
+        now = time.perf_counter()
+        if self.first_write_at is None:
+            self.first_write_at = now
+        self.last_write_at = now
+        self.write_times.append(now)
+        self.bytes_written += len(data)
+        if self.real_time:
+            time.sleep(len(data) / 2 / self.rate / self.speed)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeInputStream:
+    """Input stream that replays recorded PCM to a stream callback, like PortAudio
+
+    The callback is called on a thread of its own with one buffer at a time,
+    paced like a microphone (speed 1), faster (speed > 1) or as fast as the
+    callback returns (speed 0). Without a callback the stream is read in
+    blocking mode with read(). The end of the recording is padded with
+    silence to a whole buffer.
+    """
+
+    def __init__(self, pcm, rate, frames_per_buffer, stream_callback, speed=1.0):
+        self.pcm = pcm
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.callback = stream_callback
+        self.speed = speed
+        self.buffers = 0
+        self.callback_seconds = 0.0  # Time spent inside the callback
+        self.max_callback_seconds = 0.0
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._position = 0
+        self._thread = None
+        if stream_callback is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def read(self, frames, exception_on_overflow=True):
+        data = self.pcm[self._position:self._position + frames * 2]
+        self._position += frames * 2
+        if self.speed:
+            time.sleep(frames / self.rate / self.speed)
+        return data + bytes(frames * 2 - len(data))
+
+    def _run(self):
+        try:
+            self._replay()
+        finally:
+            self.finished.set()
+
+    def _replay(self):
+        buffer_bytes = self.frames_per_buffer * 2
+        start = time.perf_counter()
+        for index, offset in enumerate(range(0, len(self.pcm), buffer_bytes)):
+            if self._stop.is_set():
+                break
+            if self.speed:
+                delay = start + (index + 1) * self.frames_per_buffer / self.rate / self.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            data = self.pcm[offset:offset + buffer_bytes]
+            if len(data) < buffer_bytes:
+                data += bytes(buffer_bytes - len(data))
+            began = time.perf_counter()
+            self.callback(data, self.frames_per_buffer, {}, 0)
+            elapsed = time.perf_counter() - began
+            self.callback_seconds += elapsed
+            self.max_callback_seconds = max(self.max_callback_seconds, elapsed)
+            self.buffers += 1
+
+    def is_active(self):
+        return not self.finished.is_set()
+
+    def stop_stream(self):
+        self._stop.set()
+        if self._thread and threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def close(self):
+        self.stop_stream()
+
+
+def read_wav(path, rate):
+    """Read a 16-bit WAV file as mono PCM bytes at rate, for FakePyAudio(input_audio=...)"""
+    from voice_converter.audio.encoders import resample_poly
+    from voice_converter.batch import read_audio
+
+    samples, file_rate = read_audio(path)
+    if file_rate != rate:
+        divisor = math.gcd(rate, file_rate)
+        samples = resample_poly(samples, rate // divisor, file_rate // divisor)
+    return np.ascontiguousarray(samples, dtype=np.int16).tobytes()
+
+
+class FakePyAudio:
+    """Minimal stand-in for pyaudio.PyAudio with one input and one output device
+
+    Args:
+        real_time: Output writes block for as long as the audio plays
+        input_audio: 16-bit mono PCM the input device replays, silence if None
+        speed: Pace of input and real-time output relative to real time, 0 for
+            input as fast as it is consumed
+    """
+
+    def __init__(self, real_time=False, input_audio=None, speed=1.0):
+        self.real_time = real_time
+        self.input_audio = input_audio
+        self.speed = speed
+        self.output_streams = []
+        self.input_streams = []
+        self.write_times = []  # Time of every write to any output stream
+
+    def get_host_api_info_by_index(self, index):
+        return {'deviceCount': 2}
+
+    def get_device_info_by_index(self, index):
+        if index == 0:
+            return {'name': 'Fake Microphone', 'maxInputChannels': 1, 'maxOutputChannels': 0}
+        return {'name': 'Fake Speakers', 'maxInputChannels': 0, 'maxOutputChannels': 2}
+
+    def get_sample_size(self, sample_format):
+        return 2
+
+    def get_format_from_width(self, width):
+        return width
+
+    def open(self, rate=44100, output=False, input=False, frames_per_buffer=1024, stream_callback=None, **kwargs):
+        if input:
+            pcm = self.input_audio if self.input_audio is not None else bytes(rate * 2)
+            stream = FakeInputStream(pcm, rate, frames_per_buffer, stream_callback, speed=self.speed)
+            self.input_streams.append(stream)
+            return stream
+        stream = FakeOutputStream(rate, real_time=self.real_time, write_times=self.write_times,
+                                  speed=self.speed or 1.0)
+        if output:
+            self.output_streams.append(stream)
+        return stream
+
+    def terminate(self):
+        pass
+
+
+def sine_pcm(seconds, rate=22050, frequency=220.0, amplitude=8000):
+    """Generate 16-bit mono PCM of a sine tone"""
+    count = int(seconds * rate)
+    samples = (int(amplitude * math.sin(2 * math.pi * frequency * i / rate)) for i in range(count))
+    return struct.pack(f"<{count}h", *samples)
+
+
+class _SpeechHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        if "chunked" in self.headers.get("Transfer-Encoding", ""):
+            body = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_HEAD(self):
+        # Cheap request used to warm up connections
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        if self.path.split("?")[0] != "/v1/voices":
+            self.send_error(404)
+            return
+
+        server.voice_requests += 1
+        time.sleep(server.latency)
+        etag = f'"{len(server.voices)}-{hash(tuple(server.voices)) & 0xffffffff:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps({"voices": [{"name": name, "voice_id": voice_id}
+                                      for name, voice_id in server.voices]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        self._read_body()
+        server.requests += 1
+
+        if not re.match(r"^/v1/speech-to-speech/[^/]+/stream", self.path):
+            self.send_error(404)
+            return
+
+        time.sleep(server.latency)
+        with server.lock:
+            fail = server.random.random() < server.error_rate
+        if fail:
+            server.rejected += 1
+            body = json.dumps({"detail": {"status": "too_many_concurrent_requests",
+                                          "message": "Injected failure"}}).encode()
+            self.send_response(server.error_status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if server.retry_after is not None:
+                self.send_header("Retry-After", str(server.retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Character-Cost", str(server.credit_cost))
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        audio = server.response_audio
+        try:
+            for offset in range(0, len(audio), server.chunk_size):
+                chunk = audio[offset:offset + server.chunk_size]
+                self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+                self.wfile.flush()
+                time.sleep(server.chunk_interval)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the request
+            server.aborted += 1
+            self.close_connection = True
+
+
+class FakeSpeechServer(ThreadingHTTPServer):
+    """Local HTTP server that imitates the speech-to-speech streaming endpoint
+
+    Args:
+        latency: Seconds to wait before sending the response headers
+        chunk_size: Bytes per response chunk
+        chunk_interval: Seconds to wait between chunks
+        response_audio: Bytes to return, defaults to 2 s of 22.05 kHz PCM
+        voices: (name, voice_id) pairs listed by GET /v1/voices
+        error_rate: Fraction of conversion requests answered with error_status instead
+        error_status: HTTP status of the injected failures (429, 503, ...)
+        retry_after: Retry-After seconds sent with injected failures, None for none
+        seed: Seed of the failure injection, so runs are repeatable
+    """
+
+    daemon_threads = True
+    request_queue_size = 128  # Many clients connect at once in the concurrency benchmarks
+
+    def __init__(self, latency=0.2, chunk_size=4096, chunk_interval=0.05, response_audio=None, voices=None,
+                 error_rate=0.0, error_status=429, retry_after=None, seed=0):
+        super().__init__(("127.0.0.1", 0), _SpeechHandler)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_interval = chunk_interval
+        self.response_audio = response_audio if response_audio is not None else sine_pcm(2.0)
+        self.voices = voices if voices is not None else [(f"Voice {i}", f"voice{i:04d}") for i in range(40)]
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.credit_cost = 100  # Reported in the Character-Cost header of every conversion
+        self.requests = 0
+        self.rejected = 0  # Requests answered with an injected failure
+        self.voice_requests = 0  # GET /v1/voices, including ones answered with 304
+        self.connections = 0  # TCP connections accepted
+        self.aborted = 0  # Responses the client stopped reading
+        self._thread = None
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,166 @@
+"""Load generator for the headless conversion server.
+
+Starts the fake API server and a conversion server process, then runs rounds
+of concurrent WebSocket sessions that stream synthetic speech in real time.
+For each round it reports converted segments, refused sessions, the server's
+CPU time and the number of real-time sessions one core could sustain.
+
+Run from the repository root (needs the websockets package):
+
+    python -m benchmarks.load_server --sessions 10,50,100 --seconds 10
+
+Pass --url to load an already running server instead; CPU is then not measured.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus
+
+from benchmarks.eval_vad import synthetic_recording
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter import config
+
+FRAME_MS = 20  # Audio sent per message
+RECORDINGS = 16  # Distinct synthetic recordings shared by the sessions
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_cpu_seconds(pid):
+    """User + system CPU time of a process (Linux), None if unavailable"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def start_server(api_url, port, max_sessions):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "voice_converter.server", "--port", str(port),
+         "--base-url", api_url, "--api-key", "benchmark", "--max-sessions", str(max_sessions)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("Conversion server did not start")
+
+
+async def run_session(url, pcm, rate, results):
+    """Stream pcm in real time, then end the session and wait for the remaining audio"""
+    frame_bytes = int(rate * FRAME_MS / 1000) * 2
+    stats = {"segments": 0, "bytes": 0}
+    try:
+        async with connect(f"{url}?sample_rate={rate}", max_size=None, compression=None) as ws:
+            await ws.recv()  # ready
+
+            async def receive():
+                async for message in ws:
+                    if isinstance(message, bytes):
+                        stats["bytes"] += len(message)
+                        continue
+                    event = json.loads(message)
+                    if event["type"] == "audio_start":
+                        stats["segments"] += 1
+                    elif event["type"] == "done":
+                        return
+
+            receiver = asyncio.ensure_future(receive())
+            start = time.perf_counter()
+            for index, offset in enumerate(range(0, len(pcm), frame_bytes)):
+                await ws.send(pcm[offset:offset + frame_bytes])
+                # Keep to real time
+                await asyncio.sleep(max(0.0, start + (index + 1) * FRAME_MS / 1000 - time.perf_counter()))
+            # The last utterance is converted after "end", so this is the tail latency
+            ended = time.perf_counter()
+            await ws.send(json.dumps({"type": "end"}))
+            await receiver
+            results["tail"].append(time.perf_counter() - ended)
+        results["completed"] += 1
+    except InvalidStatus:
+        results["refused"] += 1
+    except Exception as e:
+        results["failed"] += 1
+        print(f"Session failed: {e!r}")
+    results["segments"] += stats["segments"]
+
+
+async def run_round(url, sessions, recordings, rate):
+    results = {"completed": 0, "refused": 0, "failed": 0, "segments": 0, "tail": []}
+    await asyncio.gather(*(
+        run_session(url, recordings[index % len(recordings)], rate, results) for index in range(sessions)
+    ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="10,50,100", help="Comma-separated concurrent session counts")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Audio streamed per session")
+    parser.add_argument("--rate", type=int, default=16000, help="Sample rate of the streamed PCM")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake API time to first byte (s)")
+    parser.add_argument("--max-sessions", type=int, default=config.SERVER_MAX_SESSIONS)
+    parser.add_argument("--url", help="WebSocket session URL of a running server")
+    args = parser.parse_args()
+
+    # Different recordings so the sessions don't all pause at the same moment
+    recordings = [synthetic_recording(rate=args.rate, seconds=args.seconds, seed=seed)[0].tobytes()
+                  for seed in range(RECORDINGS)]
+    rate = args.rate
+
+    with FakeSpeechServer(latency=args.latency, chunk_interval=0.02) as api:
+        process = None
+        url = args.url
+        if url is None:
+            port = free_port()
+            process = start_server(api.base_url, port, args.max_sessions)
+            url = f"ws://127.0.0.1:{port}/v1/session"
+
+        try:
+            for sessions in (int(count) for count in args.sessions.split(",")):
+                cpu_before = process_cpu_seconds(process.pid) if process else None
+                wall_start = time.perf_counter()
+                results = asyncio.run(run_round(url, sessions, recordings, rate))
+                wall = time.perf_counter() - wall_start
+                cpu_after = process_cpu_seconds(process.pid) if process else None
+
+                line = (f"{sessions:4d} sessions: {results['completed']} completed, {results['refused']} refused, "
+                        f"{results['failed']} failed, {results['segments']} segments converted")
+                if results["tail"]:
+                    line += f", end -> done median {statistics.median(results['tail']) * 1000:.0f} ms"
+                if cpu_before is not None and cpu_after is not None:
+                    cpu = cpu_after - cpu_before
+                    load = cpu / wall
+                    line += f", server CPU {cpu:.2f} s ({load * 100:.0f}% of a core)"
+                    if load > 0:
+                        line += f", ~{results['completed'] / load:.0f} real-time sessions per core"
+                print(line)
+        finally:
+            if process:
+                process.terminate()
+                process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
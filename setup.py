@@ -9,15 +9,23 @@
 setup(
     name="voice-converter",
     version="1.0.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "elevenlabs",
+        "httpx",
         "pyaudio",
         "numpy",
     ],
+    extras_require={
+        "decoding": ["miniaudio"],
+        "encoding": ["soundfile"],
+        "http2": ["httpx[http2]"],
+        "server": ["websockets>=13"],
+    },
     entry_points={
         'console_scripts': [
             'voice-converter=voice_converter.main:main',
+            'voice-converter-server=voice_converter.server:main',
         ],
     },
     author="pronicx",
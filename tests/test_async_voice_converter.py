@@ -0,0 +1,145 @@
+import asyncio
+
+import numpy as np
+
+from voice_converter.async_voice_converter import AsyncVoiceConverter, _AsyncJob
+from voice_converter.audio.segment_buffer import SegmentBuffer
+
+
+class FakeAudio:
+    """Audio sink that counts the segments played"""
+
+    def __init__(self):
+        self.played = []
+
+    def record_to_file(self, segment):
+        return bytes(segment.pcm())
+
+    async def play_audio_stream_async(self, chunks, sample_rate=None, trace=None):
+        received = [chunk async for chunk in chunks]
+        self.played.append(received)
+        if trace:
+            trace.mark("first_played")
+            trace.mark("last_played")
+        return bool(received)
+
+
+class FakeApiClient:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.requests = 0
+
+    async def convert_speech_stream(self, audio_data, voice_id, language_code, output_format, deadline=None):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        yield voice_id.encode()
+
+
+def segment():
+    return SegmentBuffer.from_frames([np.ones(1024, dtype=np.int16).tobytes()])
+
+
+def make_converter(max_in_flight=2):
+    audio = FakeAudio()
+    converter = AsyncVoiceConverter(audio, FakeApiClient(), max_in_flight=max_in_flight)
+    converter.voice_id = "voice-a"
+    return converter, audio
+
+
+async def wait_until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def all_slots_free(converter):
+    """Return True if no in-flight slot was lost
+
+    The dispatcher holds one slot while it waits for the next segment, so
+    all but one can be taken (and are given back).
+    """
+    taken = 0
+    try:
+        for _ in range(converter.max_in_flight):
+            await asyncio.wait_for(converter._in_flight.acquire(), timeout=0.5)
+            taken += 1
+    except asyncio.TimeoutError:
+        pass
+    for _ in range(taken):
+        converter._in_flight.release()
+    return taken == converter.max_in_flight - 1
+
+
+def test_cancelling_an_unstarted_conversion_frees_its_slot():
+    converter, _ = make_converter()
+
+    async def scenario():
+        runner = asyncio.ensure_future(converter.run())
+        await asyncio.sleep(0)
+        for seq in range(converter.max_in_flight * 3):
+            await converter._in_flight.acquire()
+            job = _AsyncJob(seq, segment())
+            converter._start_conversion(job, acquired=True)
+            converter._cancel_job(job)  # Before the task ever ran
+            await asyncio.sleep(0.01)
+            assert job.chunks.get_nowait() is None
+        free = await all_slots_free(converter)
+        converting = len(converter._converting)
+        converter.stop()
+        await runner
+        return free, converting
+
+    free, converting = asyncio.run(scenario())
+    assert free
+    assert converting == 0
+
+
+def test_voice_changes_and_cancels_do_not_stall_the_pipeline():
+    converter, audio = make_converter()
+
+    async def scenario():
+        runner = asyncio.ensure_future(converter.run())
+        await asyncio.sleep(0)
+        for index in range(10):
+            converter.add_audio_to_queue(segment())
+            # Right after the segment arrives, before its conversion had a chance to start
+            converter.set_voice("voice-b" if index % 2 else "voice-a")
+            if index % 3 == 0:
+                converter.cancel_pending()
+            await asyncio.sleep(0)
+
+        converter.add_audio_to_queue(segment())
+        await wait_until(converter.idle)
+        free = await all_slots_free(converter)
+        converting = len(converter._converting)
+        converter.stop()
+        await runner
+        return free, converting
+
+    free, converting = asyncio.run(scenario())
+    assert free
+    assert converting == 0
+    assert audio.played  # The segment after the cancels still got through
+
+
+def test_voice_change_reconverts_the_head_segment_until_it_plays():
+    converter, audio = make_converter()
+    converter.api_client.delay = 0.2
+
+    async def scenario():
+        runner = asyncio.ensure_future(converter.run())
+        await asyncio.sleep(0)
+        converter.add_audio_to_queue(segment())
+        # The segment reaches the player while its conversion is still running
+        await wait_until(lambda: converter._playing is not None)
+        converter.set_voice("voice-b")
+        await asyncio.sleep(0)
+        converter.add_audio_to_queue(segment())
+        await wait_until(lambda: len(audio.played) == 2)
+        await wait_until(converter.idle)
+        converter.stop()
+        await runner
+
+    asyncio.run(scenario())
+    assert audio.played == [[b"voice-b"], [b"voice-b"]]
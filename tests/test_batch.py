@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from voice_converter.batch import find_audio_files, output_paths
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+
+def test_outputs_mirror_the_input_directories(tmp_path):
+    touch(tmp_path / "in" / "a" / "take1.mp3")
+    touch(tmp_path / "in" / "b" / "take1.wav")
+    touch(tmp_path / "single" / "take2.wav")
+
+    files = output_paths(find_audio_files([str(tmp_path / "in"), str(tmp_path / "single" / "take2.wav")]), "out")
+
+    assert sorted(output for _, output in files) == [
+        os.path.join("out", "a", "take1.wav"),
+        os.path.join("out", "b", "take1.wav"),
+        os.path.join("out", "take2.wav"),
+    ]
+
+
+def test_inputs_sharing_an_output_are_refused(tmp_path):
+    touch(tmp_path / "in" / "take1.mp3")
+    touch(tmp_path / "in" / "take1.wav")
+
+    with pytest.raises(ValueError, match="take1.wav"):
+        output_paths(find_audio_files([str(tmp_path / "in")]), "out")
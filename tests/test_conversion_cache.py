@@ -0,0 +1,52 @@
+import os
+import threading
+
+from voice_converter import config
+from voice_converter.utils.conversion_cache import ConversionCache, cache_key, create_cache
+
+
+def test_live_conversion_is_not_cached_by_default():
+    assert create_cache() is None
+    assert create_cache(enabled=False) is None
+    assert config.BATCH_CACHE_ENABLED
+
+
+def test_disk_entries_survive_a_restart(tmp_path):
+    cache = ConversionCache(str(tmp_path), mmap_threshold=64)
+    small, large = cache_key(b"a", "voice", "model"), cache_key(b"b", "voice", "model")
+    cache.put(small, b"x" * 10)
+    cache.put(large, b"y" * 100)
+
+    reopened = ConversionCache(str(tmp_path), mmap_threshold=64)
+    assert reopened.get(small) == b"x" * 10
+    assert bytes(reopened.get(large)) == b"y" * 100
+    assert reopened.disk_hits == 2
+
+
+def test_lookups_do_not_wait_for_a_disk_write(tmp_path, monkeypatch):
+    cache = ConversionCache(str(tmp_path))
+    cached = cache_key(b"cached", "voice", "model")
+    cache.put(cached, b"audio")
+
+    writing, release = threading.Event(), threading.Event()
+    replace = os.replace
+
+    def slow_replace(source, destination):
+        writing.set()
+        release.wait(5)
+        replace(source, destination)
+
+    monkeypatch.setattr(os, "replace", slow_replace)
+    writer = threading.Thread(target=cache.put, args=(cache_key(b"new", "voice", "model"), b"more audio"))
+    writer.start()
+    try:
+        assert writing.wait(5)
+        result = []
+        reader = threading.Thread(target=lambda: result.append(cache.get(cached)))
+        reader.start()
+        reader.join(1)
+        assert result == [b"audio"]
+    finally:
+        release.set()
+        writer.join()
+    assert cache.stores == 2
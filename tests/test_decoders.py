@@ -0,0 +1,44 @@
+import sys
+
+import numpy as np
+import pytest
+
+from voice_converter.audio.decoders import FFmpegPipeDecoder
+
+# Stands in for ffmpeg: echoes stdin as "PCM" in pieces with pauses, the last
+# piece (the decoder's tail) only after stdin is closed
+FAKE_FFMPEG = """
+import sys, time
+data = sys.stdin.buffer.read()
+half = len(data) // 2 // 2 * 2
+for piece in (data[:half], data[half:]):
+    time.sleep({pause})
+    sys.stdout.buffer.write(piece)
+    sys.stdout.buffer.flush()
+"""
+
+
+class FakeFFmpegDecoder(FFmpegPipeDecoder):
+    def __init__(self, pause, **kwargs):
+        super().__init__(**kwargs)
+        self.pause = pause
+
+    def _command(self):
+        return [sys.executable, "-c", FAKE_FFMPEG.format(pause=self.pause)]
+
+
+def test_each_decode_returns_all_of_its_own_output():
+    decoder = FakeFFmpegDecoder(pause=0.2, sample_rate=22050, stall_timeout=2.0)
+    first = np.arange(1000, dtype=np.int16)
+    second = -np.arange(500, dtype=np.int16)
+
+    # The pauses are longer than a quiet period that would have ended the decode early
+    assert np.array_equal(decoder.decode(first.tobytes()).samples, first)
+    assert np.array_equal(decoder.decode(second.tobytes()).samples, second)
+
+
+def test_a_stalled_decode_fails():
+    decoder = FakeFFmpegDecoder(pause=1.0, stall_timeout=0.2)
+
+    with pytest.raises(RuntimeError, match="no output"):
+        decoder.decode(bytes(100))
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+# Makes importing Tk or PyAudio fail, as on a headless machine without them
+HEADLESS = """
+import sys
+sys.modules["tkinter"] = None
+sys.modules["pyaudio"] = None
+sys.argv = ["voice-converter", "batch", "--help"]
+from voice_converter.main import main
+main()
+"""
+
+
+def test_batch_runs_without_tk_or_portaudio():
+    result = subprocess.run([sys.executable, "-c", HEADLESS], capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert "voice-converter batch" in result.stdout
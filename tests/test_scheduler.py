@@ -0,0 +1,74 @@
+import io
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+
+
+@pytest.fixture
+def rejecting_api():
+    """Fake API answering every conversion with 429 and Retry-After: 1"""
+    with FakeSpeechServer(latency=0.0, chunk_interval=0.0, error_rate=1.0, error_status=429, retry_after=1) as api:
+        yield api
+
+
+def convert(api, scheduler, deadline=None):
+    client = ElevenLabsClient(base_url=api.base_url, transport=HttpTransport(api.base_url), scheduler=scheduler)
+    client.set_api_key("test")
+    start = time.monotonic()
+    try:
+        result = client.convert_speech(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT,
+                                       deadline=start + deadline if deadline is not None else None)
+    finally:
+        client.close()
+    return result, time.monotonic() - start
+
+
+def test_failed_requests_are_retried_up_to_max_retries(rejecting_api):
+    rejecting_api.retry_after = None
+    scheduler = RequestScheduler(rate=None, max_retries=2, base_delay=0.01)
+
+    result, _ = convert(rejecting_api, scheduler)
+
+    assert isinstance(result, tuple)  # (None, error_info)
+    assert rejecting_api.requests == 3
+    assert scheduler.stats()["retries"] == 2
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_retry_after_pauses_the_retry(rejecting_api):
+    scheduler = RequestScheduler(rate=None, max_retries=1, base_delay=0.01)
+
+    _, elapsed = convert(rejecting_api, scheduler)
+
+    # The jittered backoff alone would retry within 10 ms
+    assert rejecting_api.requests == 2
+    assert elapsed >= 1.0
+
+
+def test_retry_past_the_deadline_is_dropped(rejecting_api):
+    scheduler = RequestScheduler(rate=None, max_retries=3, base_delay=0.01)
+
+    result, elapsed = convert(rejecting_api, scheduler, deadline=0.5)
+
+    # Retry-After would only allow a retry after the deadline, so none is sent
+    assert isinstance(result, tuple)
+    assert rejecting_api.requests == 1
+    assert scheduler.stats()["stale_dropped"] == 1
+    assert elapsed < 0.5
+
+
+def test_request_past_its_deadline_is_not_sent(rejecting_api):
+    scheduler = RequestScheduler(rate=1.0, burst=1)
+    scheduler.bucket.reserve()  # The next token is a second away
+
+    result, _ = convert(rejecting_api, scheduler, deadline=0.2)
+
+    assert isinstance(result, tuple)
+    assert rejecting_api.requests == 0
+    assert scheduler.stats()["stale_dropped"] == 1
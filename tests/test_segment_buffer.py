@@ -0,0 +1,40 @@
+import hashlib
+import tracemalloc
+
+import numpy as np
+
+from voice_converter.audio.encoders import UploadEncoder
+from voice_converter.audio.segment_buffer import WAV_HEADER_SIZE, SegmentBuffer
+
+
+def test_encoding_and_reading_the_upload_does_not_copy_it():
+    samples = np.random.default_rng(0).normal(0, 2000, 44100 * 5).astype(np.int16)
+    segment = SegmentBuffer.from_frames([samples.tobytes()], 44100)
+    encoder = UploadEncoder(input_rate=44100, sample_rate=16000, codec="wav")
+    encoder.encode(segment)  # Builds the resampling filter, which is kept for later segments
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        upload = encoder.encode(segment)
+        after_encode, _ = tracemalloc.get_traced_memory()
+        upload_bytes = upload.getbuffer().nbytes
+
+        tracemalloc.reset_peak()
+        digest = hashlib.sha256(upload.read())  # What cache_key() does
+        upload.seek(0)
+        total = 0
+        chunk = upload.read(65536)  # What the HTTP client's multipart encoder does
+        while chunk:
+            total += len(chunk)
+            chunk = upload.read(65536)
+        _, read_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert upload_bytes == WAV_HEADER_SIZE + 16000 * 5 * 2
+    assert total == upload_bytes
+    assert digest.digest() == hashlib.sha256(upload.getbuffer()).digest()
+    # Encoding keeps only the resampled buffer, reading it allocates no copy of it
+    assert after_encode - before < upload_bytes + 16 * 1024
+    assert read_peak - after_encode < 16 * 1024
@@ -0,0 +1,33 @@
+import numpy as np
+
+from voice_converter.audio.segment_buffer import SegmentBuffer, merge_segments
+from voice_converter.utils.latency import LatencyTracer
+from voice_converter.utils.segment_queue import MERGE, SegmentQueue
+
+
+def traced_segment(tracer):
+    segment = SegmentBuffer.from_frames([np.ones(1024, dtype=np.int16).tobytes()])
+    segment.trace = tracer.trace()
+    segment.trace.mark("close")
+    segment.trace.mark("enqueue")
+    return segment
+
+
+def test_merged_segments_complete_their_traces():
+    tracer = LatencyTracer(window=10)
+    queue = SegmentQueue(maxsize=1, policy=MERGE, merge=merge_segments)
+    first, second = traced_segment(tracer), traced_segment(tracer)
+    queue.put(first)
+    queue.put(second)
+
+    merged, _ = queue.get()
+    for event in ("dequeue", "upload_start", "first_byte", "last_byte", "first_played", "last_played"):
+        merged.trace.mark(event)
+
+    assert queue.merged == 1
+    assert len(merged) == 2 * 1024 * 2
+    assert tracer.completed == 2
+    assert tracer.stats()["end_to_end"]["count"] == 2
+    # The merged segment keeps its own end of speech
+    assert second.trace.times["close"] >= first.trace.times["close"]
+    assert second.trace.times["first_played"] == first.trace.times["first_played"]
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidStatus
+
+from benchmarks.eval_vad import synthetic_recording
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter.server import SESSION_PATH, ConversionServer
+
+RATE = 16000
+
+
+async def run_session(url, pcm):
+    """Stream pcm without pacing, end the session and return the messages received"""
+    segments = 0
+    async with connect(f"{url}?sample_rate={RATE}", max_size=None, compression=None) as ws:
+        ready = json.loads(await ws.recv())
+        assert ready["type"] == "ready"
+        for offset in range(0, len(pcm), 4096):
+            await ws.send(pcm[offset:offset + 4096])
+        await ws.send(json.dumps({"type": "end"}))
+        async for message in ws:
+            if isinstance(message, bytes):
+                continue
+            event = json.loads(message)
+            if event["type"] == "audio_start":
+                segments += 1
+            elif event["type"] == "done":
+                return segments, event
+    raise AssertionError("Session closed without a done message")
+
+
+class SlowHandshakeServer(ConversionServer):
+    """Yields after the session limit check, as a handshake that awaits in between would"""
+
+    async def _process_request(self, connection, request):
+        response = super()._process_request(connection, request)
+        await asyncio.sleep(0.05)
+        return response
+
+
+def with_server(client, server_class=ConversionServer, **options):
+    """Run client(url) against a ConversionServer backed by the fake API, return its result"""
+
+    async def scenario(api_url):
+        server = server_class("test", base_url=api_url, host="127.0.0.1", port=0, **options)
+        stop = asyncio.get_running_loop().create_future()
+        serving = asyncio.ensure_future(server.serve(stop))
+        while not server.port:
+            await asyncio.sleep(0.01)
+        try:
+            return await asyncio.wait_for(client(f"ws://127.0.0.1:{server.port}{SESSION_PATH}"), timeout=30)
+        finally:
+            stop.set_result(None)
+            await serving
+
+    with FakeSpeechServer(latency=0.01, chunk_interval=0.0) as api:
+        return asyncio.run(scenario(api.base_url))
+
+
+def test_session_converts_segments():
+    samples, _, _ = synthetic_recording(rate=RATE, seconds=6, seed=0)
+
+    segments, done = with_server(lambda url: run_session(url, samples.tobytes()))
+
+    assert segments > 0
+    assert done["segments_sent"] == segments
+
+
+def test_malformed_control_messages_are_answered_with_errors():
+    async def client(url):
+        replies = []
+        async with connect(url) as ws:
+            await ws.recv()  # ready
+            for message in ("not json", "[1, 2]", json.dumps({"type": "config", "voice_id": 5}),
+                            json.dumps({"type": "unknown"}), json.dumps({"type": "stats"})):
+                await ws.send(message)
+                replies.append(json.loads(await ws.recv())["type"])
+        return replies
+
+    assert with_server(client) == ["error", "error", "error", "error", "stats"]
+
+
+def test_invalid_query_parameters_are_refused():
+    async def client(url):
+        statuses = []
+        for query in ("sample_rate=fast", "threshold=loud", "sample_rate=0"):
+            with pytest.raises(InvalidStatus) as refused:
+                async with connect(f"{url}?{query}"):
+                    pass
+            statuses.append(refused.value.response.status_code)
+        return statuses
+
+    assert with_server(client) == [400, 400, 400]
+
+
+def test_concurrent_handshakes_do_not_exceed_max_sessions():
+    async def open_session(url):
+        try:
+            async with connect(url) as ws:
+                ready = json.loads(await ws.recv())
+                await asyncio.sleep(0.2)  # Hold the session while the others connect
+                return ready["type"] == "ready"
+        except (ConnectionClosed, InvalidStatus):
+            return False
+
+    async def client(url):
+        return await asyncio.gather(*(open_session(url) for _ in range(5)))
+
+    assert sum(with_server(client, SlowHandshakeServer, max_sessions=1)) == 1
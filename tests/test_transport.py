@@ -0,0 +1,28 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+
+
+def test_conversions_share_the_pooled_connections():
+    with FakeSpeechServer(latency=0.02, chunk_interval=0.0) as api:
+        transport = HttpTransport(api.base_url, max_connections=2)
+        client = ElevenLabsClient(base_url=api.base_url, transport=transport, scheduler=RequestScheduler(rate=None))
+        client.set_api_key("test")
+
+        def convert(_):
+            return client.convert_speech(io.BytesIO(b"RIFF"), output_format=config.STREAM_OUTPUT_FORMAT)
+
+        try:
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                results = list(pool.map(convert, range(12)))
+        finally:
+            client.close()
+
+    assert all(isinstance(result, bytes) for result in results)
+    assert api.requests == 12
+    assert api.connections <= 2
@@ -0,0 +1,56 @@
+import asyncio
+
+from benchmarks.fakes import FakeSpeechServer
+from voice_converter.api.async_client import AsyncElevenLabsClient
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.voice_catalog import VoiceCatalog, VoiceCatalogCache
+
+
+def voice_requests(client):
+    """Record (If-None-Match, status) of every voice list request"""
+    seen = []
+    client.transport.add_response_hook(lambda response: seen.append(
+        (response.request.headers.get("if-none-match"), response.status_code)))
+    return seen
+
+
+def test_refresh_is_conditional_only_with_the_servers_etag(tmp_path):
+    cache = VoiceCatalogCache(str(tmp_path / "voices.json"), ttl=0)
+    with FakeSpeechServer(latency=0.0, voices=[("Anna", "a1"), ("Ben", "b2")]) as api:
+        # A catalogue cached without an ETag, e.g. from a server that sent none
+        cache.save(VoiceCatalog([("Anna", "a1"), ("Ben", "b2")]), "test")
+        client = ElevenLabsClient(base_url=api.base_url, voice_cache=cache)
+        client.set_api_key("test")
+        seen = voice_requests(client)
+
+        _, changed = client.refresh_voices()
+        catalog, changed_again = client.refresh_voices()
+        client.close()
+
+    etag = catalog.etag
+    assert etag
+    assert seen == [(None, 200), (etag, 304)]
+    assert not changed and not changed_again
+    assert cache.load("test")[0].etag == etag
+
+
+def test_both_clients_build_the_same_catalogue():
+    voices = [("Anna", "a1"), ("Ben", "b2"), ("", "no-name")]
+    with FakeSpeechServer(latency=0.0, voices=voices) as api:
+        client = ElevenLabsClient(base_url=api.base_url)
+        client.set_api_key("test")
+        sync_result = client.fetch_available_voices()
+        client.close()
+
+        async def fetch():
+            async_client = AsyncElevenLabsClient(base_url=api.base_url)
+            async_client.set_api_key("test")
+            try:
+                return await async_client.fetch_available_voices(), async_client.voice_catalog
+            finally:
+                await async_client.aclose()
+
+        async_result, async_catalog = asyncio.run(fetch())
+
+    assert sync_result == async_result == ({"Anna": "a1", "Ben": "b2"}, [("Anna", "a1"), ("Ben", "b2")])
+    assert async_catalog.name_for("b2") == "Ben"
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import numpy as np
+
+from voice_converter.audio.segment_buffer import SegmentBuffer
+from voice_converter.voice_converter import VoiceConverter
+
+
+class FakeAudio:
+    def record_to_file(self, segment):
+        return bytes(segment.pcm())
+
+    def play_audio_stream(self, chunks, sample_rate=None, trace=None):
+        return bool(list(chunks))
+
+
+class BlockingApiClient:
+    """Holds every conversion until release is set"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def convert_speech_stream(self, audio_data, voice_id, language_code, output_format, deadline=None):
+        self.started.set()
+        self.release.wait(5)
+        try:
+            yield b"\0\0"
+        finally:  # The converter stops reading once it was stopped
+            self.finished.set()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_a_conversion_running_across_a_restart_frees_its_own_slot():
+    api_client = BlockingApiClient()
+    converter = VoiceConverter(FakeAudio(), api_client, max_in_flight=2)
+    converter.start_processing()
+    converter.add_audio_to_queue(SegmentBuffer.from_frames([np.ones(1024, dtype=np.int16).tobytes()]))
+    assert api_client.started.wait(5)
+
+    converter.stop_processing()
+    converter.start_processing()
+    api_client.release.set()
+    wait_until(lambda: api_client.finished.is_set() and not converter._converting)
+    converter.stop_processing()
+
+    # The dispatcher gave back the slot it held while waiting for segments
+    assert converter._in_flight._value == converter.max_in_flight
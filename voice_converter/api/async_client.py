@@ -0,0 +1,204 @@
+"""Asyncio counterpart of ElevenLabsClient.
+
+All requests run on one event loop over the transport's pooled
+httpx.AsyncClient, so any number of conversions can be in flight without a
+thread each, and a conversion is cancelled by cancelling its task.
+"""
+
+import asyncio
+import logging
+
+from elevenlabs import AsyncElevenLabs
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import CACHED_CHUNK_SIZE, ConversionError, describe_error, sdk_environment
+from voice_converter.api.scheduler import QuotaExhausted, RequestScheduler, StaleRequest
+from voice_converter.api.transport import HttpTransport
+from voice_converter.api.voice_catalog import VoiceCatalog, voices_request
+from voice_converter.utils.conversion_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncElevenLabsClient:
+    """Asyncio client for the ElevenLabs API with the interface of ElevenLabsClient
+
+    Args:
+        settings_manager: Settings to read the saved API key from
+        base_url: API endpoint override, defaults to config.API_BASE_URL
+        transport: HttpTransport to share, a new one by default
+        cache: ConversionCache for converted audio, None to always call the API
+        scheduler: RequestScheduler for rate limiting and retries, one from config by default
+    """
+
+    def __init__(self, settings_manager=None, base_url=None, transport=None, cache=None, scheduler=None):
+        self.settings_manager = settings_manager
+        self.cache = cache
+        self.api_key = ""
+        self.base_url = base_url or config.API_BASE_URL
+        self.available_voices = []
+        self.voice_catalog = None
+        self.client = None
+        self.transport = transport or HttpTransport(self.base_url)
+        self.scheduler = scheduler or RequestScheduler()
+        self.transport.add_response_hook(self.scheduler.record_response)
+
+        if settings_manager:
+            self.api_key = settings_manager.get("api_key") or ""
+
+        if self.api_key:
+            self.client = self._create_client()
+
+    def _create_client(self):
+        """Create an async SDK client for the current API key on the shared transport"""
+        options = {}
+        if self.base_url:
+            options["environment"] = sdk_environment(self.base_url)
+        return AsyncElevenLabs(
+            api_key=self.api_key,
+            httpx_client=self.transport.async_client,
+            timeout=self.transport.timeout,
+            **options
+        )
+
+    def set_api_key(self, api_key):
+        """Set the API key and update the client"""
+        self.api_key = api_key
+        self.client = self._create_client()
+        self.available_voices = []
+        self.voice_catalog = None
+
+    async def warm_up(self):
+        """Open a connection to the API ahead of the first conversion"""
+        await self.transport.warm_up_async()
+
+    async def aclose(self):
+        """Close the pooled API connections"""
+        await self.transport.aclose()
+        self.client = None
+
+    async def fetch_available_voices(self):
+        """Fetch available voices from the ElevenLabs API
+
+        Returns:
+            tuple: (dict of name -> voice_id, list of (name, voice_id) tuples)
+        """
+        if not self.api_key:
+            logger.warning("No API key available")
+            return {}, []
+
+        logger.info("Fetching available voices...")
+        # The same request and catalogue as ElevenLabsClient.refresh_voices()
+        url, headers = voices_request(self.base_url or self.transport.base_url, self.api_key)
+        try:
+            response = await self.transport.async_client.get(url, headers=headers)
+            response.raise_for_status()
+            catalog = VoiceCatalog.from_response(response.json(), response.headers.get("etag"))
+        except Exception as e:
+            logger.error("Error fetching voices: %s", e)
+            return {}, []
+        self.voice_catalog = catalog
+        self.available_voices = catalog.pairs()
+        return dict(catalog.items()), self.available_voices
+
+    async def convert_speech_stream(self, audio_data, voice_id=None, language_code=None, output_format=None,
+                                    deadline=None):
+        """Convert speech and yield the converted audio while it is received
+
+        Cancelling the task that iterates this generator aborts the request
+        and releases its connection back to the pool. Rate limiting, retries
+        and the deadline work as in ElevenLabsClient.convert_speech_stream().
+
+        Args:
+            audio_data: Input audio as a file-like object
+            voice_id: Target voice, defaults to config.DEFAULT_VOICE_ID
+            language_code: Language of the input speech
+            output_format: API output format, None for the API default (MP3)
+            deadline: time.monotonic() after which the result is no longer wanted
+
+        Yields:
+            bytes: Chunks of converted audio
+
+        Raises:
+            ConversionError: If the API request fails
+        """
+        voice_id = voice_id or config.DEFAULT_VOICE_ID
+
+        options = {}
+        if output_format:
+            options["output_format"] = output_format
+
+        key = None
+        if self.cache is not None:
+            key = cache_key(audio_data, voice_id, config.DEFAULT_MODEL, optimize_streaming_latency=3, **options)
+            cached = self.cache.get(key)
+            if cached is not None:
+                for offset in range(0, len(cached), CACHED_CHUNK_SIZE):
+                    yield cached[offset:offset + CACHED_CHUNK_SIZE]
+                return
+        received = []
+
+        attempt = 0
+        while True:
+            try:
+                await self.scheduler.acquire_async(deadline)
+            except (StaleRequest, QuotaExhausted) as e:
+                logger.warning("Not converting speech: %s", e)
+                raise ConversionError(describe_error(e)) from e
+
+            started = False
+            try:
+                if hasattr(audio_data, "seek"):
+                    audio_data.seek(0)
+                audio_stream = self.client.speech_to_speech.convert_as_stream(
+                    voice_id=voice_id,
+                    model_id=config.DEFAULT_MODEL,
+                    audio=audio_data,
+                    optimize_streaming_latency=3,
+                    **options
+                )
+                async for chunk in audio_stream:
+                    if chunk:
+                        started = True
+                        if key:
+                            received.append(chunk)
+                        yield chunk
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = None if started else self.scheduler.retry_delay(e, attempt, deadline)
+                if delay is None:
+                    logger.error("Error converting speech: %s", e)
+                    raise ConversionError(describe_error(e)) from e
+                logger.info("Retrying conversion in %.2f s: %s", delay, e)
+                attempt += 1
+            finally:
+                self.scheduler.release_async()
+            await asyncio.sleep(delay)
+
+        # Only complete responses are cached
+        if key:
+            self.cache.put(key, b"".join(received))
+
+    async def convert_speech(self, audio_data, voice_id=None, language_code=None, output_format=None,
+                             deadline=None):
+        """Convert speech using the ElevenLabs API
+
+        Returns:
+            bytes: The complete converted audio, or a (None, error_info) tuple on failure
+        """
+        try:
+            chunks = [chunk async for chunk in self.convert_speech_stream(
+                audio_data,
+                voice_id=voice_id,
+                language_code=language_code,
+                output_format=output_format,
+                deadline=deadline
+            )]
+            return b"".join(chunks)
+        except ConversionError as e:
+            return None, e.error_info
+
+    def describe_error(self, error):
+        """Turn an exception from the API into an error dict for the UI"""
+        return describe_error(error)
@@ -1,13 +1,98 @@
+import logging
+import re
+import time
+
 from elevenlabs import ElevenLabs
+from elevenlabs.environment import ElevenLabsEnvironment
 from voice_converter import config
+from voice_converter.api.scheduler import QuotaExhausted, RequestScheduler, StaleRequest, error_status, is_quota_error
+from voice_converter.api.transport import HttpTransport
+from voice_converter.api.voice_catalog import VoiceCatalog, voices_request
+from voice_converter.utils.conversion_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+CACHED_CHUNK_SIZE = 64 * 1024  # Cached audio is yielded in chunks of this size, like a response
+
+
+class ConversionError(Exception):
+    """Raised while streaming a conversion when the API request fails
+
+    Attributes:
+        error_info: Error dict in the format returned by convert_speech()
+    """
+
+    def __init__(self, error_info):
+        super().__init__(error_info["message"])
+        self.error_info = error_info
+
+
+def sdk_environment(base_url):
+    """SDK environment for an API endpoint override
+    
+    Passing base_url= to the SDK would force https and drop the port, so the
+    full endpoint is given as an environment instead.
+    """
+    base = base_url.rstrip("/")
+    return ElevenLabsEnvironment(base=base, wss=re.sub(r"^http", "ws", base))
+
+
+def describe_error(error):
+    """Turn an exception from the API into an error dict for the UI
+    
+    Returns:
+        dict: Error info with "type", "message" and "details" keys
+    """
+    error_str = str(error)
+    if isinstance(error, StaleRequest):
+        return {"type": "stale", "message": "Segment dropped: it could not be converted in time", "details": error_str}
+    if isinstance(error, QuotaExhausted):
+        return {"type": "quota_exceeded", "message": "Quota exceeded, conversions paused", "details": error_str}
+    
+    # Spezifische Fehlerbehandlung für überschrittenes Kontingent
+    if is_quota_error(error) or "exceeds your quota" in error_str:
+        # Versuche verbleibende und benötigte Credits zu extrahieren
+        remaining_credits = re.search(r'You have (\d+) credits remaining', error_str)
+        required_credits = re.search(r'while (\d+) credits are required', error_str)
+        
+        remaining = remaining_credits.group(1) if remaining_credits else "unknown"
+        required = required_credits.group(1) if required_credits else "unknown"
+        
+        return {
+            "type": "quota_exceeded",
+            "message": f"Quota exceeded: {remaining} credits available, {required} credits required.",
+            "details": error_str
+        }
+    
+    if error_status(error) == 429:
+        return {"type": "rate_limited", "message": "API rate limit reached, segment dropped", "details": error_str}
+    
+    # Allgemeiner Fehler
+    return {"type": "general_error", "message": "API error during speech conversion", "details": error_str}
+
 
 class ElevenLabsClient:
-    def __init__(self, settings_manager=None):
+    def __init__(self, settings_manager=None, base_url=None, transport=None, cache=None, voice_cache=None,
+                 scheduler=None):
         self.settings_manager = settings_manager
+        self.cache = cache  # ConversionCache for converted audio, None to always call the API
         self.api_key = ""
+        self.base_url = base_url or config.API_BASE_URL
         self.available_voices = []
         self.client = None
         
+        # Voice catalogue, kept on disk by voice_cache (a VoiceCatalogCache) if given
+        self.voice_cache = voice_cache
+        self.voice_catalog = None
+        self._voices_checked_at = 0
+        
+        # One pooled keep-alive session shared by every SDK client we create
+        self.transport = transport or HttpTransport(self.base_url)
+        
+        # Rate limiting, retries and credit accounting for conversion requests
+        self.scheduler = scheduler or RequestScheduler()
+        self.transport.add_response_hook(self.scheduler.record_response)
+        
         if settings_manager:
             saved_api_key = settings_manager.get("api_key")
             if saved_api_key:
@@ -15,115 +100,208 @@ def __init__(self, settings_manager=None):
         
         # Initialize the client if we have an API key
         if self.api_key:
-            self.client = ElevenLabs(api_key=self.api_key)
+            self.client = self._create_client()
         
         # We'll no longer fetch voices automatically during initialization
         # This will be done explicitly when needed via get_voices()
     
+    def _create_client(self):
+        """Create an SDK client for the current API key on the shared transport"""
+        options = {}
+        if self.base_url:
+            options["environment"] = sdk_environment(self.base_url)
+        # The SDK passes its timeout on every request, so hand it ours
+        return ElevenLabs(
+            api_key=self.api_key,
+            httpx_client=self.transport.client,
+            timeout=self.transport.timeout,
+            **options
+        )
+    
+    def warm_up(self, background=True):
+        """Open a connection to the API ahead of the first conversion
+        
+        Returns:
+            threading.Thread or None: The warm-up thread when running in the background
+        """
+        return self.transport.warm_up(background=background)
+    
+    def close(self):
+        """Close the pooled API connections"""
+        self.transport.close()
+        self.client = None
+    
     def fetch_available_voices(self):
-        """Fetch available voices from the ElevenLabs API"""
-        try:
-            if not self.client:
-                if not self.api_key:
-                    print("No API key available")
-                    return {}, []
-                self.client = ElevenLabs(api_key=self.api_key)
-                
-            print("Fetching available voices...")
-            response = self.client.voices.get_all()
-            voice_dict = {}
+        """Fetch available voices from the ElevenLabs API
+        
+        Returns:
+            tuple: (dict of name -> voice_id, list of (name, voice_id) tuples)
+        """
+        catalog, _ = self.refresh_voices(force=True)
+        if catalog is None:
+            return {}, []
+        return dict(catalog.items()), catalog.pairs()
+    
+    def cached_voices(self):
+        """Return the last known voice catalogue without a network request, or None"""
+        if self.voice_catalog is None and self.voice_cache:
+            self.voice_catalog, self._voices_checked_at = self.voice_cache.load(self.api_key)
+            if self.voice_catalog is not None:
+                self.available_voices = self.voice_catalog.pairs()
+        return self.voice_catalog
+    
+    def refresh_voices(self, force=False):
+        """Bring the voice catalogue up to date
+        
+        A catalogue checked less than the cache TTL ago is used as it is.
+        Otherwise the API is asked again, with the ETag it sent last time if
+        any, so an unchanged list only costs a 304.
+        
+        Args:
+            force: Check with the API even if the catalogue is fresh
             
-            # Check response structure based on ElevenLabs API docs
-            if hasattr(response, 'voices'):
-                # Handle response in format: {"voices": [...]}
-                voices = response.voices
+        Returns:
+            tuple: (VoiceCatalog or None, bool whether it changed)
+        """
+        catalog = self.cached_voices()
+        if catalog is not None and not force:
+            if not self.voice_cache or self.voice_cache.is_fresh(self._voices_checked_at):
+                return catalog, False
+        
+        if not self.api_key:
+            logger.warning("No API key available")
+            return catalog, False
+        
+        logger.info("Fetching available voices...")
+        url, headers = voices_request(self.base_url or self.transport.base_url, self.api_key,
+                                      catalog.etag if catalog is not None else None)
+        try:
+            response = self.transport.client.get(url, headers=headers)
+            if response.status_code == 304:
+                fresh = catalog
             else:
-                # Assume response is already the voices list
-                voices = response
+                response.raise_for_status()
+                fresh = VoiceCatalog.from_response(response.json(), response.headers.get("etag"))
+        except Exception as e:
+            # A stale catalogue is still better than none
+            logger.error("Error fetching voices: %s", e)
+            return catalog, False
+        
+        changed = catalog is None or fresh.content_hash() != catalog.content_hash()
+        self.voice_catalog = fresh
+        self.available_voices = fresh.pairs()
+        self._voices_checked_at = time.time()
+        if self.voice_cache:
+            self.voice_cache.save(fresh, self.api_key, self._voices_checked_at)
+        return fresh, changed
+    
+    def convert_speech_stream(self, audio_data, voice_id=None, language_code=None, output_format=None,
+                              deadline=None):
+        """Convert speech and yield the converted audio while it is received
+        
+        The request is only sent once iteration starts, so the caller can get
+        the first chunk to the speakers before the rest of the response arrives.
+        It waits for the scheduler's rate limit and is retried if it fails
+        before any audio was received.
+        
+        Args:
+            audio_data: Input audio as a file-like object
+            voice_id: Target voice, defaults to config.DEFAULT_VOICE_ID
+            language_code: Language of the input speech
+            output_format: API output format (e.g. config.STREAM_OUTPUT_FORMAT),
+                None for the API default (MP3)
+            deadline: time.monotonic() after which the result is no longer
+                wanted; the request is dropped rather than delayed past it
             
-            # Process voice objects
+        Yields:
+            bytes: Chunks of converted audio
+            
+        Raises:
+            ConversionError: If the API request fails
+        """
+        voice_id = voice_id or config.DEFAULT_VOICE_ID
+        
+        options = {}
+        if output_format:
+            options["output_format"] = output_format
+        
+        key = None
+        if self.cache is not None:
+            # Identical input and request parameters give the same audio, replay it from the cache
+            key = cache_key(audio_data, voice_id, config.DEFAULT_MODEL, optimize_streaming_latency=3, **options)
+            cached = self.cache.get(key)
+            if cached is not None:
+                for offset in range(0, len(cached), CACHED_CHUNK_SIZE):
+                    yield cached[offset:offset + CACHED_CHUNK_SIZE]
+                return
+        received = []
+        
+        attempt = 0
+        while True:
             try:
-                # Check if we have objects with name and voice_id attributes
-                if voices and hasattr(voices[0], 'name') and hasattr(voices[0], 'voice_id'):
-                    self.available_voices = [(voice.name, voice.voice_id) for voice in voices]
-                    voice_dict = {voice.name: voice.voice_id for voice in voices}
-                elif voices and isinstance(voices[0], dict):
-                    # Handle dict format
-                    self.available_voices = [(voice.get('name', ''), voice.get('voice_id', '')) for voice in voices]
-                    voice_dict = {voice.get('name', ''): voice.get('voice_id', '') for voice in voices}
-                else:
-                    print(f"Warning: Unexpected voice format: {type(voices[0]) if voices else 'Empty list'}")
-                    # Try to extract whatever data we can
-                    self.available_voices = []
-                    for voice in voices:
-                        if hasattr(voice, '__dict__'):
-                            # Try to access as object with attributes
-                            name = getattr(voice, 'name', str(voice))
-                            voice_id = getattr(voice, 'voice_id', '')
-                        elif isinstance(voice, tuple) and len(voice) >= 2:
-                            # Already in (name, id) format
-                            name, voice_id = voice[0], voice[1]
-                        else:
-                            # Last resort, stringify the object
-                            name = str(voice)
-                            voice_id = ''
-                            
-                        self.available_voices.append((name, voice_id))
-                        voice_dict[name] = voice_id
-            except (IndexError, AttributeError, TypeError) as e:
-                print(f"Error processing voices: {e}")
-                print(f"Voice data format: {type(voices)}")
+                self.scheduler.acquire(deadline)
+            except (StaleRequest, QuotaExhausted) as e:
+                logger.warning("Not converting speech: %s", e)
+                raise ConversionError(self.describe_error(e)) from e
             
-            return voice_dict, self.available_voices
-        except Exception as e:
-            print(f"Error fetching voices: {e}")
-            return {}, []
+            started = False
+            try:
+                if hasattr(audio_data, "seek"):
+                    audio_data.seek(0)  # A retry uploads the file again
+                # Die ElevenLabs API erwartet den Parameter "model_id" anstatt "model"
+                # Oder ggf. überhaupt keinen Sprachparameter, wenn das Modell fest ist
+                audio_stream = self.client.speech_to_speech.convert_as_stream(
+                    voice_id=voice_id,
+                    # Verwende das Modell aus der Konfiguration, falls eine Sprache angegeben wurde
+                    model_id=config.DEFAULT_MODEL,
+                    audio=audio_data,
+                    optimize_streaming_latency=3,
+                    **options
+                )
+                
+                for chunk in audio_stream:
+                    if chunk:
+                        started = True
+                        if key:
+                            received.append(chunk)
+                        yield chunk
+                break
+            except Exception as e:
+                # Audio that was already played cannot be taken back, so only retry before it
+                delay = None if started else self.scheduler.retry_delay(e, attempt, deadline)
+                if delay is None:
+                    logger.error("Error converting speech: %s", e)
+                    raise ConversionError(self.describe_error(e)) from e
+                logger.info("Retrying conversion in %.2f s: %s", delay, e)
+                attempt += 1
+            finally:
+                self.scheduler.release()
+            time.sleep(delay)
+        
+        # Only complete responses are cached, not ones the caller stopped reading
+        if key:
+            self.cache.put(key, b"".join(received))
     
-    def convert_speech(self, audio_data, voice_id=None, language_code=None):
-        """Convert speech using the ElevenLabs API"""
-        voice_id = voice_id or config.DEFAULT_VOICE_ID
+    def convert_speech(self, audio_data, voice_id=None, language_code=None, output_format=None, deadline=None):
+        """Convert speech using the ElevenLabs API
         
+        Returns:
+            bytes: The complete converted audio, or a (None, error_info) tuple on failure
+        """
         try:
-            # Die ElevenLabs API erwartet den Parameter "model_id" anstatt "model"
-            # Oder ggf. überhaupt keinen Sprachparameter, wenn das Modell fest ist
-            audio_stream = self.client.speech_to_speech.convert_as_stream(
+            return b"".join(self.convert_speech_stream(
+                audio_data,
                 voice_id=voice_id,
-                # Verwende das Modell aus der Konfiguration, falls eine Sprache angegeben wurde
-                model_id=config.DEFAULT_MODEL,
-                audio=audio_data,
-                optimize_streaming_latency=3
-            )
-            
-            result_audio = bytes()
-            for chunk in audio_stream:
-                result_audio += chunk
-                
-            return result_audio
-        except Exception as e:
-            print(f"Error converting speech: {e}")
-            
-            # Spezifische Fehlerbehandlung für überschrittenes Kontingent
-            error_str = str(e)
-            if "quota_exceeded" in error_str or "exceeds your quota" in error_str:
-                # Kontingentfehler extrahieren
-                import re
-                
-                # Versuche verbleibende und benötigte Credits zu extrahieren
-                remaining_credits = re.search(r'You have (\d+) credits remaining', error_str)
-                required_credits = re.search(r'while (\d+) credits are required', error_str)
-                
-                remaining = remaining_credits.group(1) if remaining_credits else "unknown"
-                required = required_credits.group(1) if required_credits else "unknown"
-                
-                error_message = {
-                    "type": "quota_exceeded",
-                    "message": f"Quota exceeded: {remaining} credits available, {required} credits required.",
-                    "details": str(e)
-                }
-                return None, error_message
-            
-            # Allgemeiner Fehler
-            return None, {"type": "general_error", "message": "API error during speech conversion", "details": str(e)}
+                language_code=language_code,
+                output_format=output_format,
+                deadline=deadline
+            ))
+        except ConversionError as e:
+            return None, e.error_info
+    
+    def describe_error(self, error):
+        """Turn an exception from the API into an error dict for the UI"""
+        return describe_error(error)
 
     def set_api_key(self, api_key):
         """Set the API key and update the client
@@ -132,11 +310,12 @@ def set_api_key(self, api_key):
         done by the UI refresh after setting the key.
         """
         self.api_key = api_key
-        self.client = ElevenLabs(api_key=self.api_key)
+        self.client = self._create_client()
         
-        # Clear the voice cache so the next get_voices() call will refresh
+        # Forget the voices of the previous key so the next get_voices() call will refresh
         # Instead of fetching here, which causes duplication
         self.available_voices = []
+        self.voice_catalog = None
 
     def get_voices(self, force_refresh=False):
         """Return the available voices and languages
@@ -145,26 +324,11 @@ def get_voices(self, force_refresh=False):
             force_refresh: Whether to force a refresh from the API
             
         Returns:
-            tuple: (voices_dict, language_list)
+            tuple: (VoiceCatalog, language dict)
         """
-        # Only fetch from API if we don't have voices yet or a refresh is requested
-        if not self.available_voices or force_refresh:
-            voices_dict, voice_list = self.fetch_available_voices()
-        else:
-            # Use cached voices
-            voice_list = self.available_voices
-            voices_dict = {name: voice_id for name, voice_id in voice_list}
-            print("Using cached voices (skip fetching)")
-        
-        # Debug output
-        if voice_list:
-            print(f"Voice list sample: {voice_list[0:2]}")
-            print(f"Voice dict sample: {list(voices_dict.items())[0:2] if voices_dict else 'Empty'}")
-        else:
-            print("No voices retrieved")
+        catalog, _ = self.refresh_voices(force=force_refresh)
+        if not catalog:
+            logger.warning("No voices retrieved")
         
         # For languages, we use the static config
-        from voice_converter import config
-        languages = config.LANGUAGES
-        
-        return voices_dict, languages 
\ No newline at end of file
+        return catalog or VoiceCatalog(), config.LANGUAGES
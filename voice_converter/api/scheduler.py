@@ -0,0 +1,280 @@
+"""Admission, retry and credit accounting for API requests.
+
+Every conversion request passes through a RequestScheduler, shared by all
+threads (or tasks) using one client:
+
+- a token bucket spaces out request starts so a burst of segments does not
+  trip the API's rate limit, and a concurrency cap bounds requests in flight;
+- failures before the first byte of audio (429, 5xx, connection errors) are
+  retried with jittered exponential backoff, and a 429 with Retry-After
+  pauses all requests for that long; once audio has been played a request
+  cannot be repeated;
+- a request carries a deadline, and is dropped instead of waited for or
+  retried when it could only finish after it (a live segment that would be
+  played seconds late is worth less than none);
+- the credits reported in response headers are added up, and after a quota
+  error requests fail fast instead of being sent.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+
+import httpx
+
+from voice_converter import config
+
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+CREDIT_HEADERS = ("character-cost", "x-character-count")  # Credits charged for a request
+
+
+class StaleRequest(Exception):
+    """Raised instead of sending or retrying a request that would finish after its deadline"""
+
+
+class QuotaExhausted(Exception):
+    """Raised instead of sending a request while the credit quota is known to be used up"""
+
+
+def error_status(error):
+    """Return the HTTP status of an API error, or None"""
+    status = getattr(error, "status_code", None)
+    if status is None and isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    return status
+
+
+def is_quota_error(error):
+    """Return True if the API refused a request because the credits are used up"""
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        detail = body.get("detail")
+        if isinstance(detail, dict) and detail.get("status") == "quota_exceeded":
+            return True
+    return "quota_exceeded" in str(error)
+
+
+def is_retryable(error):
+    """Return True for failures that may succeed when the request is sent again"""
+    if is_quota_error(error):
+        return False
+    if isinstance(error, httpx.TransportError):  # Connection refused or reset, timeouts
+        return True
+    return error_status(error) in RETRYABLE_STATUS
+
+
+class TokenBucket:
+    """Thread-safe token bucket
+
+    Requests reserve a token and are told how long to wait for it, so the
+    same bucket serves threads (time.sleep) and tasks (asyncio.sleep).
+
+    Args:
+        rate: Tokens added per second, None for no limit
+        burst: Tokens that can accumulate while idle
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, latest=None):
+        """Take a token, possibly from the future
+
+        Args:
+            latest: Monotonic time by which the token is needed, None for any time
+
+        Returns:
+            float: Seconds to wait before using the token, or None if it
+            would only be available after latest (nothing is taken then)
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if latest is not None and now + wait > latest:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class RequestScheduler:
+    """Rate limiting, concurrency cap, retries and credit accounting for one client
+
+    Args:
+        rate: Requests started per second, None for no limit
+        burst: Requests that may start at once after an idle period
+        max_concurrent: Requests in flight at the same time, None for no limit
+        max_retries: Times a failed request is sent again
+        base_delay: Backoff before the first retry (s), doubled for each further retry
+        max_delay: Longest backoff between retries (s)
+    """
+
+    def __init__(self, rate=config.API_RATE_LIMIT, burst=config.API_RATE_BURST,
+                 max_concurrent=config.API_MAX_CONCURRENT_REQUESTS, max_retries=config.API_MAX_RETRIES,
+                 base_delay=config.API_RETRY_BASE_DELAY, max_delay=config.API_RETRY_MAX_DELAY):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._async_slots = None  # asyncio.Semaphore, created on the loop that uses it
+        self._lock = threading.Lock()
+
+        # Credit accounting
+        self.credits_used = 0
+        self.credits_remaining = None  # Known after a quota error reports it
+        self.quota_exhausted_until = 0.0  # Monotonic time before which requests fail fast
+        self.paused_until = 0.0  # Monotonic time until which a 429 asked us not to send
+
+        # Statistics
+        self.requests = 0
+        self.retries = 0
+        self.stale_dropped = 0
+        self.failed = 0
+        self.throttled_seconds = 0.0  # Time spent waiting for tokens
+
+    # Admission
+
+    def _reserve(self, deadline):
+        """Reserve a token, raising StaleRequest if it would come too late"""
+        if time.monotonic() < self.quota_exhausted_until:
+            raise QuotaExhausted("Credit quota exceeded, not sending further requests for now")
+        pause = max(0.0, self.paused_until - time.monotonic())
+        wait = self.bucket.reserve(deadline)
+        if wait is not None:
+            wait = max(wait, pause)
+        if wait is None or (deadline is not None and time.monotonic() + wait > deadline):
+            self._count_stale()
+            raise StaleRequest("Rate limit would delay the request past its deadline")
+        with self._lock:
+            self.requests += 1
+            self.throttled_seconds += wait
+        return wait
+
+    def acquire(self, deadline=None):
+        """Wait for a token and a free slot (blocking)
+
+        Raises:
+            StaleRequest: If the request would start after deadline (time.monotonic())
+        """
+        time.sleep(self._reserve(deadline))
+        if self._slots and not self._slots.acquire(timeout=self._remaining(deadline)):
+            self._count_stale()
+            raise StaleRequest("No free request slot before the deadline")
+
+    def release(self):
+        if self._slots:
+            self._slots.release()
+
+    async def acquire_async(self, deadline=None):
+        """Wait for a token and a free slot on the event loop"""
+        await asyncio.sleep(self._reserve(deadline))
+        if not self.max_concurrent:
+            return
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), self._remaining(deadline))
+        except asyncio.TimeoutError:
+            self._count_stale()
+            raise StaleRequest("No free request slot before the deadline") from None
+
+    def release_async(self):
+        if self._async_slots is not None:
+            self._async_slots.release()
+
+    def _remaining(self, deadline):
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    def _count_stale(self):
+        with self._lock:
+            self.stale_dropped += 1
+
+    # Failures
+
+    def retry_delay(self, error, attempt, deadline=None):
+        """Decide whether to retry after a failed attempt
+
+        Args:
+            error: The exception the attempt raised before any audio was received
+            attempt: Number of the failed attempt, starting at 0
+            deadline: Monotonic time by which the request must be done
+
+        Returns:
+            float: Seconds to wait before retrying, or None to give up
+        """
+        if is_quota_error(error):
+            self.note_quota_error(error)
+        if attempt >= self.max_retries or not is_retryable(error):
+            with self._lock:
+                self.failed += 1
+            return None
+
+        # Full jitter keeps clients that failed together from retrying together
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        delay = max(delay, self.paused_until - time.monotonic())
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            self._count_stale()
+            return None
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def note_quota_error(self, error):
+        """Stop sending requests for a while after the API reported the quota used up"""
+        remaining = re.search(r'You have (\d+) credits remaining', str(error))
+        with self._lock:
+            if remaining:
+                self.credits_remaining = int(remaining.group(1))
+            self.quota_exhausted_until = time.monotonic() + config.API_QUOTA_BACKOFF
+
+    # Credits
+
+    def record_response(self, response):
+        """Add up the credits a response reports and honour Retry-After (httpx response hook)"""
+        if response.status_code == 429:
+            try:
+                pause = float(response.headers.get("retry-after", ""))
+            except ValueError:
+                pause = None
+            if pause:
+                with self._lock:
+                    self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+        for header in CREDIT_HEADERS:
+            value = response.headers.get(header)
+            if value is not None:
+                try:
+                    cost = int(value)
+                except ValueError:
+                    continue
+                with self._lock:
+                    self.credits_used += cost
+                    if self.credits_remaining is not None:
+                        self.credits_remaining = max(0, self.credits_remaining - cost)
+                break
+
+    def stats(self):
+        """Return request, retry, drop and credit counters"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "stale_dropped": self.stale_dropped,
+                "failed": self.failed,
+                "throttled_seconds": self.throttled_seconds,
+                "credits_used": self.credits_used,
+                "credits_remaining": self.credits_remaining,
+            }
+
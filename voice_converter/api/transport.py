@@ -0,0 +1,144 @@
+"""HTTP transport shared by all requests to the ElevenLabs API.
+
+Every utterance is a separate speech-to-speech request, so without a shared
+connection pool each one would pay for a new TCP connection and TLS handshake.
+HttpTransport owns one keep-alive httpx client that is handed to every SDK
+client, keeps the pool across API key changes, and can open a connection in
+the background at startup so the first utterance finds it ready. The asyncio
+client gets its own pooled httpx.AsyncClient with the same settings.
+"""
+
+import importlib.util
+import logging
+import threading
+
+import httpx
+
+from voice_converter import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.elevenlabs.io"
+
+
+def http2_available():
+    """Return True if the h2 package needed for HTTP/2 is installed"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpTransport:
+    """Pooled keep-alive HTTP session for the API client
+
+    Args:
+        base_url: API endpoint, None for the ElevenLabs default
+        connect_timeout: Seconds to wait for a connection to be established
+        read_timeout: Seconds to wait for each chunk of a response
+        http2: Use HTTP/2 if the h2 package is installed
+        max_connections: Connections kept open to the API
+        keepalive_expiry: Seconds an idle connection is kept before closing it
+    """
+
+    def __init__(self, base_url=None, connect_timeout=config.API_CONNECT_TIMEOUT,
+                 read_timeout=config.API_READ_TIMEOUT, http2=config.API_HTTP2,
+                 max_connections=config.API_MAX_CONNECTIONS, keepalive_expiry=config.API_KEEPALIVE_EXPIRY):
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        if http2 and not http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+            self.http2 = False
+
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        self.warmed_up = threading.Event()
+        self.response_hooks = []  # Called with every httpx.Response, e.g. to read usage headers
+
+    def add_response_hook(self, hook):
+        """Call hook(response) for every response received on this transport"""
+        if hook not in self.response_hooks:
+            self.response_hooks.append(hook)
+
+    def _on_response(self, response):
+        for hook in self.response_hooks:
+            hook(response)
+
+    async def _on_response_async(self, response):
+        self._on_response(response)
+
+    @property
+    def client(self):
+        """The shared httpx.Client, created on first use"""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout, limits=self.limits, http2=self.http2,
+                                            event_hooks={"response": [self._on_response]})
+            return self._client
+
+    @property
+    def async_client(self):
+        """The shared httpx.AsyncClient, created on first use
+
+        Must be used from a single event loop.
+        """
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2,
+                                                       event_hooks={"response": [self._on_response_async]})
+            return self._async_client
+
+    def warm_up(self, background=True):
+        """Open a pooled connection to the API before the first real request
+
+        Sends a HEAD request; the response status does not matter, only the
+        connection (and TLS session) it leaves in the pool.
+
+        Args:
+            background: Return immediately and warm up on a daemon thread
+
+        Returns:
+            threading.Thread or None: The warm-up thread when running in the background
+        """
+        if not background:
+            self._warm_up()
+            return None
+
+        thread = threading.Thread(target=self._warm_up, daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self):
+        try:
+            self.client.head(f"{self.base_url}/v1/models")
+            self.warmed_up.set()
+        except httpx.HTTPError as e:
+            logger.warning("Connection warm-up failed: %s", e)
+
+    async def warm_up_async(self):
+        """Open a pooled connection on the async client"""
+        try:
+            await self.async_client.head(f"{self.base_url}/v1/models")
+            self.warmed_up.set()
+        except httpx.HTTPError as e:
+            logger.warning("Connection warm-up failed: %s", e)
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+        self.warmed_up.clear()
+
+    async def aclose(self):
+        """Close the pooled connections of both clients"""
+        with self._lock:
+            async_client, self._async_client = self._async_client, None
+        if async_client is not None:
+            await async_client.aclose()
+        self.close()
@@ -0,0 +1,145 @@
+"""Voice catalogue with a persistent cache.
+
+The voices of an account rarely change, so the list is kept on disk and
+shown immediately at startup. It is refreshed in the background; when the
+API sent an ETag it is stored with the catalogue and the refresh is a
+conditional request, so an unchanged list costs a 304. Whether a fetched
+list changed is decided by a hash of its contents, so an unchanged list
+causes no UI update either way.
+
+Both API clients build the catalogue from the same GET /v1/voices request
+(voices_request() and VoiceCatalog.from_response()).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+VOICES_PATH = "/v1/voices"
+
+
+def voices_request(base_url, api_key, etag=None):
+    """Return the URL and headers of a GET /v1/voices request
+
+    Args:
+        etag: ETag the API sent with the cached list, to make the request conditional
+    """
+    headers = {"xi-api-key": api_key}
+    if etag:
+        headers["If-None-Match"] = etag
+    return base_url.rstrip("/") + VOICES_PATH, headers
+
+
+def key_fingerprint(api_key):
+    """Identify the account a cached catalogue belongs to without storing the key"""
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+
+class VoiceCatalog:
+    """Voice names and ids indexed both ways
+
+    Behaves like a read-only dict of name -> voice_id (as the UI expects),
+    with name_for() for the reverse lookup.
+
+    Args:
+        voices: Iterable of (name, voice_id) pairs
+        etag: ETag the API sent with the list, None if it sent none
+    """
+
+    def __init__(self, voices=(), etag=None):
+        self._ids = {}
+        self._names = {}
+        for name, voice_id in voices:
+            if name and voice_id:
+                self._ids[name] = voice_id
+                self._names.setdefault(voice_id, name)
+        self.etag = etag
+
+    @classmethod
+    def from_response(cls, data, etag=None):
+        """Build the catalogue from a GET /v1/voices JSON response"""
+        return cls(((voice.get("name"), voice.get("voice_id")) for voice in data.get("voices", ())), etag)
+
+    def content_hash(self):
+        """Hash of the names and ids, to tell whether a fetched list changed"""
+        digest = hashlib.sha256()
+        for name in sorted(self._ids):
+            digest.update(f"{name}\0{self._ids[name]}\n".encode())
+        return digest.hexdigest()[:16]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __getitem__(self, name):
+        return self._ids[name]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def keys(self):
+        return self._ids.keys()
+
+    def items(self):
+        return self._ids.items()
+
+    def id_for(self, name):
+        """Return the voice id for a name, or None"""
+        return self._ids.get(name)
+
+    def name_for(self, voice_id):
+        """Return the name of a voice id, or None"""
+        return self._names.get(voice_id)
+
+    def pairs(self):
+        """Return the voices as a list of (name, voice_id) tuples"""
+        return list(self._ids.items())
+
+
+class VoiceCatalogCache:
+    """The voice catalogue on disk, with its revision and the time it was checked
+
+    Args:
+        path: JSON file to store the catalogue in
+        ttl: Seconds after a check before the catalogue is checked again
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+
+    def load(self, api_key):
+        """Return (catalog, checked_at) for the account of api_key, or (None, 0)"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get("account") != key_fingerprint(api_key):
+                return None, 0
+            return VoiceCatalog(data["voices"], data.get("etag")), data.get("checked_at", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, 0
+
+    def save(self, catalog, api_key, checked_at=None):
+        """Store the catalogue, replacing the file atomically"""
+        data = {
+            "account": key_fingerprint(api_key),
+            "etag": catalog.etag,
+            "checked_at": checked_at or time.time(),
+            "voices": catalog.pairs(),
+        }
+        try:
+            with open(self.path + ".tmp", 'w') as f:
+                json.dump(data, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            logger.error("Error saving voice cache: %s", e)
+
+    def is_fresh(self, checked_at):
+        return time.time() - checked_at < self.ttl
@@ -0,0 +1,276 @@
+"""Asyncio conversion pipeline.
+
+AsyncVoiceConverter runs the same pipeline as VoiceConverter (segment queue,
+up to max_in_flight concurrent conversions, playback in recording order) as
+tasks on one event loop instead of a thread per conversion. Conversions that
+have not started playing can be cancelled, e.g. when the voice changes and
+their result would be in the old voice.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ConversionError
+from voice_converter.voice_converter import VoiceConverter
+
+logger = logging.getLogger(__name__)
+
+
+class _AsyncJob:
+    """A segment being converted on the event loop"""
+
+    def __init__(self, seq, segment, queue_wait=0.0):
+        self.seq = seq
+        self.segment = segment
+        self.queue_wait = queue_wait  # Seconds the segment waited for a conversion slot
+        self.deadline = time.monotonic() - queue_wait + config.SEGMENT_DEADLINE
+        self.voice_id = None
+        self.chunks = None  # asyncio.Queue of bytes, an exception, or None when finished
+        self.task = None
+        self.cancelled = False
+        self.started_playing = False  # Its first chunk went to playback, so it can't be redone
+
+
+class AsyncVoiceConverter(VoiceConverter):
+    """VoiceConverter whose conversion pipeline runs on an asyncio event loop
+
+    Use with an AsyncElevenLabsClient. Either await run() on an existing
+    loop (several converters can share one), or call start_processing() to
+    run it on a loop thread of its own, as the GUI does.
+
+    Args:
+        audio_manager: AudioManager that records and plays the audio
+        api_client: AsyncElevenLabsClient used for the conversions
+        settings_manager: Settings to read the voice, language and queue policy from
+        max_in_flight: Conversions sent to the API at the same time
+        latency: LatencyTracer to report segment timings to, a new one if None
+    """
+
+    def __init__(self, audio_manager, api_client, settings_manager=None, max_in_flight=None, latency=None):
+        super().__init__(audio_manager, api_client, settings_manager, max_in_flight, latency)
+        self.loop = None
+        self._loop_thread = None
+        self._segment_ready = None
+        self._stopped = None
+        self._in_flight = None
+        self._jobs = None  # Jobs in recording order, consumed by the player
+        self._waiting = []  # Jobs that have not started playing yet
+        self._playing = None
+        self._stop_requested = threading.Event()
+
+    async def run(self):
+        """Run the pipeline until stop() is called"""
+        self.loop = asyncio.get_running_loop()
+        self._segment_ready = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._jobs = asyncio.Queue()
+        self._waiting = []
+        self.running = True
+        if self._stop_requested.is_set():
+            self._stopped.set()
+
+        dispatcher = asyncio.ensure_future(self._dispatch())
+        player = asyncio.ensure_future(self._play_in_order())
+        try:
+            await self._stopped.wait()
+        finally:
+            self.running = False
+            dispatcher.cancel()
+            self._cancel_waiting()
+            if self._playing:
+                self._cancel_job(self._playing)
+            self._jobs.put_nowait(None)
+            await asyncio.gather(dispatcher, player, return_exceptions=True)
+            self._stop_requested.clear()
+
+    def stop(self):
+        """Stop the pipeline; safe to call from any thread"""
+        self.running = False
+        self._stop_requested.set()
+        if self.loop and self._stopped:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+
+    def start_processing(self):
+        """Run the pipeline on an event loop in a background thread"""
+        if self._loop_thread:
+            return
+
+        self.audio_queue.clear()
+        self._stop_requested.clear()
+        # Accept segments right away, they wait in the queue until the loop is up
+        self.running = True
+        self._loop_thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        self._loop_thread.start()
+
+    def stop_processing(self):
+        """Stop the pipeline and cancel running conversions"""
+        self.stop()
+        if self._loop_thread:
+            self._loop_thread.join(timeout=1.0)
+            self._loop_thread = None
+
+    def add_audio_to_queue(self, segment):
+        """Add a speech segment to the processing queue; safe to call from any thread"""
+        super().add_audio_to_queue(segment)
+        if self.loop and self._segment_ready:
+            self.loop.call_soon_threadsafe(self._segment_ready.set)
+
+    def set_voice(self, voice_id):
+        """Set the voice and re-convert segments that have not started playing"""
+        super().set_voice(voice_id)
+        if voice_id and self.running and self.loop:
+            self.loop.call_soon_threadsafe(self._supersede)
+
+    def idle(self):
+        """Return True when no segment is queued, converting or playing"""
+        return not len(self.audio_queue) and not self._waiting and self._playing is None
+
+    def cancel_pending(self):
+        """Drop queued segments and cancel conversions that have not started playing"""
+        self.audio_queue.clear()
+        if self.running and self.loop:
+            self.loop.call_soon_threadsafe(self._cancel_waiting)
+
+    async def _next_segment(self):
+        """Wait for the next queued segment"""
+        while True:
+            self._segment_ready.clear()
+            entry = self.audio_queue.get(timeout=0)
+            if entry is not None:
+                return entry
+            await self._segment_ready.wait()
+
+    async def _dispatch(self):
+        """Start a conversion task for each queued segment, up to max_in_flight at once"""
+        while True:
+            await self._in_flight.acquire()
+            try:
+                segment, queue_wait = await self._next_segment()
+            except asyncio.CancelledError:
+                self._in_flight.release()
+                raise
+
+            segment.trace.mark("dequeue")
+            self._sequence += 1
+            job = _AsyncJob(self._sequence, segment, queue_wait)
+            self._waiting.append(job)
+            self._jobs.put_nowait(job)
+            self._start_conversion(job, acquired=True)
+
+    def _start_conversion(self, job, acquired=False):
+        """Start converting a job, with the in-flight slot already taken if acquired"""
+        job.voice_id = self.voice_id
+        job.chunks = asyncio.Queue()
+        slot = {"held": acquired}  # Whether this attempt holds an in-flight slot
+        task = asyncio.ensure_future(self._convert(job, job.chunks, slot))
+        # A task cancelled before its first step never runs _convert at all, so the
+        # slot and the end of the chunks are handled when the task is done instead
+        task.add_done_callback(functools.partial(self._conversion_done, job.chunks, slot))
+        self._converting.add(task)
+        self._publish_pipeline()
+        job.task = task
+
+    def _conversion_done(self, chunks, slot, task):
+        chunks.put_nowait(None)
+        if slot["held"]:
+            slot["held"] = False
+            self._in_flight.release()
+        self._converting.discard(task)
+        self._publish_pipeline()
+
+    async def _convert(self, job, chunks, slot):
+        """Convert one segment, putting the received chunks on its queue"""
+        if not slot["held"]:
+            await self._in_flight.acquire()
+            slot["held"] = True
+        try:
+            # Resampling and encoding is CPU work, keep it off the loop
+            audio_data = await self.loop.run_in_executor(None, self.audio_manager.record_to_file, job.segment)
+            trace = job.segment.trace
+            trace.mark("upload_start")
+
+            logger.debug("Processing audio segment #%d (%.2f s, queued %.0f ms)",
+                         job.seq, job.segment.duration, job.queue_wait * 1000)
+
+            async for chunk in self.api_client.convert_speech_stream(
+                audio_data=audio_data,
+                voice_id=job.voice_id,
+                language_code=self.language_code,
+                output_format=config.STREAM_OUTPUT_FORMAT,
+                deadline=job.deadline
+            ):
+                trace.mark("first_byte")
+                chunks.put_nowait(chunk)
+            trace.mark("last_byte")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            chunks.put_nowait(e)
+
+    def _cancel_job(self, job):
+        job.cancelled = True
+        if job.task:
+            job.task.cancel()
+
+    def _cancel_waiting(self):
+        for job in self._waiting:
+            self._cancel_job(job)
+        self._waiting = []
+
+    def _supersede(self):
+        """Restart conversions made with a voice that is no longer selected
+
+        The job at the head of the queue is handed to the player before its
+        conversion is done; it is restarted too until its first chunk was played.
+        """
+        jobs = list(self._waiting)
+        if self._playing is not None:
+            jobs.insert(0, self._playing)
+        for job in jobs:
+            if job.voice_id != self.voice_id and not job.cancelled and not job.started_playing:
+                logger.info("Voice changed - re-converting segment #%d", job.seq)
+                job.task.cancel()
+                self._start_conversion(job)
+
+    async def _play_in_order(self):
+        """Stream converted segments into playback in recording order"""
+        while True:
+            job = await self._jobs.get()
+            if job is None:
+                break
+            if job in self._waiting:
+                self._waiting.remove(job)
+            if job.cancelled:
+                continue
+
+            self._playing = job
+            try:
+                if not await self.audio_manager.play_audio_stream_async(self._job_chunks(job),
+                                                                     trace=job.segment.trace):
+                    logger.warning("Received empty audio data from API (segment #%d)", job.seq)
+            except ConversionError as e:
+                self._report_error(e.error_info)
+            except Exception as e:
+                logger.error("Error in speech conversion: %s", e)
+            finally:
+                self._playing = None
+            self._publish_latency()
+
+    async def _job_chunks(self, job):
+        """Yield a job's converted chunks as they arrive, re-raising conversion errors"""
+        while True:
+            chunks = job.chunks
+            item = await chunks.get()
+            if chunks is not job.chunks:
+                continue  # The conversion was superseded meanwhile, read the new one
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            job.started_playing = True
+            yield item
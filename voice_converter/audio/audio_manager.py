@@ -1,34 +1,74 @@
+import asyncio
+import logging
+import threading
+
 import pyaudio
-import wave
-import time
-import io
-import subprocess
-import os
-import numpy as np
-from io import BytesIO
 from elevenlabs import play
 from voice_converter import config
-import sys
+from voice_converter.audio.calibration import Calibration
+from voice_converter.audio.capture import InputCapture
+from voice_converter.audio.encoders import UploadEncoder
+from voice_converter.audio.energy import EnergyMeter
+from voice_converter.audio.vad import SpeechSegmenter, create_vad
+from voice_converter.audio.segment_buffer import SegmentBuffer
+from voice_converter.audio.decoders import apply_gain, create_decoder, decode_pcm, pcm_sample_rate
+from voice_converter.audio.playback import PlaybackWorker
+from voice_converter.utils.metrics import LiveMetrics
+
+logger = logging.getLogger(__name__)
 
 class AudioManager:
-    def __init__(self, settings_manager=None):
-        self.p = pyaudio.PyAudio()
+    def __init__(self, settings_manager=None, pyaudio_instance=None, live_metrics=None):
+        # A PyAudio replacement can be passed in to run without a sound card
+        self.p = pyaudio_instance or pyaudio.PyAudio()
         self.settings_manager = settings_manager
         self.available_devices = self.get_available_devices()
         
+        # Latest input/output levels for live meters, published from the audio threads
+        self.live_metrics = live_metrics or LiveMetrics()
+        
+        # In-memory decoder for MP3 responses (None if neither miniaudio nor ffmpeg is available)
+        self.decoder = create_decoder()
+        
+        # Playback runs on its own thread so the next conversion can overlap it
+        self.playback = PlaybackWorker(self.p, metrics=self.live_metrics)
+        self.playback.start()
+        
+        # Resampling/compression of segments before upload
+        upload_sample_rate = config.UPLOAD_SAMPLE_RATE
+        upload_codec = config.UPLOAD_CODEC
+        if settings_manager:
+            upload_sample_rate = settings_manager.get("upload_sample_rate", upload_sample_rate)
+            upload_codec = settings_manager.get("upload_codec", upload_codec)
+        self.upload_encoder = UploadEncoder(config.RATE, upload_sample_rate, upload_codec)
+        
+        # Scratch space for level measurement on the capture thread
+        self.energy_meter = EnergyMeter(frame_size=config.FRAMES_PER_BUFFER)
+        
         # Initialize stream attribute
         self.stream = None
         self.recording_callback = None
+        # The stream callback only queues buffers; analysis runs on the capture's thread
+        self.capture = None
+        
+        # Threshold calibration fed from the capture stream (or a stream of its own)
+        self.calibration = None
+        self.auto_calibration = None
+        self._calibration_stream = None
+        self._calibration_capture = None
         
         # Load saved settings if available
         self.volume = config.DEFAULT_VOLUME
         self.input_device = None
         self.output_device = None
         self.silence_threshold = config.DEFAULT_SILENCE_THRESHOLD
+        self.vad_engine = config.VAD_ENGINE
+        self.segmenter = None
         
         if settings_manager:
             self.volume = settings_manager.get("volume", config.DEFAULT_VOLUME)
             self.silence_threshold = settings_manager.get("silence_threshold", config.DEFAULT_SILENCE_THRESHOLD)
+            self.vad_engine = settings_manager.get("vad_engine", config.VAD_ENGINE)
             
             # Try to set input device
             input_device = settings_manager.get("input_device")
@@ -71,13 +111,13 @@ def set_input_device(self, device_idx):
                 device_info = self.p.get_device_info_by_index(device_idx)
                 if device_info and device_info.get('maxInputChannels') > 0:
                     self.input_device = device_idx
-                    print(f"Input device set to: {device_info['name']}")
+                    logger.info("Input device set to: %s", device_info['name'])
                     if self.settings_manager:
                         self.settings_manager.set("input_device", device_idx)
                     return True
             return False
         except Exception as e:
-            print(f"Error setting input device: {e}")
+            logger.error("Error setting input device: %s", e)
             return False
     
     def set_output_device(self, device_idx):
@@ -89,13 +129,13 @@ def set_output_device(self, device_idx):
                 device_info = self.p.get_device_info_by_index(device_idx)
                 if device_info and device_info.get('maxOutputChannels') > 0:
                     self.output_device = device_idx
-                    print(f"Output device set to: {device_info['name']}")
+                    logger.info("Output device set to: %s", device_info['name'])
                     if self.settings_manager:
                         self.settings_manager.set("output_device", device_idx)
                     return True
             return False
         except Exception as e:
-            print(f"Error setting output device: {e}")
+            logger.error("Error setting output device: %s", e)
             return False
     
     def set_volume(self, volume):
@@ -105,108 +145,161 @@ def set_volume(self, volume):
         if self.settings_manager:
             self.settings_manager.set("volume", self.volume)
     
-    def record_to_file(self, frames):
-        """Convert frames to an in-memory audio file"""
-        in_memory_wav = BytesIO()
-        
-        wf = wave.open(in_memory_wav, 'wb')
-        wf.setnchannels(config.CHANNELS)
-        wf.setsampwidth(self.p.get_sample_size(pyaudio.paInt16))
-        wf.setframerate(config.RATE)
-        wf.writeframes(b''.join(frames))
-        wf.close()
-        
-        # Reset buffer position to the beginning
-        in_memory_wav.seek(0)
-        return in_memory_wav
+    def record_to_file(self, segment):
+        """Convert a segment to an in-memory audio file for upload
+        
+        The audio is resampled and encoded as configured by
+        config.UPLOAD_SAMPLE_RATE and config.UPLOAD_CODEC. WAV uploads
+        reference the segment's memory instead of copying it.
+        
+        Args:
+            segment: A SegmentBuffer or a list of raw frames
+        """
+        if not isinstance(segment, SegmentBuffer):
+            segment = SegmentBuffer.from_frames(segment, config.RATE, config.CHANNELS)
+        return self.upload_encoder.encode(segment)
     
-    def play_audio(self, audio_data):
+    def play_audio(self, audio_data, output_format=None):
         """Play audio data through the system
         
         Args:
-            audio_data: Audio data in MP3 format
+            audio_data: Converted audio in MP3 format, or raw PCM for "pcm_*" output formats
+            output_format: API output format of audio_data
         """
         try:
-            # Cleanup old temp files periodically
-            self.cleanup_temp_files()
-            
-            # Fehlendes Volumen-Adjustment hinzufügen
-            ffmpeg_cmd = ["ffmpeg", "-y", "-i", "-"]
-            
-            # Apply volume adjustment
-            ffmpeg_cmd.extend(["-af", f"volume={self.volume}"])
-            
-            # Output device selection (vereinfacht)
-            if self.output_device is not None:
-                try:
-                    # Direktes Abspielen über PyAudio ohne FFmpeg
-                    return self.play_audio_with_pyaudio(audio_data)
-                except Exception as e:
-                    print(f"Error with PyAudio playback: {e}")
-                    # Fallback to FFmpeg
-            
+            return self.play_audio_with_pyaudio(audio_data, output_format)
+        except Exception as e:
+            logger.error("Error with PyAudio playback: %s", e)
+        
+        if pcm_sample_rate(output_format):
+            # Raw PCM can't be handed to the fallback player
+            return False
+        
+        try:
             # Fallback: Use elevenlabs play function
-            print("Using elevenlabs play function as fallback")
+            logger.info("Using elevenlabs play function as fallback")
             play(audio_data)
-            
+            return True
         except Exception as e:
-            print(f"Error playing audio: {e}")
-            # Final fallback
-            play(audio_data)
+            logger.error("Error playing audio: %s", e)
+            return False
+
+    def decode_audio(self, audio_data, output_format=None):
+        """Decode converted audio into int16 samples in memory
+        
+        Returns:
+            DecodedAudio: Samples, sample rate and channel count
+        """
+        sample_rate = pcm_sample_rate(output_format)
+        if sample_rate:
+            return decode_pcm(audio_data, sample_rate)
+        if self.decoder is None:
+            raise RuntimeError("No MP3 decoder available (install miniaudio or ffmpeg)")
+        return self.decoder.decode(audio_data)
 
-    def play_audio_with_pyaudio(self, audio_data):
-        """Play audio using PyAudio directly with selected output device"""
-        # Speichere Audio in temporäre Datei
-        temp_dir = os.path.join(os.path.expanduser("~"), "elevenlabs_temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_file = os.path.join(temp_dir, f"output_{time.time()}.mp3")
-        
-        with open(temp_file, "wb") as f:
-            f.write(audio_data)
-        
-        # Konvertiere MP3 zu WAV mit FFmpeg für einfacheres Abspielen
-        wav_file = os.path.join(temp_dir, f"output_{time.time()}.wav")
-        
-        # Einfaches Konvertieren ohne Gerätespezifikation
-        subprocess.run([
-            "ffmpeg", "-y", "-i", temp_file, 
-            "-af", f"volume={self.volume}", 
-            "-hide_banner", "-loglevel", "error",
-            wav_file
-        ], check=True)
-        
-        # WAV-Datei mit PyAudio abspielen
-        wf = wave.open(wav_file, 'rb')
-        
-        # Öffne Stream mit dem ausgewählten Ausgabegerät
-        stream = self.p.open(
-            format=self.p.get_format_from_width(wf.getsampwidth()),
-            channels=wf.getnchannels(),
-            rate=wf.getframerate(),
-            output=True,
-            output_device_index=self.output_device
+    def play_audio_with_pyaudio(self, audio_data, output_format=None):
+        """Queue audio for playback on the selected output device
+        
+        Returns as soon as the samples are queued; the playback worker plays them.
+        """
+        decoded = self.decode_audio(audio_data, output_format)
+        self.playback.write(
+            apply_gain(decoded.samples, self.volume),
+            decoded.sample_rate,
+            decoded.channels,
+            device=self.output_device
         )
+        return True
+    
+    def play_audio_stream(self, chunks, sample_rate=None, trace=None):
+        """Queue converted audio for playback while it is still being received
         
-        # Lese und spiele Daten
-        data = wf.readframes(1024)
-        while data:
-            stream.write(data)
-            data = wf.readframes(1024)
+        Each chunk is handed to the playback worker as soon as it arrives, so
+        playback starts with the first chunk instead of after the whole response.
         
-        # Aufräumen
-        stream.stop_stream()
-        stream.close()
+        Args:
+            chunks: Iterable of raw 16-bit mono PCM chunks (config.STREAM_OUTPUT_FORMAT)
+            sample_rate: Sample rate of the PCM data, defaults to config.STREAM_SAMPLE_RATE
+            trace: SegmentTrace to mark decoding and playback of the segment on
+            
+        Returns:
+            bool: True if any audio was queued
+        """
+        sample_rate = sample_rate or config.STREAM_SAMPLE_RATE
         
-        # Temporäre Dateien löschen
+        played = False
+        remainder = b''
+        self.playback.begin_segment(trace)
         try:
-            os.remove(temp_file)
-            os.remove(wav_file)
-        except:
-            pass
+            for chunk in chunks:
+                samples, remainder = self._stream_samples(chunk, remainder, sample_rate)
+                if samples is None:
+                    continue
+                self.playback.write(samples, sample_rate, device=self.output_device)
+                played = True
+            if trace:
+                trace.mark("decode_done")
+        finally:
+            self.playback.end_segment()
         
-        return True
+        return played
+    
+    async def play_audio_stream_async(self, chunks, sample_rate=None, trace=None):
+        """Asyncio version of play_audio_stream() for an async iterable of chunks
+        
+        Instead of blocking while the playback buffer is full, waits on the
+        event loop until there is room, so other conversions keep running.
+        
+        Returns:
+            bool: True if any audio was queued
+        """
+        sample_rate = sample_rate or config.STREAM_SAMPLE_RATE
+        
+        played = False
+        remainder = b''
+        self.playback.begin_segment(trace)
+        try:
+            async for chunk in chunks:
+                samples, remainder = self._stream_samples(chunk, remainder, sample_rate)
+                if samples is None:
+                    continue
+                while not self.playback.has_room(len(samples)):
+                    await asyncio.sleep(config.PLAYBACK_BLOCK_SIZE / sample_rate)
+                self.playback.write(samples, sample_rate, device=self.output_device)
+                played = True
+            if trace:
+                trace.mark("decode_done")
+        finally:
+            self.playback.end_segment()
+        
+        return played
+    
+    def _stream_samples(self, chunk, remainder, sample_rate):
+        """Turn a streamed PCM chunk into playable samples
+        
+        Chunks can end in the middle of a sample, so the odd byte is carried
+        over to the next chunk.
+        
+        Returns:
+            tuple: (int16 samples with the volume applied or None, remainder bytes)
+        """
+        if remainder:
+            chunk = remainder + chunk
+        usable = len(chunk) - (len(chunk) % 2)
+        if not usable:
+            return None, chunk
+        samples = decode_pcm(chunk[:usable], sample_rate).samples
+        return apply_gain(samples, self.volume), chunk[usable:]
+    
+    def get_playback_metrics(self):
+        """Return playback statistics (underruns, queue depth) from the playback worker"""
+        return self.playback.metrics()
     
     def __del__(self):
+        if getattr(self, 'playback', None):
+            self.playback.stop()
+        if getattr(self, 'decoder', None):
+            self.decoder.close()
         if hasattr(self, 'p'):
             self.p.terminate()
 
@@ -220,153 +313,233 @@ def start_recording(self, callback=None):
             bool: True if recording started successfully
         """
         if self.stream:
-            print("Already recording")
+            logger.warning("Already recording")
             return False
         
         try:
-            # Store the callback for use in the audio thread
+            # Store the callback for use on the capture thread
             self.recording_callback = callback
             
+            # Speech detection runs on every captured buffer
+            self.segmenter = SpeechSegmenter(
+                create_vad(self.vad_engine, config.RATE, self.silence_threshold),
+                frames_per_buffer=config.FRAMES_PER_BUFFER
+            )
+            
+            # A calibration in progress continues on the recording stream
+            self._close_calibration_stream()
+            
             # Set up a new stream for recording
+            self.capture = InputCapture(self._analyse_recorded)
+            self.capture.start()
             self.stream = self.p.open(
                 format=pyaudio.paInt16,
-                channels=1,
-                rate=44100,
+                channels=config.CHANNELS,
+                rate=config.RATE,
                 input=True,
                 input_device_index=self.input_device,
-                frames_per_buffer=1024,
-                stream_callback=self._audio_callback
+                frames_per_buffer=config.FRAMES_PER_BUFFER,
+                stream_callback=self.capture.callback
             )
             
-            # Initialize speech detection variables
-            self.frames_buffer = []
-            self.is_speech_active = False
-            self.silence_frames = 0
-            self.speech_start_time = time.time()
-            self.last_process_time = time.time()
-            
-            print("Recording started")
+            logger.info("Recording started")
             return True
         except Exception as e:
-            print(f"Error starting recording: {e}")
+            logger.error("Error starting recording: %s", e)
+            if self.capture is not None:
+                self.capture.stop(drain=False)
             return False
 
     def stop_recording(self):
         """Stop recording audio"""
         if not hasattr(self, 'stream') or self.stream is None:
-            print("Not recording")
+            logger.warning("Not recording")
             return False
         
         try:
             self.stream.stop_stream()
             self.stream.close()
             self.stream = None
+            # Buffers still queued are analysed, so the end of the recording is not lost
+            self.capture.stop()
             self.recording_callback = None
-            print("Recording stopped")
+            logger.info("Recording stopped")
+            if self.calibration is not None:
+                self._open_calibration_stream()
             return True
         except Exception as e:
-            print(f"Error stopping recording: {e}")
+            logger.error("Error stopping recording: %s", e)
             # Still set stream to None to clean up
             self.stream = None
+            if self.capture is not None:
+                self.capture.stop(drain=False)
             return False
 
-    def _audio_callback(self, in_data, frame_count, time_info, status):
-        """Callback function for processing audio data from the microphone"""
-        try:
-            # Process the incoming audio data
-            audio_data = in_data
-            
-            # Add to buffer
-            self.frames_buffer.append(audio_data)
-            
-            # Simple speech detection based on amplitude
-            is_silence = self._is_silence(audio_data)
-            current_time = time.time()
-            
-            if not is_silence:
-                # Reset silence counter when speech is detected
-                self.silence_frames = 0
-                
-                if not self.is_speech_active:
-                    # Speech just started
-                    self.is_speech_active = True
-                    self.speech_start_time = current_time
-                    print("Speech detected")
-            else:
-                # Count consecutive silence frames
-                self.silence_frames += 1
-                
-                # If we've had enough silence, consider speech ended
-                if self.is_speech_active:
-                    # Längere Stille (15 frames, ~300ms) für bessere Sprachsegmentierung
-                    if self.silence_frames >= 15:  
-                        print("Speech segment ended")
-                        # Send the buffered frames to the callback
-                        if self.recording_callback and self.frames_buffer:
-                            self.recording_callback(self.frames_buffer)
-                        
-                        # Reset buffer and state
-                        self.frames_buffer = []
-                        self.is_speech_active = False
-                    # Erhöhe die maximale Sprechdauer auf 5 Sekunden für natürlichere Pausen
-                    elif current_time - self.speech_start_time >= 5.0:
-                        print("Maximum speech segment duration reached")
-                        if self.recording_callback and self.frames_buffer:
-                            self.recording_callback(self.frames_buffer)
-                        self.frames_buffer = []
-                        self.is_speech_active = False
-            
-            # Continue processing
-            return (None, pyaudio.paContinue)
-        except Exception as e:
-            print(f"Error in audio callback: {e}")
-            return (None, pyaudio.paContinue)
+    def _analyse_recorded(self, samples):
+        """Detect speech in a captured buffer (capture thread, not the PortAudio callback)"""
+        # Hand finished speech segments to the callback
+        segment = self.segmenter.process(samples)
+        if segment and self.recording_callback:
+            self.recording_callback(segment)
+        
+        self._publish_input_level(samples, self.segmenter.vad.level, self.segmenter.is_speech_active)
+        
+        # The VAD has already measured the buffer level
+        if self.calibration is not None or self.auto_calibration is not None:
+            self._feed_calibration(self.segmenter.vad.level)
+
+    def get_capture_stats(self):
+        """Return capture statistics of the current or last recording
+        
+        Returns:
+            dict: Buffers captured and analysed, buffers dropped because the
+            analysis thread was behind, input overflows and underflows
+            reported by PortAudio, and the analysis backlog; None before
+            the first recording
+        """
+        if self.capture is None:
+            return None
+        return self.capture.stats()
+
+    def get_segmentation_stats(self):
+        """Return speech segmentation statistics for the current or last recording
+        
+        Returns:
+            dict: Seconds captured, sent, trimmed and saved (see SpeechSegmenter.stats), or None
+        """
+        if self.segmenter is None:
+            return None
+        return self.segmenter.stats()
+
+    def set_vad_engine(self, name):
+        """Select the voice activity detection engine (takes effect on the next recording)"""
+        create_vad(name, config.RATE, self.silence_threshold)  # Validate the name
+        self.vad_engine = name
+        if self.settings_manager:
+            self.settings_manager.set("vad_engine", name)
 
-    def _is_silence(self, audio_data):
-        """Check if audio data is silence based on amplitude threshold"""
-        if not audio_data:
+    def calibrate(self, seconds=config.CALIBRATION_SECONDS, on_progress=None, on_done=None):
+        """Measure the noise floor and work out a silence threshold, without blocking
+        
+        Taps the capture stream while recording, otherwise opens an input
+        stream of its own for the duration. The threshold is not applied; pass
+        it to set_silence_threshold() from on_done.
+        
+        Args:
+            seconds: Audio to analyse; the room should be quiet meanwhile
+            on_progress: Called with the percentage done (on the capture thread)
+            on_done: Called with the threshold and noise statistics (on the capture thread)
+            
+        Returns:
+            bool: True if calibration started
+        """
+        buffers = max(1, int(seconds * config.RATE / config.FRAMES_PER_BUFFER))
+        self.calibration = Calibration(buffers, on_progress=on_progress, on_done=on_done)
+        if self.stream is not None or self._calibration_stream is not None:
             return True
+        return self._open_calibration_stream()
+    
+    def _open_calibration_stream(self):
+        """Capture for calibration on a callback stream, so no thread blocks on reads"""
+        capture = InputCapture(self._analyse_calibration, name="calibration-analysis")
+        capture.start()
+        try:
+            self._calibration_stream = self.p.open(
+                format=pyaudio.paInt16,
+                channels=config.CHANNELS,
+                rate=config.RATE,
+                input=True,
+                input_device_index=self.input_device,
+                frames_per_buffer=config.FRAMES_PER_BUFFER,
+                stream_callback=capture.callback
+            )
+            self._calibration_capture = capture
+            return True
+        except Exception as e:
+            logger.error("Error starting calibration: %s", e)
+            capture.stop(drain=False)
+            self.calibration = None
+            return False
+    
+    def cancel_calibration(self):
+        """Stop a calibration started with calibrate()"""
+        self.calibration = None
+        self._close_calibration_stream()
+    
+    def start_auto_calibration(self, on_update=None):
+        """Keep adjusting the silence threshold to the noise floor while recording
         
+        Uses a low percentile of the levels of the last CALIBRATION_HALF_LIFE
+        seconds, so speech does not raise it. New thresholds are applied to
+        the running VAD directly and reported to on_update (on the capture
+        thread), which may save them.
+        """
+        buffers_per_second = config.RATE / config.FRAMES_PER_BUFFER
+        self.auto_calibration = Calibration(
+            on_update=on_update,
+            half_life=config.CALIBRATION_HALF_LIFE * buffers_per_second,
+            update_every=max(1, int(config.CALIBRATION_UPDATE_INTERVAL * buffers_per_second))
+        )
+    
+    def stop_auto_calibration(self):
+        self.auto_calibration = None
+    
+    def _analyse_calibration(self, samples):
+        """Measure a buffer of the stream calibrate() opens when not recording (capture thread)"""
+        level = self.energy_meter.rms(samples)
+        self._feed_calibration(level)
+        self._publish_input_level(samples, level, False)
+    
+    def _publish_input_level(self, samples, level, speech):
+        """Publish the level of a captured buffer for live meters (capture thread)"""
+        self.live_metrics.publish(
+            "input",
+            rms=level,
+            peak=self.energy_meter.peak(samples),
+            speech=speech,
+            threshold=self.silence_threshold,
+        )
+    
+    def _feed_calibration(self, level):
+        """Add a buffer level to the running calibrations (capture thread)"""
+        calibration = self.calibration
+        if calibration is not None:
+            calibration.feed(level)
+            if calibration.done:
+                self.calibration = None
+                if self._calibration_stream is not None:
+                    # paComplete ends the stream; it is closed off the capture thread, which cannot join itself
+                    self._calibration_capture.complete = True
+                    stream, self._calibration_stream = self._calibration_stream, None
+                    capture, self._calibration_capture = self._calibration_capture, None
+                    threading.Thread(target=self._close_stream, args=(stream, capture), daemon=True).start()
+        
+        auto_calibration = self.auto_calibration
+        if auto_calibration is not None:
+            threshold = auto_calibration.feed(level)
+            if threshold is not None:
+                self.silence_threshold = threshold
+                if self.segmenter:
+                    self.segmenter.vad.set_threshold(threshold)
+    
+    def _close_calibration_stream(self):
+        stream, self._calibration_stream = self._calibration_stream, None
+        capture, self._calibration_capture = self._calibration_capture, None
+        if stream is not None:
+            self._close_stream(stream, capture)
+    
+    def _close_stream(self, stream, capture):
         try:
-            # Convert to numpy array for easier processing
-            audio_array = np.frombuffer(audio_data, dtype=np.int16)
-            
-            # Check if array is empty or contains only zeros
-            if len(audio_array) == 0 or np.all(audio_array == 0):
-                return True
-            
-            # Calculate RMS amplitude
-            amplitude = np.sqrt(np.mean(np.square(audio_array.astype(float))))
-            
-            # Check against threshold (default to 200 if not set)
-            threshold = getattr(self, 'silence_threshold', 200)
-            return amplitude < threshold
+            stream.stop_stream()
+            stream.close()
         except Exception as e:
-            print(f"Error analyzing audio: {e}")
-            return True  # Treat as silence in case of error
+            logger.error("Error closing calibration stream: %s", e)
+        capture.stop(drain=False)
 
     def set_silence_threshold(self, threshold):
         """Set the silence threshold value"""
         self.silence_threshold = threshold
+        if self.segmenter:
+            self.segmenter.vad.set_threshold(threshold)
         if self.settings_manager:
             self.settings_manager.set("silence_threshold", threshold)
-
-    def cleanup_temp_files(self):
-        """Clean up old temporary audio files"""
-        try:
-            temp_dir = os.path.join(os.path.expanduser("~"), "elevenlabs_temp")
-            if not os.path.exists(temp_dir):
-                return
-            
-            # Delete temporary files older than 10 minutes
-            current_time = time.time()
-            for filename in os.listdir(temp_dir):
-                file_path = os.path.join(temp_dir, filename)
-                # Check if it's a file (not a subdirectory)
-                if os.path.isfile(file_path):
-                    # Check if the file is older than 10 minutes
-                    if current_time - os.path.getctime(file_path) > 600:  # 600 seconds = 10 minutes
-                        os.remove(file_path)
-                        print(f"Old temporary file deleted: {filename}")
-        except Exception as e:
-            print(f"Error cleaning up temporary files: {e}") 
\ No newline at end of file
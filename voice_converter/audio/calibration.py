@@ -0,0 +1,130 @@
+"""Silence threshold calibration from the captured audio.
+
+The noise floor is a low percentile of the per-buffer RMS levels, kept in a
+log-spaced histogram so every buffer costs one bin increment on the audio
+thread and speech or a cough during calibration does not raise the floor the
+way a mean would. For continuous recalibration older buffers are forgotten
+exponentially (with a half-life in seconds of audio).
+"""
+
+import math
+
+import numpy as np
+
+from voice_converter import config
+
+LEVEL_BINS_PER_OCTAVE = 8  # Histogram resolution, ~9% per bin
+MAX_LEVEL = 32768.0
+
+
+class NoiseFloorEstimator:
+    """Incremental percentiles of buffer RMS levels
+
+    Args:
+        half_life: Buffers after which a level counts half, None to never forget
+    """
+
+    def __init__(self, half_life=None):
+        self.bins = np.zeros(int(math.log2(MAX_LEVEL) * LEVEL_BINS_PER_OCTAVE) + 2)
+        self.decay = 0.5 ** (1.0 / half_life) if half_life else 1.0
+        self._weight = 1.0  # Weight of the next level; grows instead of decaying every bin
+        self.count = 0  # Levels added
+
+    def add(self, level):
+        """Add the RMS level of one buffer"""
+        index = 0 if level < 1.0 else min(len(self.bins) - 1, 1 + int(math.log2(level) * LEVEL_BINS_PER_OCTAVE))
+        self.bins[index] += self._weight
+        self.count += 1
+        if self.decay < 1.0:
+            self._weight /= self.decay
+            if self._weight > 1e100:
+                self.bins /= self._weight
+                self._weight = 1.0
+
+    def percentile(self, q):
+        """Return the level below which q percent of the (weighted) buffers fall, 0 if empty"""
+        total = self.bins.sum()
+        if not total:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.bins), total * q / 100.0))
+        # Upper edge of the bin, so the estimate errs towards a higher floor
+        return 0.0 if index == 0 else min(MAX_LEVEL, 2.0 ** (index / LEVEL_BINS_PER_OCTAVE))
+
+    def noise_floor(self):
+        return self.percentile(config.CALIBRATION_PERCENTILE)
+
+    def threshold(self):
+        """Return the silence threshold for the estimated noise floor"""
+        return max(config.CALIBRATION_MIN_THRESHOLD, int(self.noise_floor() * config.CALIBRATION_MARGIN))
+
+    def stats(self):
+        return {
+            "buffers": self.count,
+            "p10": self.percentile(10),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "noise_floor": self.noise_floor(),
+            "threshold": self.threshold(),
+        }
+
+
+class Calibration:
+    """A calibration fed with buffer levels from the capture thread
+
+    The callbacks are called on the capture thread; a GUI has to hand them to
+    its own thread (e.g. with root.after).
+
+    Args:
+        buffers: Levels to collect for a one-off calibration, None to run until stopped
+        on_progress: Called with the percentage done whenever it grows by 5
+        on_done: Called with the threshold and the estimator stats when a one-off calibration is done
+        on_update: Called with the threshold when a continuous calibration changes it
+        half_life: Buffers after which a level counts half (continuous calibration)
+        update_every: Buffers between threshold updates (continuous calibration)
+    """
+
+    def __init__(self, buffers=None, on_progress=None, on_done=None, on_update=None,
+                 half_life=None, update_every=None):
+        self.estimator = NoiseFloorEstimator(half_life)
+        self.buffers = buffers
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_update = on_update
+        self.update_every = update_every
+        self.threshold = None
+        self.done = False
+        self._reported = 0
+
+    def feed(self, level):
+        """Add one buffer level
+
+        Returns:
+            int: A new threshold to apply, or None
+        """
+        if self.done:
+            return None
+        estimator = self.estimator
+        estimator.add(level)
+
+        if self.buffers is not None:
+            progress = 100 * estimator.count // self.buffers
+            if self.on_progress and progress >= self._reported + 5:
+                self._reported = progress - progress % 5
+                self.on_progress(min(100, self._reported))
+            if estimator.count >= self.buffers:
+                self.done = True
+                self.threshold = estimator.threshold()
+                if self.on_done:
+                    self.on_done(self.threshold, estimator.stats())
+                return self.threshold
+            return None
+
+        if estimator.count % self.update_every == 0:
+            threshold = estimator.threshold()
+            # Small changes are noise of the estimate, not of the room
+            if self.threshold is None or abs(threshold - self.threshold) > self.threshold * config.CALIBRATION_HYSTERESIS:
+                self.threshold = threshold
+                if self.on_update:
+                    self.on_update(threshold)
+                return threshold
+        return None
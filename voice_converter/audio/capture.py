@@ -0,0 +1,193 @@
+"""Hand-off of captured audio from the PortAudio callback to an analysis thread.
+
+The input callback runs on PortAudio's real-time thread, where any wait
+(a lock, the allocator, the GIL held by a busy thread for long) delays the
+next buffer and makes the device overflow. The callback here only counts
+the status flags and copies the buffer into a preallocated single-producer
+single-consumer ring; voice activity detection, segmentation, calibration
+and handing segments to the converter run on a thread of their own. If that
+thread falls behind for longer than the ring holds, new buffers are dropped
+and counted instead of blocking the callback.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+import pyaudio
+
+from voice_converter import config
+
+logger = logging.getLogger(__name__)
+
+
+class SPSCRingBuffer:
+    """Fixed-size slots of int16 audio passed from one producer to one consumer without locks
+
+    The producer only advances write_index and the consumer only advances
+    read_index, each after it is done with the slot, so neither ever waits
+    for the other. Under the GIL the index assignments are atomic.
+
+    Args:
+        slots: Number of buffers the ring holds
+        slot_size: Samples per slot (the stream's frames per buffer)
+    """
+
+    def __init__(self, slots, slot_size):
+        self.slots = slots
+        self.slot_size = slot_size
+        self._data = np.zeros((slots, slot_size), dtype=np.int16)
+        self._lengths = np.zeros(slots, dtype=np.int64)
+        self.write_index = 0
+        self.read_index = 0
+
+    def __len__(self):
+        return self.write_index - self.read_index
+
+    def push(self, data):
+        """Copy one buffer of PCM bytes into the next free slot (producer)
+
+        Returns:
+            bool: False if the ring was full and the buffer was dropped
+        """
+        index = self.write_index
+        if index - self.read_index >= self.slots:
+            return False
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = min(len(samples), self.slot_size)  # PortAudio delivers frames_per_buffer samples
+        slot = index % self.slots
+        self._data[slot, :count] = samples[:count]
+        self._lengths[slot] = count
+        self.write_index = index + 1  # Publish the slot only once it is filled
+        return True
+
+    def peek(self):
+        """Return a view of the oldest filled slot, or None if empty (consumer)
+
+        The view stays valid until release() is called.
+        """
+        index = self.read_index
+        if index == self.write_index:
+            return None
+        slot = index % self.slots
+        return self._data[slot, :self._lengths[slot]]
+
+    def release(self):
+        """Give the slot returned by peek() back to the producer (consumer)"""
+        self.read_index += 1
+
+
+class InputCapture:
+    """Stream callback that queues buffers for an analysis thread
+
+    Pass callback as the stream_callback of an input stream, call start()
+    before opening the stream and stop() after closing it.
+
+    Args:
+        process: Called with each buffer as an int16 array on the analysis
+            thread; the array is only valid during the call
+        frames_per_buffer: Samples per buffer of the stream
+        rate: Sample rate, for the ring size and the polling interval
+        seconds: Audio the ring holds while the analysis thread is busy
+        name: Thread name, for logs and profilers
+    """
+
+    def __init__(self, process, frames_per_buffer=config.FRAMES_PER_BUFFER, rate=config.RATE,
+                 seconds=config.CAPTURE_BUFFER_SECONDS, name="audio-analysis"):
+        self.process = process
+        self.ring = SPSCRingBuffer(max(2, int(seconds * rate / frames_per_buffer)), frames_per_buffer)
+        # The callback never signals the thread (that would take a lock); it polls
+        self.poll_interval = frames_per_buffer / rate / 4
+        self.name = name
+        self.complete = False  # Set to make the callback end the stream with paComplete
+        self._running = False
+        self._thread = None
+
+        # Written by the callback only
+        self.buffers = 0
+        self.dropped = 0  # Buffers lost because the analysis thread was behind
+        self.input_overflows = 0  # PortAudio reported lost input before this buffer
+        self.input_underflows = 0  # PortAudio padded this buffer with silence
+        # Written by the analysis thread only
+        self.processed = 0
+        self.max_backlog = 0
+        self._reported_losses = 0
+
+    def callback(self, in_data, frame_count, time_info, status):
+        """PortAudio input callback: count status flags and queue the buffer, nothing else"""
+        if status:
+            if status & pyaudio.paInputOverflow:
+                self.input_overflows += 1
+            if status & pyaudio.paInputUnderflow:
+                self.input_underflows += 1
+        self.buffers += 1
+        if not self.ring.push(in_data):
+            self.dropped += 1
+        return (None, pyaudio.paComplete if self.complete else pyaudio.paContinue)
+
+    def start(self):
+        """Start the analysis thread"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, drain=True):
+        """Stop the analysis thread once the stream is closed
+
+        Args:
+            drain: Process the buffers still queued before returning
+        """
+        self._running = False
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+        if drain and thread is not threading.current_thread():
+            self._drain()
+
+    def stats(self):
+        return {
+            "buffers": self.buffers,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+            "backlog": len(self.ring),
+            "max_backlog": self.max_backlog,
+        }
+
+    def _run(self):
+        while self._running:
+            if not self._drain():
+                time.sleep(self.poll_interval)
+
+    def _drain(self):
+        """Process all queued buffers, return the number processed"""
+        ring = self.ring
+        backlog = len(ring)
+        if backlog > self.max_backlog:
+            self.max_backlog = backlog
+        count = 0
+        while True:
+            samples = ring.peek()
+            if samples is None:
+                break
+            try:
+                self.process(samples)
+            except Exception as e:
+                logger.error("Error analysing captured audio: %s", e)
+            ring.release()
+            count += 1
+        self.processed += count
+        self._report_losses()
+        return count
+
+    def _report_losses(self):
+        # Logged here rather than in the callback; repeats are rate-limited by the log filter
+        losses = self.dropped + self.input_overflows
+        if losses > self._reported_losses:
+            logger.warning("Captured audio lost: %d buffers dropped (analysis behind), "
+                           "%d input overflows reported by the device",
+                           self.dropped, self.input_overflows)
+            self._reported_losses = losses
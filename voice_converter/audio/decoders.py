@@ -0,0 +1,165 @@
+"""Decoders that turn converted audio from the API into PCM samples in memory.
+
+Raw PCM responses (``pcm_*`` output formats) are used as-is. MP3 is decoded
+with ``miniaudio`` when it is installed; otherwise with an ffmpeg process
+per response, fed and read through pipes.
+"""
+
+import collections
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from voice_converter import config
+
+DecodedAudio = collections.namedtuple("DecodedAudio", ["samples", "sample_rate", "channels"])
+
+try:
+    import miniaudio
+except ImportError:  # Optional dependency
+    miniaudio = None
+
+
+def pcm_sample_rate(output_format):
+    """Return the sample rate of a "pcm_<rate>" output format, or None for other formats"""
+    if output_format and output_format.startswith("pcm_"):
+        return int(output_format.split("_", 1)[1])
+    return None
+
+
+def decode_pcm(data, sample_rate):
+    """Wrap raw 16-bit mono PCM bytes in a DecodedAudio without copying"""
+    usable = len(data) - (len(data) % 2)
+    return DecodedAudio(np.frombuffer(data, dtype=np.int16, count=usable // 2), sample_rate, 1)
+
+
+def apply_gain(samples, volume):
+    """Scale int16 samples by a volume between 0.0 and 1.0
+
+    Returns:
+        numpy.ndarray: The scaled samples (the input itself at full volume)
+    """
+    if volume >= 1.0:
+        return samples
+    return np.multiply(samples, volume, dtype=np.float32).astype(np.int16)
+
+
+class AudioDecoder:
+    """Base class for MP3 decoders"""
+
+    name = "base"
+
+    def decode(self, data):
+        """Decode a complete MP3 file
+
+        Args:
+            data: MP3 bytes
+
+        Returns:
+            DecodedAudio: int16 samples, sample rate and channel count
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the decoder"""
+
+
+class MiniaudioDecoder(AudioDecoder):
+    """Decode MP3 in-process with the miniaudio package"""
+
+    name = "miniaudio"
+
+    def decode(self, data):
+        decoded = miniaudio.decode(bytes(data), output_format=miniaudio.SampleFormat.SIGNED16)
+        samples = np.frombuffer(decoded.samples, dtype=np.int16)
+        return DecodedAudio(samples, decoded.sample_rate, decoded.nchannels)
+
+
+class FFmpegPipeDecoder(AudioDecoder):
+    """Decode MP3 through an ffmpeg process per call, over pipes instead of temporary files
+
+    The MP3 data is written to ffmpeg's stdin on a writer thread and stdin is
+    closed, so ffmpeg flushes its decoder delay and tail samples and exits;
+    the PCM is read from stdout up to end of file. Every call therefore
+    returns exactly the samples of its input, however long decoding takes,
+    and nothing carries over into the next call. A decode only fails if
+    ffmpeg produces no output at all for ``stall_timeout`` seconds.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, sample_rate=config.STREAM_SAMPLE_RATE, stall_timeout=10.0):
+        self.sample_rate = sample_rate
+        self.stall_timeout = stall_timeout
+
+    def _command(self):
+        return [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "mp3", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1"
+        ]
+
+    def decode(self, data):
+        process = subprocess.Popen(self._command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        output = bytearray()
+        condition = threading.Condition()
+        finished = []
+
+        def write_input():
+            try:
+                process.stdin.write(data)
+            except OSError:  # ffmpeg exited early; its exit status is checked below
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        def read_output():
+            while True:
+                chunk = process.stdout.read(65536)
+                with condition:
+                    if not chunk:
+                        finished.append(True)
+                        condition.notify_all()
+                        return
+                    output.extend(chunk)
+                    condition.notify_all()
+
+        threading.Thread(target=write_input, daemon=True).start()
+        threading.Thread(target=read_output, daemon=True).start()
+        try:
+            with condition:
+                # The deadline moves on whenever ffmpeg makes progress
+                size = 0
+                deadline = time.monotonic() + self.stall_timeout
+                while not finished:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(f"ffmpeg produced no output for {self.stall_timeout:.1f} s")
+                    condition.wait(remaining)
+                    if len(output) != size:
+                        size = len(output)
+                        deadline = time.monotonic() + self.stall_timeout
+            if process.wait(timeout=self.stall_timeout) != 0:
+                raise RuntimeError(f"ffmpeg exited with status {process.returncode}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+        return decode_pcm(output, self.sample_rate)
+
+
+def create_decoder():
+    """Return the best available MP3 decoder, or None if there is none"""
+    if miniaudio is not None:
+        return MiniaudioDecoder()
+    if shutil.which("ffmpeg"):
+        return FFmpegPipeDecoder()
+    return None
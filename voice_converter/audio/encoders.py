@@ -0,0 +1,176 @@
+"""Encoding of captured speech for upload to the speech-to-speech API.
+
+Captured audio is 44.1 kHz mono int16. Speech needs far less bandwidth than
+that, so segments are resampled (16 kHz by default) with a polyphase FIR
+resampler and optionally compressed to FLAC or Opus before upload, which
+shrinks the request body and with it the upload time. WAV uploads are built
+in a SegmentBuffer and passed on as a memoryview without further copies.
+"""
+
+import functools
+import io
+import logging
+import math
+
+import numpy as np
+
+from voice_converter import config
+from voice_converter.audio.segment_buffer import MemoryReader, SegmentBuffer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import soundfile
+except ImportError:  # Optional dependency for FLAC/Opus
+    soundfile = None
+
+try:
+    from scipy import signal as scipy_signal
+except ImportError:  # Optional, used for resampling when available
+    scipy_signal = None
+
+# Opus only supports these sample rates
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Output samples computed per vectorized block, bounds the temporary memory
+_RESAMPLE_BLOCK = 4096
+
+
+@functools.lru_cache(maxsize=8)
+def _polyphase_filter(up, down, half_taps=10, beta=5.0):
+    """Kaiser-windowed sinc low-pass split into `up` phases
+
+    Returns:
+        tuple: (phases array of shape (up, taps_per_phase), half filter length)
+    """
+    max_rate = max(up, down)
+    half_len = half_taps * max_rate
+    t = np.arange(-half_len, half_len + 1)
+    h = np.sinc(t / max_rate) * np.kaiser(len(t), beta)
+    h *= up / h.sum()
+
+    taps_per_phase = math.ceil(len(h) / up)
+    padded = np.zeros(taps_per_phase * up)
+    padded[:len(h)] = h
+    # phases[p, k] = h[p + k * up]
+    phases = padded.reshape(taps_per_phase, up).T.astype(np.float32)
+    return phases, half_len
+
+
+def resampled_length(count, up, down):
+    """Number of samples resample_poly() produces for count input samples"""
+    return math.ceil(count * up / down)
+
+
+def resample_poly(samples, up, down, out=None):
+    """Resample int16 samples by up/down with a polyphase FIR filter
+
+    Uses scipy when it is installed; otherwise computes each output sample
+    as a dot product of the input with one filter phase, vectorized over
+    blocks of output samples.
+
+    Args:
+        samples: int16 input samples
+        up: Upsampling factor (e.g. the target rate)
+        down: Downsampling factor (e.g. the input rate)
+        out: Optional int16 array of resampled_length() samples to write into
+
+    Returns:
+        numpy.ndarray: Resampled int16 samples
+    """
+    gcd = math.gcd(up, down)
+    up, down = up // gcd, down // gcd
+    out_count = resampled_length(len(samples), up, down)
+    output = out if out is not None else np.empty(out_count, dtype=np.int16)
+    if up == down:
+        output[:] = samples
+        return output
+
+    if scipy_signal is not None:
+        resampled = scipy_signal.resample_poly(samples.astype(np.float32), up, down)
+        output[:] = np.clip(resampled[:out_count], -32768, 32767)
+        return output
+
+    phases, half_len = _polyphase_filter(up, down)
+    taps = phases.shape[1]
+
+    # Pad so every tap of every output sample indexes into the array
+    padded = np.zeros(len(samples) + 2 * taps + 1, dtype=np.float32)
+    padded[taps:taps + len(samples)] = samples
+    tap_offsets = np.arange(taps)
+
+    for start in range(0, out_count, _RESAMPLE_BLOCK):
+        n = np.arange(start, min(out_count, start + _RESAMPLE_BLOCK))
+        position = n * down + half_len
+        phase = position % up
+        base = position // up + taps
+        inputs = padded[np.clip(base[:, None] - tap_offsets[None, :], 0, len(padded) - 1)]
+        values = np.einsum('nk,nk->n', phases[phase], inputs)
+        output[start:start + len(n)] = np.clip(np.rint(values), -32768, 32767)
+    return output
+
+
+def available_codecs():
+    """Return the upload codecs that can be used in this environment"""
+    codecs = ["wav"]
+    if soundfile is not None:
+        formats = soundfile.available_formats()
+        if "FLAC" in formats:
+            codecs.append("flac")
+        if "OGG" in formats and "OPUS" in soundfile.available_subtypes("OGG"):
+            codecs.append("opus")
+    return codecs
+
+
+class UploadEncoder:
+    """Turns captured PCM into the audio file sent to the API
+
+    Args:
+        input_rate: Sample rate of the captured audio
+        sample_rate: Upload sample rate, None to keep the input rate
+        codec: "wav", "flac" or "opus"; unavailable codecs fall back to "wav"
+    """
+
+    def __init__(self, input_rate=config.RATE, sample_rate=config.UPLOAD_SAMPLE_RATE, codec=config.UPLOAD_CODEC):
+        self.input_rate = input_rate
+        self.sample_rate = sample_rate or input_rate
+        self.codec = codec
+
+        if codec not in available_codecs():
+            logger.warning("Upload codec '%s' not available, using WAV", codec)
+            self.codec = "wav"
+        if self.codec == "opus" and self.sample_rate not in OPUS_RATES:
+            # Pick the closest rate Opus supports that doesn't lose bandwidth
+            self.sample_rate = min(rate for rate in OPUS_RATES if rate >= min(self.sample_rate, 48000))
+
+    def encode(self, segment):
+        """Encode captured 16-bit mono audio
+
+        Args:
+            segment: SegmentBuffer at the input rate, or raw PCM bytes
+
+        Returns:
+            file-like: The encoded file, positioned at the start
+        """
+        if not isinstance(segment, SegmentBuffer):
+            segment = SegmentBuffer.from_frames([segment], self.input_rate)
+
+        if self.sample_rate != self.input_rate:
+            # Resample straight into the upload buffer of a new segment
+            samples = segment.samples()
+            count = resampled_length(len(samples), self.sample_rate, self.input_rate)
+            resampled = SegmentBuffer(self.sample_rate, segment.channels, capacity=count * 2)
+            resample_poly(samples, self.sample_rate, self.input_rate, out=resampled.reserve(count))
+            segment = resampled
+
+        if self.codec == "wav":
+            return MemoryReader(segment.wav())
+
+        output = io.BytesIO()
+        if self.codec == "flac":
+            soundfile.write(output, segment.samples(), self.sample_rate, format="FLAC", subtype="PCM_16")
+        else:
+            soundfile.write(output, segment.samples(), self.sample_rate, format="OGG", subtype="OPUS")
+
+        output.seek(0)
+        return output
@@ -0,0 +1,68 @@
+"""Energy measurement for silence detection.
+
+The per-buffer path runs for every captured buffer on the capture thread,
+which must keep up with the device, so it works on the int16 data in
+place: samples are cast into a preallocated float scratch buffer and the
+energy is a single dot product, with no temporaries.
+"""
+
+import numpy as np
+
+
+class EnergyMeter:
+    """Computes the energy of int16 audio buffers without allocating
+
+    Args:
+        frame_size: Expected samples per buffer; larger buffers grow the scratch space once
+    """
+
+    def __init__(self, frame_size=1024):
+        self._scratch = np.empty(frame_size, dtype=np.float64)
+
+    def sum_squares(self, samples):
+        """Return the sum of squared samples of an int16 array"""
+        count = len(samples)
+        if count > len(self._scratch):
+            self._scratch = np.empty(count, dtype=np.float64)
+
+        scratch = self._scratch[:count]
+        np.copyto(scratch, samples, casting='unsafe')
+        return float(np.dot(scratch, scratch))
+
+    def rms(self, samples):
+        """Return the RMS amplitude of an int16 array"""
+        if not len(samples):
+            return 0.0
+        return (self.sum_squares(samples) / len(samples)) ** 0.5
+
+    def peak(self, samples):
+        """Return the largest absolute sample value of an int16 array"""
+        if not len(samples):
+            return 0
+        # Two reductions instead of abs(), which would allocate (and overflow at -32768)
+        return max(int(samples.max()), -int(samples.min()))
+
+    def is_silence(self, samples, threshold):
+        """Return True if the RMS amplitude is below threshold
+
+        Compares energies directly, so no square root is taken.
+        """
+        count = len(samples)
+        if not count:
+            return True
+        energy = self.sum_squares(samples)
+        return energy == 0 or energy < threshold * threshold * count
+
+
+def batch_rms(frames):
+    """Return the RMS amplitude of each row of a 2-D int16 array
+
+    Meant for offline analysis of many buffers at once (e.g. a whole file
+    reshaped into (n_buffers, buffer_size)).
+    """
+    frames = np.asarray(frames)
+    if frames.shape[-1] == 0:
+        return np.zeros(frames.shape[:-1])
+    # einsum casts while it accumulates, so no float copy of the whole batch is made
+    energy = np.einsum('ij,ij->i', frames, frames, dtype=np.float64)
+    return np.sqrt(energy / frames.shape[-1])
@@ -0,0 +1,327 @@
+"""Background playback through one long-lived PyAudio output stream.
+
+Producers push int16 samples into a bounded ring buffer and return
+immediately; the playback thread drains the buffer into the output stream.
+The stream is only reopened when the sample rate, channel count or output
+device changes.
+"""
+
+import collections
+import logging
+import threading
+import time
+
+import numpy as np
+import pyaudio
+
+from voice_converter import config
+from voice_converter.audio.energy import EnergyMeter
+
+logger = logging.getLogger(__name__)
+
+
+class PCMRingBuffer:
+    """Bounded FIFO of int16 samples backed by a preallocated NumPy array"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._start = 0
+        self._size = 0
+        self.total_written = 0
+        self.total_read = 0
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return self._size
+
+    def write(self, samples, timeout=None):
+        """Copy samples into the buffer, waiting for space while it is full
+
+        Returns:
+            int: Number of samples written, less than len(samples) only on timeout
+        """
+        written = 0
+        total = len(samples)
+        with self._condition:
+            while written < total:
+                free = self.capacity - self._size
+                if free == 0:
+                    if not self._condition.wait(timeout):
+                        break
+                    continue
+
+                count = min(free, total - written)
+                end = (self._start + self._size) % self.capacity
+                first = min(count, self.capacity - end)
+                self._buffer[end:end + first] = samples[written:written + first]
+                self._buffer[:count - first] = samples[written + first:written + count]
+
+                self._size += count
+                self.total_written += count
+                written += count
+                self._condition.notify_all()
+        return written
+
+    def read(self, out, timeout=None):
+        """Move up to len(out) samples into out, waiting for data while empty
+
+        Returns:
+            int: Number of samples copied, 0 on timeout
+        """
+        with self._condition:
+            if self._size == 0 and timeout != 0:
+                self._condition.wait(timeout)
+
+            count = min(len(out), self._size)
+            first = min(count, self.capacity - self._start)
+            out[:first] = self._buffer[self._start:self._start + first]
+            out[first:count] = self._buffer[:count - first]
+
+            self._start = (self._start + count) % self.capacity
+            self._size -= count
+            self.total_read += count
+            if count:
+                self._condition.notify_all()
+            return count
+
+    def wait_for_data(self, timeout=None):
+        """Block until at least one sample is available
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._size > 0, timeout)
+
+    def wait_until_empty(self, timeout=None):
+        """Block until all samples have been read
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._size == 0, timeout)
+
+    def clear(self):
+        """Drop all buffered samples"""
+        with self._condition:
+            self.total_read += self._size
+            self._start = 0
+            self._size = 0
+            self._condition.notify_all()
+
+
+class PlaybackWorker:
+    """Plays queued audio on a dedicated thread through a persistent output stream
+
+    Args:
+        pa: PyAudio instance used to open the output stream
+        capacity: Ring buffer size in samples
+        block_size: Samples written to the output stream per call
+        metrics: LiveMetrics to publish the output level and buffered audio to, or None
+    """
+
+    def __init__(self, pa, capacity=config.PLAYBACK_BUFFER_SAMPLES, block_size=config.PLAYBACK_BLOCK_SIZE,
+                 metrics=None):
+        self.p = pa
+        self.live_metrics = metrics
+        self._meter = EnergyMeter(block_size)
+        self.ring = PCMRingBuffer(capacity)
+        self.block_size = block_size
+        self._block = np.zeros(block_size, dtype=np.int16)
+
+        # (sample position, (rate, channels, device)) where the stream format changes
+        self._format_changes = collections.deque()
+        self._written_format = None
+        self._write_lock = threading.Lock()
+
+        self.stream = None
+        self.stream_format = None
+        self._target_format = None
+        self.running = False
+        self.thread = None
+        self._open_segments = 0
+        self._starved = False
+
+        # Segment tracing: (ring position, trace, event) fired once playback reaches the position
+        self._trace = None
+        self._trace_started = False
+        self._markers = collections.deque()
+
+        # Metrics
+        self.underruns = 0
+        self.max_queue_depth = 0
+        self.stream_opens = 0
+        self.samples_played = 0
+
+    def start(self):
+        """Start the playback thread"""
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the playback thread and close the output stream"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        self._close_stream()
+
+    def write(self, samples, sample_rate, channels=1, device=None):
+        """Queue int16 samples for playback
+
+        Blocks only while the ring buffer is full.
+        """
+        stream_format = (sample_rate, channels, device)
+        with self._write_lock:
+            if stream_format != self._written_format:
+                self._format_changes.append((self.ring.total_written, stream_format))
+                self._written_format = stream_format
+
+            if self._trace is not None and not self._trace_started:
+                self._markers.append((self.ring.total_written + 1, self._trace, "first_played"))
+                self._trace_started = True
+            self.ring.write(samples)
+            self.max_queue_depth = max(self.max_queue_depth, len(self.ring))
+
+    def has_room(self, sample_count):
+        """Return True if sample_count samples can be written without blocking"""
+        return self.ring.capacity - len(self.ring) >= min(sample_count, self.ring.capacity)
+
+    def begin_segment(self, trace=None):
+        """Mark the start of a segment that is still being received
+
+        While a segment is open, running out of buffered audio counts as an underrun.
+
+        Args:
+            trace: SegmentTrace to mark when the segment's first and last samples are played
+        """
+        self._open_segments += 1
+        self._trace = trace
+        self._trace_started = False
+
+    def end_segment(self):
+        """Mark the end of a segment started with begin_segment()"""
+        self._open_segments = max(0, self._open_segments - 1)
+        with self._write_lock:
+            if self._trace is not None and self._trace_started:
+                self._markers.append((self.ring.total_written, self._trace, "last_played"))
+            self._trace = None
+
+    def wait_until_drained(self, timeout=None):
+        """Block until all queued audio has been handed to the output stream"""
+        return self.ring.wait_until_empty(timeout)
+
+    def clear(self):
+        """Drop queued audio that has not been played yet"""
+        with self._write_lock:
+            self._markers.clear()
+        self.ring.clear()
+
+    def metrics(self):
+        """Return playback statistics
+
+        Returns:
+            dict: underruns, queue depth (samples and seconds), maximum queue
+            depth, number of times the stream was opened and samples played
+        """
+        depth = len(self.ring)
+        rate = self._written_format[0] * self._written_format[1] if self._written_format else 1
+        return {
+            "underruns": self.underruns,
+            "queue_depth": depth,
+            "queue_depth_seconds": depth / rate,
+            "max_queue_depth": self.max_queue_depth,
+            "stream_opens": self.stream_opens,
+            "samples_played": self.samples_played,
+        }
+
+    def _run(self):
+        while self.running:
+            try:
+                self._play_next_block()
+            except Exception as e:
+                logger.error("Error in playback worker: %s", e)
+                self._close_stream()
+                time.sleep(0.1)
+
+    def _play_next_block(self):
+        # While a segment is arriving, wait at most one block before calling it an underrun
+        if self._open_segments and self.stream_format:
+            timeout = self.block_size / self.stream_format[0]
+        else:
+            timeout = 0.1
+
+        if not self.ring.wait_for_data(timeout):
+            if self._open_segments and not self._starved:
+                self.underruns += 1
+                self._starved = True
+            return
+        self._starved = False
+
+        # Format changes are queued before their samples, so they are visible once data is
+        limit = self.block_size
+        if self._format_changes:
+            position, stream_format = self._format_changes[0]
+            if self.ring.total_read >= position:
+                self._format_changes.popleft()
+                self._target_format = stream_format
+                self._open_stream(stream_format)
+                return
+            limit = min(limit, position - self.ring.total_read)
+
+        count = self.ring.read(self._block[:limit], timeout=0)
+        if not count:
+            return
+
+        if self.stream is None:
+            # Reopen after an earlier stream error
+            self._open_stream(self._target_format)
+        self.stream.write(self._block[:count].tobytes())
+        self.samples_played += count
+        if self.live_metrics is not None:
+            self._publish_level(self._block[:count])
+
+        while self._markers and self._markers[0][0] <= self.ring.total_read:
+            _, trace, event = self._markers.popleft()
+            trace.mark(event)
+
+    def _publish_level(self, block):
+        rate = self.stream_format[0] * self.stream_format[1] if self.stream_format else 1
+        self.live_metrics.publish(
+            "output",
+            rms=self._meter.rms(block),
+            peak=self._meter.peak(block),
+            buffered_seconds=len(self.ring) / rate,
+            underruns=self.underruns,
+        )
+
+    def _open_stream(self, stream_format):
+        if stream_format == self.stream_format and self.stream is not None:
+            return
+
+        self._close_stream()
+        sample_rate, channels, device = stream_format
+        self.stream = self.p.open(
+            format=pyaudio.paInt16,
+            channels=channels,
+            rate=sample_rate,
+            output=True,
+            output_device_index=device,
+            frames_per_buffer=self.block_size // channels
+        )
+        self.stream_format = stream_format
+        self.stream_opens += 1
+
+    def _close_stream(self):
+        if self.stream is not None:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                logger.error("Error closing output stream: %s", e)
+            self.stream = None
+            self.stream_format = None
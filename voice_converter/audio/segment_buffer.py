@@ -0,0 +1,170 @@
+"""Speech segment storage that doubles as the WAV upload body.
+
+Captured buffers are copied once into a preallocated bytearray that has 44
+bytes reserved in front for a WAV header. When the segment is uploaded the
+header is filled in place and the whole thing is handed to the HTTP client
+as a memoryview, so no joins or intermediate copies of the audio are made.
+"""
+
+import io
+import struct
+
+import numpy as np
+
+from voice_converter import config
+
+WAV_HEADER_SIZE = 44
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+
+class SegmentBuffer:
+    """Growable 16-bit PCM buffer with room for a WAV header
+
+    Args:
+        sample_rate: Sample rate of the audio
+        channels: Channel count of the audio
+        capacity: Initial PCM capacity in bytes; the buffer doubles when it runs out
+    """
+
+    def __init__(self, sample_rate=config.RATE, channels=config.CHANNELS, capacity=None):
+        if capacity is None:
+            seconds = config.MAX_SEGMENT_SECONDS + (config.VAD_PREROLL_MS + config.VAD_HANGOVER_MS) / 1000.0
+            capacity = int(seconds * sample_rate) * channels * 2
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._data = bytearray(WAV_HEADER_SIZE + capacity)
+        self._length = 0  # PCM bytes
+        self.start_sample = None  # Position of the first sample in the captured stream, if known
+        self.trace = None  # SegmentTrace with the segment's pipeline timestamps, if traced
+
+    @classmethod
+    def from_frames(cls, frames, sample_rate=config.RATE, channels=config.CHANNELS):
+        """Build a segment from a list of raw PCM frames"""
+        segment = cls(sample_rate, channels, capacity=sum(len(frame) for frame in frames))
+        for frame in frames:
+            segment.append(frame)
+        return segment
+
+    def __len__(self):
+        """Number of PCM bytes in the segment"""
+        return self._length
+
+    @property
+    def duration(self):
+        """Length of the segment in seconds"""
+        return self._length / (2.0 * self.channels * self.sample_rate)
+
+    @property
+    def capacity(self):
+        """PCM bytes the segment can hold before it has to grow"""
+        return len(self._data) - WAV_HEADER_SIZE
+
+    def _ensure_capacity(self, size):
+        needed = WAV_HEADER_SIZE + size
+        if needed > len(self._data):
+            self._data.extend(bytes(max(needed, 2 * len(self._data)) - len(self._data)))
+
+    def append(self, data):
+        """Copy PCM bytes (or any contiguous buffer, e.g. an int16 array) to the end of the segment"""
+        view = memoryview(data)
+        if view.format != 'B' or view.ndim != 1:
+            view = view.cast('B')
+        size = view.nbytes
+        self._ensure_capacity(self._length + size)
+        start = WAV_HEADER_SIZE + self._length
+        self._data[start:start + size] = view
+        self._length += size
+
+    def reserve(self, sample_count):
+        """Extend the segment and return a writable int16 view of the new samples"""
+        start = self._length
+        self._ensure_capacity(start + sample_count * 2)
+        self._length += sample_count * 2
+        return np.frombuffer(self._data, dtype=np.int16, count=sample_count, offset=WAV_HEADER_SIZE + start)
+
+    def truncate(self, size):
+        """Shorten the segment to size PCM bytes"""
+        self._length = min(self._length, size)
+
+    def pcm(self):
+        """Return a memoryview of the PCM bytes"""
+        return memoryview(self._data)[WAV_HEADER_SIZE:WAV_HEADER_SIZE + self._length]
+
+    def samples(self):
+        """Return the PCM data as an int16 array view"""
+        return np.frombuffer(self._data, dtype=np.int16, count=self._length // 2, offset=WAV_HEADER_SIZE)
+
+    def wav(self):
+        """Fill in the WAV header and return header plus PCM as a memoryview"""
+        block_align = self.channels * 2
+        _WAV_HEADER.pack_into(
+            self._data, 0,
+            b'RIFF', 36 + self._length, b'WAVE',
+            b'fmt ', 16, 1, self.channels, self.sample_rate,
+            self.sample_rate * block_align, block_align, 16,
+            b'data', self._length
+        )
+        return memoryview(self._data)[:WAV_HEADER_SIZE + self._length]
+
+
+def merge_segments(first, second):
+    """Append the audio of second to first (used by the queue's merge policy)
+
+    The trace of second completes together with the merged segment's, so
+    every segment that entered the queue is counted in the latency stats.
+    """
+    first.append(second.pcm())
+    if second.trace is not None:
+        if first.trace is None:
+            first.trace = second.trace
+        else:
+            first.trace.merge(second.trace)
+    return first
+
+
+class MemoryReader(io.RawIOBase):
+    """Read-only file object over a memoryview, for uploading without a copy
+
+    read() returns slices of the view, which stay valid as long as the
+    segment behind it is not changed; callers that keep the data past the
+    upload must copy it.
+    """
+
+    def __init__(self, view):
+        super().__init__()
+        self._view = view
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self._view) - self._position)
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def read(self, size=-1):
+        """Return the next size bytes as a memoryview slice of the buffer, not a copy"""
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._position + size)
+        data = self._view[self._position:end]
+        self._position = end
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def getbuffer(self):
+        """Return the underlying memoryview (like BytesIO.getbuffer)"""
+        return self._view
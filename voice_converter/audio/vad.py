@@ -0,0 +1,395 @@
+"""Voice activity detection and speech segmentation.
+
+A VoiceActivityDetector decides for each captured buffer whether it contains
+speech. SpeechSegmenter turns those decisions into segments for conversion,
+with a hangover (silence allowed inside a segment), a pre-roll (audio kept
+from before speech onset), trimming of the trailing silence and a maximum
+segment length that cuts at the quietest recent buffer instead of mid-word.
+"""
+
+import logging
+import math
+
+import numpy as np
+
+from voice_converter import config
+from voice_converter.audio.energy import EnergyMeter
+from voice_converter.audio.segment_buffer import SegmentBuffer
+from voice_converter.utils.latency import SegmentTrace
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceActivityDetector:
+    """Base class for VAD engines
+
+    Args:
+        sample_rate: Sample rate of the analysed audio
+        threshold: RMS amplitude that counts as speech
+    """
+
+    name = "base"
+
+    def __init__(self, sample_rate, threshold):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.meter = EnergyMeter()
+        self.level = 0.0  # RMS of the last analysed buffer
+
+    def set_threshold(self, threshold):
+        """Change the speech threshold"""
+        self.threshold = threshold
+
+    def is_speech(self, samples):
+        """Return True if the int16 samples contain speech"""
+        self.level = self.meter.rms(samples)
+        return self._decide(samples)
+
+    def _decide(self, samples):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget any state carried between buffers"""
+        self.level = 0.0
+
+
+class EnergyVAD(VoiceActivityDetector):
+    """Speech when the RMS amplitude reaches the threshold"""
+
+    name = "energy"
+
+    def _decide(self, samples):
+        return self.level >= self.threshold
+
+
+class EnergyZCRVAD(VoiceActivityDetector):
+    """Energy threshold plus a zero-crossing-rate limit
+
+    Broadband noise such as fans, hiss or keyboard clicks crosses zero far
+    more often than voiced speech, so loud buffers with a zero-crossing rate
+    above max_zcr are rejected.
+    """
+
+    name = "energy_zcr"
+
+    def __init__(self, sample_rate, threshold, max_zcr=config.VAD_MAX_ZCR):
+        super().__init__(sample_rate, threshold)
+        self.max_zcr = max_zcr
+        self.zcr = 0.0
+
+    def _decide(self, samples):
+        if self.level < self.threshold or len(samples) < 2:
+            return False
+        signs = np.signbit(samples)
+        self.zcr = np.count_nonzero(signs[1:] != signs[:-1]) / (len(samples) - 1)
+        return self.zcr <= self.max_zcr
+
+
+class SpectralVAD(VoiceActivityDetector):
+    """Energy in the speech band, measured with an FFT
+
+    The band energy is scaled back to an RMS amplitude so the same threshold
+    works as for the energy engines; low-frequency hum and high-frequency
+    hiss outside the band no longer count towards it.
+    """
+
+    name = "spectral"
+
+    def __init__(self, sample_rate, threshold, band=config.VAD_SPEECH_BAND):
+        super().__init__(sample_rate, threshold)
+        self.band = band
+        self._size = None
+        self.band_level = 0.0
+
+    def _prepare(self, size):
+        self._size = size
+        self._window = np.hanning(size)
+        self._window_power = float(np.dot(self._window, self._window))
+        frequencies = np.fft.rfftfreq(size, 1.0 / self.sample_rate)
+        low, high = self.band
+        self._bins = slice(np.searchsorted(frequencies, low), np.searchsorted(frequencies, high, side='right'))
+
+    def _decide(self, samples):
+        if self.level < self.threshold:
+            # The band can't hold more energy than the whole signal
+            return False
+        if len(samples) != self._size:
+            self._prepare(len(samples))
+
+        spectrum = np.fft.rfft(samples * self._window)[self._bins]
+        band_energy = 2.0 * float(np.vdot(spectrum, spectrum).real) / self._window_power
+        self.band_level = math.sqrt(band_energy / len(samples))
+        return self.band_level >= self.threshold
+
+
+class AdaptiveVAD(VoiceActivityDetector):
+    """Speech when the level is well above a tracked noise floor
+
+    The noise floor follows the level of non-speech buffers, quickly
+    downwards and slowly upwards, so the detector adapts to changing
+    background noise. The configured threshold is used as the initial noise
+    estimate and half of it as an absolute minimum.
+    """
+
+    name = "adaptive"
+
+    def __init__(self, sample_rate, threshold, snr=config.VAD_ADAPTIVE_SNR,
+                 rise=config.VAD_NOISE_RISE, fall=config.VAD_NOISE_FALL):
+        super().__init__(sample_rate, threshold)
+        self.snr = snr
+        self.rise = rise
+        self.fall = fall
+        self.noise_floor = threshold / snr
+
+    def set_threshold(self, threshold):
+        super().set_threshold(threshold)
+        self.noise_floor = threshold / self.snr
+
+    def _decide(self, samples):
+        speech = self.level >= max(self.noise_floor * self.snr, self.threshold * 0.5)
+        if not speech:
+            rate = self.rise if self.level > self.noise_floor else self.fall
+            self.noise_floor += (self.level - self.noise_floor) * rate
+        return speech
+
+    def reset(self):
+        super().reset()
+        self.noise_floor = self.threshold / self.snr
+
+
+ENGINES = {engine.name: engine for engine in (EnergyVAD, EnergyZCRVAD, SpectralVAD, AdaptiveVAD)}
+
+
+def create_vad(name, sample_rate, threshold):
+    """Create a VAD engine by name (see ENGINES)"""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown VAD engine: {name} (available: {', '.join(ENGINES)})")
+    return ENGINES[name](sample_rate, threshold)
+
+
+class PreRollBuffer:
+    """Keeps the most recent samples in a preallocated array, overwriting the oldest
+
+    Args:
+        capacity: Number of samples to keep
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._end = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, samples):
+        """Add int16 samples, dropping the oldest ones that no longer fit"""
+        if not self.capacity:
+            return
+        count = len(samples)
+        if count >= self.capacity:
+            self._buffer[:] = samples[count - self.capacity:]
+            self._end = 0
+            self._size = self.capacity
+            return
+
+        first = min(count, self.capacity - self._end)
+        self._buffer[self._end:self._end + first] = samples[:first]
+        self._buffer[:count - first] = samples[first:]
+        self._end = (self._end + count) % self.capacity
+        self._size = min(self.capacity, self._size + count)
+
+    def read_into(self, segment):
+        """Append the kept samples in order to a SegmentBuffer"""
+        start = (self._end - self._size) % self.capacity if self.capacity else 0
+        if start + self._size <= self.capacity:
+            segment.append(self._buffer[start:start + self._size])
+        else:
+            segment.append(self._buffer[start:])
+            segment.append(self._buffer[:self._end])
+
+    def clear(self):
+        """Forget all kept samples"""
+        self._end = 0
+        self._size = 0
+
+
+class SpeechSegmenter:
+    """Groups captured buffers into speech segments
+
+    Args:
+        vad: VoiceActivityDetector deciding speech per buffer
+        frames_per_buffer: Samples per captured buffer
+        hangover_ms: Silence that ends a segment
+        preroll_ms: Audio kept from before speech onset
+        trail_ms: Silence kept at the end of a segment, the rest of the hangover is trimmed
+        max_segment_seconds: Longest segment before it is cut
+        min_speech_frames: Segments with fewer speech buffers are discarded
+    """
+
+    def __init__(self, vad, frames_per_buffer=config.FRAMES_PER_BUFFER,
+                 hangover_ms=config.VAD_HANGOVER_MS, preroll_ms=config.VAD_PREROLL_MS,
+                 trail_ms=config.VAD_TRAIL_MS, max_segment_seconds=config.MAX_SEGMENT_SECONDS,
+                 min_speech_frames=config.MIN_SPEECH_FRAMES):
+        self.vad = vad
+        buffer_ms = frames_per_buffer * 1000.0 / vad.sample_rate
+        self.hangover_frames = max(1, math.ceil(hangover_ms / buffer_ms))
+        self.trail_frames = min(self.hangover_frames, math.ceil(trail_ms / buffer_ms))
+        self.max_frames = max(1, int(max_segment_seconds * 1000.0 / buffer_ms))
+        self.cut_search_frames = max(1, math.ceil(config.VAD_CUT_SEARCH_MS / buffer_ms))
+        self.min_speech_frames = min_speech_frames
+        self.preroll = PreRollBuffer(int(vad.sample_rate * preroll_ms / 1000))
+
+        # Session statistics in samples
+        self.samples_captured = 0
+        self.samples_sent = 0
+        self.samples_trimmed = 0
+        self.segments = 0
+
+        self.reset()
+
+    def reset(self):
+        """Drop any partial segment"""
+        self.vad.reset()
+        self.preroll.clear()
+        self.segment = None  # SegmentBuffer being filled
+        self.frame_ends = []  # Segment length in bytes after each buffer
+        self.levels = []  # RMS per buffer of the current segment
+        self.is_speech_active = False
+        self.silence_frames = 0
+        self.speech_frames = 0
+
+    def process(self, data):
+        """Analyse one captured buffer
+
+        Args:
+            data: Raw 16-bit mono PCM bytes
+
+        Returns:
+            SegmentBuffer: A finished segment, or None
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+        self.samples_captured += len(samples)
+        is_speech = self.vad.is_speech(samples)
+
+        if not self.is_speech_active:
+            if not is_speech:
+                # Only the last preroll_ms of silence is kept, the rest is never sent
+                self.preroll.append(samples)
+                return None
+
+            # Speech just started, include the pre-roll so the onset isn't clipped
+            logger.debug("Speech detected")
+            self.is_speech_active = True
+            self.segment = SegmentBuffer(self.vad.sample_rate)
+            self.segment.start_sample = self.samples_captured - len(samples) - len(self.preroll)
+            self.segment.trace = SegmentTrace()
+            self.segment.trace.mark("onset")
+            self.frame_ends = []
+            self.levels = []
+            if len(self.preroll):
+                self.preroll.read_into(self.segment)
+                self.frame_ends.append(len(self.segment))
+                self.levels.append(0.0)
+            self.preroll.clear()
+            self.silence_frames = 0
+            self.speech_frames = 0
+
+        # The captured buffer is copied straight into the upload buffer
+        self.segment.append(data)
+        self.frame_ends.append(len(self.segment))
+        self.levels.append(self.vad.level)
+
+        if is_speech:
+            self.silence_frames = 0
+            self.speech_frames += 1
+        else:
+            self.silence_frames += 1
+            if self.silence_frames >= self.hangover_frames:
+                logger.debug("Speech segment ended")
+                return self._finish(trailing_silence=self.silence_frames)
+
+        if len(self.frame_ends) >= self.max_frames:
+            logger.debug("Maximum speech segment duration reached")
+            return self._cut()
+
+        return None
+
+    def pending_bytes(self):
+        """Bytes of the segment in progress that have not been emitted yet"""
+        return len(self.segment) if self.is_speech_active else 0
+
+    def flush(self):
+        """Return the segment in progress, if any (e.g. when recording stops)"""
+        if self.is_speech_active:
+            return self._finish(trailing_silence=self.silence_frames)
+        return None
+
+    def stats(self):
+        """Return statistics for the current recording session
+
+        Returns:
+            dict: Seconds captured, sent for conversion, trimmed from segment
+            ends and saved overall (captured audio that was never sent),
+            and the number of segments
+        """
+        rate = float(self.vad.sample_rate)
+        return {
+            "captured_seconds": self.samples_captured / rate,
+            "sent_seconds": self.samples_sent / rate,
+            "trimmed_seconds": self.samples_trimmed / rate,
+            "saved_seconds": (self.samples_captured - self.samples_sent) / rate,
+            "segments": self.segments,
+        }
+
+    def _finish(self, trailing_silence=0):
+        segment = self.segment
+        frame_ends = self.frame_ends
+        speech_frames = self.speech_frames
+        self.segment = None
+        self.frame_ends = []
+        self.levels = []
+        self.is_speech_active = False
+        self.speech_frames = 0
+        self.silence_frames = 0
+
+        # Keep only trail_frames of the silence that ended the segment
+        trim = min(max(0, trailing_silence - self.trail_frames), len(frame_ends) - 1)
+        if trim:
+            length = frame_ends[-trim - 1]
+            self.samples_trimmed += (len(segment) - length) // 2
+            segment.truncate(length)
+
+        if speech_frames < self.min_speech_frames:
+            # Too short to be speech (clicks, bumps)
+            return None
+        return self._emit(segment)
+
+    def _cut(self):
+        """Split a long segment at the quietest buffer of its last part"""
+        search_start = max(1, len(self.frame_ends) - self.cut_search_frames)
+        cut = search_start + int(np.argmin(self.levels[search_start:])) + 1
+        length = self.frame_ends[cut - 1]
+
+        # Move the audio after the cut into a new segment
+        segment = self.segment
+        self.segment = SegmentBuffer(self.vad.sample_rate)
+        self.segment.append(segment.pcm()[length:])
+        self.segment.start_sample = segment.start_sample + length // 2
+        self.segment.trace = SegmentTrace()
+        self.segment.trace.mark("onset")  # The remainder's speech continues from here
+        segment.truncate(length)
+
+        self.frame_ends = [end - length for end in self.frame_ends[cut:]]
+        self.levels = self.levels[cut:]
+        # Speech continues in the remainder, it is never discarded as too short
+        self.speech_frames = max(self.speech_frames, self.min_speech_frames)
+        return self._emit(segment)
+
+    def _emit(self, segment):
+        if segment.trace:
+            segment.trace.mark("close")
+        self.samples_sent += len(segment) // 2
+        self.segments += 1
+        return segment
@@ -0,0 +1,336 @@
+"""Offline conversion of existing recordings (voice-converter batch).
+
+Each input file is split into speech segments with the same VAD and
+segmenter as live capture, the segments of all files are converted
+concurrently by a pool of workers (optionally rate limited), and the
+converted audio is stitched back into one WAV file per input, with the
+original pauses in between.
+
+Converted segments are stored next to the output as they finish, so an
+interrupted run picks up where it stopped when started again.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+from voice_converter.audio.decoders import create_decoder, pcm_sample_rate
+from voice_converter.audio.encoders import UploadEncoder
+from voice_converter.audio.vad import SpeechSegmenter, create_vad
+from voice_converter.utils.conversion_cache import create_cache
+from voice_converter.utils.log import setup_logging
+from voice_converter.utils.settings_manager import load_api_key
+
+AUDIO_EXTENSIONS = (".wav", ".mp3")
+PARTS_SUFFIX = ".parts"  # Directory holding the converted segments of an unfinished file
+MANIFEST = "manifest.json"
+
+
+def find_audio_files(paths):
+    """Expand files and directories (recursively) into a sorted list of audio files
+
+    Returns:
+        list: (path, relative path) pairs; files found in a directory keep their
+            path below it, files given directly are relative to their own directory
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                files.extend((os.path.join(directory, name), os.path.relpath(os.path.join(directory, name), path))
+                             for name in names if name.lower().endswith(AUDIO_EXTENSIONS))
+        elif path.lower().endswith(AUDIO_EXTENSIONS):
+            files.append((path, os.path.basename(path)))
+        else:
+            print(f"Skipping {path}: not a WAV or MP3 file")
+    return sorted(files)
+
+
+def output_paths(files, output):
+    """Map each input to its output WAV, mirroring the input's relative path under output
+
+    Raises:
+        ValueError: If two inputs would be written to the same output (e.g. take1.mp3 and
+            take1.wav in one directory), since they would also share and destroy each
+            other's converted parts
+    """
+    outputs = {}
+    for path, relative in files:
+        output_path = os.path.join(output, os.path.splitext(relative)[0] + ".wav")
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in outputs:
+            raise ValueError(f"{outputs[key][0]} and {path} would both be written to {output_path}")
+        outputs[key] = (path, output_path)
+    return list(outputs.values())
+
+
+def read_audio(path, decoder=None):
+    """Read a WAV or MP3 file as mono int16 samples
+
+    Returns:
+        tuple: (samples, sample_rate)
+    """
+    if path.lower().endswith(".wav"):
+        with wave.open(path, 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError("only 16-bit WAV files are supported")
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            rate, channels = wf.getframerate(), wf.getnchannels()
+    else:
+        if decoder is None:
+            raise ValueError("MP3 input needs miniaudio or FFmpeg")
+        with open(path, 'rb') as f:
+            decoded = decoder.decode(f.read())
+        samples, rate, channels = decoded.samples, decoded.sample_rate, decoded.channels
+
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+        samples = samples.mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+def split_segments(samples, rate, vad_engine, threshold):
+    """Split a recording into speech segments
+
+    Returns:
+        list: SegmentBuffers with start_sample set
+    """
+    segmenter = SpeechSegmenter(create_vad(vad_engine, rate, threshold))
+    frame = config.FRAMES_PER_BUFFER
+    segments = []
+    for offset in range(0, len(samples) - frame + 1, frame):
+        segment = segmenter.process(samples[offset:offset + frame].tobytes())
+        if segment:
+            segments.append(segment)
+    segment = segmenter.flush()
+    if segment:
+        segments.append(segment)
+    return segments
+
+
+class BatchJob:
+    """One input file: its segments, the converted parts on disk and the stitched output"""
+
+    def __init__(self, path, output_path, settings):
+        self.path = path
+        self.output_path = output_path
+        self.parts_dir = output_path + PARTS_SUFFIX
+        self.settings = settings
+        self.rate = None
+        self.segments = []
+        self.failed = 0
+
+    def prepare(self, decoder):
+        """Read and segment the input, reusing converted parts from an earlier run
+
+        Returns:
+            list: Indexes of the segments that still need converting
+        """
+        samples, self.rate = read_audio(self.path, decoder)
+        self.segments = split_segments(samples, self.rate, self.settings["vad"], self.settings["threshold"])
+
+        manifest = {
+            "settings": self.settings,
+            "rate": self.rate,
+            "segments": [[segment.start_sample, len(segment) // 2] for segment in self.segments],
+        }
+        manifest_path = os.path.join(self.parts_dir, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                if json.load(f) != manifest:
+                    # Different settings or a changed input, the old parts don't match
+                    print(f"{self.path}: settings changed, converting again")
+                    shutil.rmtree(self.parts_dir)
+
+        os.makedirs(self.parts_dir, exist_ok=True)
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+        return [index for index in range(len(self.segments)) if not os.path.exists(self.part_path(index))]
+
+    def part_path(self, index):
+        return os.path.join(self.parts_dir, f"segment_{index:05d}.pcm")
+
+    def save_part(self, index, audio):
+        # Written under a temporary name so an interrupted write is never taken as done
+        path = self.part_path(index)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(audio)
+        os.replace(path + ".tmp", path)
+
+    def stitch(self):
+        """Write the converted segments into the output file at their original positions"""
+        out_rate = pcm_sample_rate(config.STREAM_OUTPUT_FORMAT)
+        pieces = []
+        cursor = 0  # Output samples written so far
+        for index, segment in enumerate(self.segments):
+            with open(self.part_path(index), 'rb') as f:
+                audio = f.read()
+            # Keep the original pause before the segment unless the previous output ran over it
+            start = int(segment.start_sample * out_rate / self.rate)
+            if start > cursor:
+                pieces.append(bytes((start - cursor) * 2))
+                cursor = start
+            pieces.append(audio)
+            cursor += len(audio) // 2
+
+        temp_path = self.output_path + ".tmp"
+        with wave.open(temp_path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(out_rate)
+            for piece in pieces:
+                wf.writeframes(piece)
+        os.replace(temp_path, self.output_path)
+        shutil.rmtree(self.parts_dir)
+
+
+class BatchConverter:
+    """Converts the segments of many files concurrently
+
+    Args:
+        api_client: ElevenLabsClient used by all workers, its scheduler sets the request rate
+        voice_id: Target voice
+        workers: Conversions running at the same time
+    """
+
+    def __init__(self, api_client, voice_id=None, workers=4):
+        self.api_client = api_client
+        self.voice_id = voice_id
+        self.workers = workers
+
+        # Run statistics
+        self.audio_seconds = 0.0
+        self.converted = 0
+        self.failed = 0
+
+    def _convert(self, job, index):
+        segment = job.segments[index]
+        audio_data = UploadEncoder(input_rate=job.rate).encode(segment)
+        result = self.api_client.convert_speech(audio_data, voice_id=self.voice_id, output_format=config.STREAM_OUTPUT_FORMAT)
+        if isinstance(result, tuple):
+            _, error_info = result
+            raise RuntimeError(error_info["message"])
+        job.save_part(index, result)
+        return segment.duration
+
+    def run(self, jobs, decoder=None):
+        """Convert and stitch all jobs
+
+        Returns:
+            int: Number of files written
+        """
+        work = []
+        for job in jobs:
+            try:
+                pending = job.prepare(decoder)
+            except (OSError, ValueError, RuntimeError, wave.Error) as e:
+                print(f"Skipping {job.path}: {e}")
+                continue
+            done = len(job.segments) - len(pending)
+            print(f"{job.path}: {len(job.segments)} segments"
+                  + (f", {done} already converted" if done else ""))
+            work.extend((job, index) for index in pending)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._convert, job, index): (job, index) for job, index in work}
+            for future in as_completed(futures):
+                job, index = futures[future]
+                try:
+                    self.audio_seconds += future.result()
+                    self.converted += 1
+                except Exception as e:
+                    job.failed += 1
+                    self.failed += 1
+                    print(f"{job.path}: segment {index} failed: {e}")
+
+        written = 0
+        for job in jobs:
+            if job.rate is None:
+                continue
+            if job.failed:
+                print(f"{job.path}: {job.failed} segments failed, run again to retry them")
+                continue
+            job.stitch()
+            written += 1
+            print(f"Wrote {job.output_path}")
+        return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="voice-converter batch",
+                                     description="Convert WAV/MP3 recordings to another voice")
+    parser.add_argument("inputs", nargs="+", help="Audio files or directories")
+    parser.add_argument("-o", "--output", default="converted", help="Output directory")
+    parser.add_argument("--voice-id", default=config.DEFAULT_VOICE_ID)
+    parser.add_argument("--workers", type=int, default=4, help="Conversions running at the same time")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Maximum conversions started per second")
+    parser.add_argument("--vad", default=config.VAD_ENGINE, help="VAD engine used for segmenting")
+    parser.add_argument("--threshold", type=float, default=config.DEFAULT_SILENCE_THRESHOLD)
+    parser.add_argument("--force", action="store_true", help="Convert files that already have an output")
+    parser.add_argument("--no-cache", action="store_true", help="Convert every segment, even if cached")
+    parser.add_argument("--base-url", default=config.API_BASE_URL, help="API endpoint override")
+    parser.add_argument("--api-key", help="ElevenLabs API key (default: $ELEVENLABS_API_KEY or the saved settings)")
+    parser.add_argument("--log-level", default=config.LOG_LEVEL, help="DEBUG, INFO, WARNING or ERROR")
+    args = parser.parse_args(argv)
+    setup_logging(args.log_level.upper())
+
+    api_key = load_api_key(args.api_key)
+    if not api_key:
+        parser.error("No API key: pass --api-key or set ELEVENLABS_API_KEY")
+
+    settings = {"voice_id": args.voice_id, "vad": args.vad, "threshold": args.threshold}
+    try:
+        files = output_paths(find_audio_files(args.inputs), args.output)
+    except ValueError as e:
+        parser.error(f"{e}; rename one of them or convert them in separate runs")
+    jobs = []
+    for path, output_path in files:
+        if os.path.exists(output_path) and not args.force:
+            print(f"Skipping {path}: {output_path} exists")
+            continue
+        jobs.append(BatchJob(path, output_path, settings))
+    if not jobs:
+        print("Nothing to convert")
+        return
+    for job in jobs:
+        os.makedirs(os.path.dirname(job.output_path) or ".", exist_ok=True)
+
+    transport = HttpTransport(args.base_url, max_connections=args.workers)
+    # Offline work has no deadline, so requests wait for the rate limit and are retried
+    scheduler = RequestScheduler(rate=args.rate_limit or None, burst=1, max_concurrent=args.workers)
+    api_client = ElevenLabsClient(base_url=args.base_url, transport=transport, scheduler=scheduler,
+                                  cache=create_cache(config.BATCH_CACHE_ENABLED and not args.no_cache))
+    api_client.set_api_key(api_key)
+
+    converter = BatchConverter(api_client, args.voice_id, args.workers)
+    start = time.perf_counter()
+    written = converter.run(jobs, create_decoder())
+    elapsed = time.perf_counter() - start
+    api_client.close()
+
+    print(f"{written} of {len(jobs)} files written, {converter.converted} segments converted, "
+          f"{converter.failed} failed")
+    if elapsed > 0:
+        print(f"{converter.audio_seconds:.1f} audio seconds in {elapsed:.1f} s wall time "
+              f"({converter.audio_seconds / elapsed:.2f} audio s per wall s)")
+    api_stats = scheduler.stats()
+    print(f"API: {api_stats['requests']} requests, {api_stats['retries']} retries, "
+          f"{api_stats['credits_used']} credits used")
+    if api_client.cache is not None:
+        stats = api_client.cache.stats()
+        print(f"Cache: {stats['memory_hits'] + stats['disk_hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,111 @@
 API_KEY = ""  # API key removed - should be entered in Settings tab
 DEFAULT_VOICE_ID = "nPczCjzI2devNBz1zQrb"  # Brian voice ID
 DEFAULT_MODEL = "eleven_multilingual_sts_v2"
+API_BASE_URL = None  # Override the API endpoint (e.g. a local test server), None for the default
+API_CONNECT_TIMEOUT = 5.0  # Seconds to establish a connection to the API
+API_READ_TIMEOUT = 30.0  # Seconds to wait for each chunk of an API response
+API_HTTP2 = False  # Use HTTP/2 for API requests (needs the h2 package)
+API_MAX_CONNECTIONS = 4  # Keep-alive connections pooled for API requests
+API_KEEPALIVE_EXPIRY = 60.0  # Seconds an idle pooled connection is kept open
+API_WARM_UP = True  # Open a connection to the API at startup
+API_RATE_LIMIT = 5.0  # Conversion requests started per second (token bucket), None for no limit
+API_RATE_BURST = 3  # Requests that may start at once after an idle period
+API_MAX_CONCURRENT_REQUESTS = 4  # Conversion requests in flight per client, None for no limit
+API_MAX_RETRIES = 3  # Retries of a request that failed with 429, 5xx or a connection error
+API_RETRY_BASE_DELAY = 0.25  # Backoff before the first retry (s), doubled for each further one
+API_RETRY_MAX_DELAY = 4.0  # Longest backoff between retries (s)
+API_QUOTA_BACKOFF = 60.0  # Seconds requests fail fast after a quota error
+VOICE_CACHE_PATH = "voice_cache.json"  # Voice list shown at startup before it is refreshed, None to disable
+VOICE_CACHE_TTL = 6 * 3600  # Seconds before the cached voice list is checked with the API again
 
 # Audio recording parameters
 FORMAT = 'int16'
 CHANNELS = 1
 RATE = 44100
 CHUNK = 1024 * 5  # Larger chunk size for better speech recognition
+FRAMES_PER_BUFFER = 1024  # Samples per capture callback (~23 ms at 44.1 kHz)
+CAPTURE_BUFFER_SECONDS = 2.0  # Captured audio queued for the analysis thread before buffers are dropped
 SILENCE_DURATION = 1.5  # Reduced silence duration to detect shorter pauses
-BUFFER_FRAMES = 3  # Number of frames to keep before speech to avoid choppy starts
 MIN_SPEECH_FRAMES = 4  # Minimum number of frames to consider as valid speech
 DEFAULT_SILENCE_THRESHOLD = 200  # Default value, will be calibrated
 
+# Upload encoding
+UPLOAD_SAMPLE_RATE = 16000  # Segments are resampled to this rate before upload, None to keep RATE
+UPLOAD_CODEC = "wav"  # "wav", "flac" or "opus" (FLAC/Opus need the soundfile package)
+
+# Voice activity detection and segmentation
+VAD_ENGINE = "energy"  # "energy", "energy_zcr", "spectral" or "adaptive"
+VAD_HANGOVER_MS = 350  # Silence that ends a speech segment
+VAD_PREROLL_MS = 200  # Audio kept from before speech onset to avoid choppy starts
+VAD_TRAIL_MS = 100  # Silence kept after speech, the rest of the hangover is trimmed
+MAX_SEGMENT_SECONDS = 5.0  # Longer segments are cut at the quietest point
+VAD_CUT_SEARCH_MS = 1000  # How far back to look for that quietest point
+VAD_MAX_ZCR = 0.25  # energy_zcr: zero-crossing rate above which loud buffers count as noise
+VAD_SPEECH_BAND = (300, 3400)  # spectral: frequency band (Hz) that carries speech
+VAD_ADAPTIVE_SNR = 3.0  # adaptive: level over the noise floor that counts as speech
+VAD_NOISE_RISE = 0.01  # adaptive: noise floor tracking speed per buffer when getting louder
+VAD_NOISE_FALL = 0.2  # adaptive: noise floor tracking speed per buffer when getting quieter
+
+# Silence threshold calibration
+CALIBRATION_SECONDS = 2.0  # Audio analysed by "Calibrate Microphone"
+CALIBRATION_PERCENTILE = 20  # Percentile of the buffer levels taken as the noise floor (robust to speech)
+CALIBRATION_MARGIN = 2.5  # Threshold as a multiple of the noise floor
+CALIBRATION_MIN_THRESHOLD = 150  # Lowest threshold calibration sets
+CALIBRATION_HALF_LIFE = 10.0  # Seconds of audio after which a level counts half in automatic recalibration
+CALIBRATION_UPDATE_INTERVAL = 5.0  # Seconds between threshold updates in automatic recalibration
+CALIBRATION_HYSTERESIS = 0.1  # Relative change needed before automatic recalibration moves the threshold
+
+# Conversion pipeline
+MAX_IN_FLIGHT_CONVERSIONS = 3  # Segments sent to the API at the same time
+AUDIO_QUEUE_SIZE = 16  # Segments waiting for a free conversion slot
+QUEUE_OVERFLOW_POLICY = "drop_oldest"  # "drop_oldest", "drop_newest", "block" or "merge"
+QUEUE_BLOCK_TIMEOUT = 0.05  # Longest the "block" policy may stall the capture thread (s)
+SEGMENT_DEADLINE = 8.0  # Seconds after capture a segment is dropped instead of sent or retried
+
+# Conversion cache (identical input audio and settings are converted only once)
+CACHE_ENABLED = False  # Cache live conversions; off because live speech rarely repeats and would be kept on disk
+BATCH_CACHE_ENABLED = True  # Cache batch conversions, so re-running a batch skips the files already converted
+CACHE_DIR = "conversion_cache"  # Directory of the disk store, None to cache in memory only
+CACHE_MEMORY_BYTES = 32 * 1024 * 1024  # Converted audio kept in memory
+CACHE_DISK_BYTES = 512 * 1024 * 1024  # Converted audio kept on disk, least recently used goes first
+CACHE_MAX_AGE = 30 * 24 * 3600  # Seconds before an entry is converted again, None to keep it
+CACHE_MMAP_THRESHOLD = 256 * 1024  # Entries this large are memory-mapped from disk, not held in memory
+
+# Conversion server (voice-converter-server)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_SESSIONS = 500  # Further clients are turned away until sessions end
+SERVER_SESSION_IN_FLIGHT = 2  # Conversions per session sent to the API at the same time
+SERVER_SESSION_QUEUE_SIZE = 8  # Segments per session waiting for a conversion slot
+SERVER_MAX_CONNECTIONS = 100  # Pooled API connections shared by all sessions
+SERVER_API_RATE_LIMIT = None  # Conversion requests started per second by all sessions, None for no limit
+SERVER_WRITE_LIMIT = 64 * 1024  # Unsent bytes per client before sending converted audio waits
+
+# Settings persistence
+SETTINGS_FLUSH_DELAY = 0.5  # Seconds without changes before user settings are written to disk
+SETTINGS_FLUSH_MAX_DELAY = 2.0  # Longest a changed setting stays unsaved while changes keep coming in
+
+# Logging (records are written by a background thread, never on the audio thread)
+LOG_LEVEL = "INFO"  # "DEBUG" also logs every detected segment and conversion
+LOG_FILE = None  # File the log is appended to as well as stderr, None for stderr only
+LOG_REPEAT_INTERVAL = 10.0  # Seconds over which repeats of one message are counted, 0 to log all
+LOG_REPEAT_BURST = 5  # Repeats of one message logged per interval, the rest are counted and dropped
+
+# Latency tracing (per-segment timestamps from speech onset to playback)
+LATENCY_WINDOW = 1000  # Recent segments the latency percentiles are computed over
+LATENCY_TRACE_PATH = None  # JSONL file every completed segment trace is appended to, None to disable
+METRICS_PORT = None  # Serve latency metrics for Prometheus at http://127.0.0.1:PORT/metrics, None to disable
+
+# GUI
+UI_UPDATE_INTERVAL_MS = 50  # Milliseconds between applying status updates posted by worker threads
+METERS_FPS = 20  # Highest redraw rate of the live level and latency meters
+
 # Audio playback
 DEFAULT_VOLUME = 0.8  # Default volume level (0.0 to 1.0)
+STREAM_SAMPLE_RATE = 22050  # Sample rate of streamed playback audio
+STREAM_OUTPUT_FORMAT = f"pcm_{STREAM_SAMPLE_RATE}"  # Raw PCM so chunks can be played as they arrive
+PLAYBACK_BUFFER_SAMPLES = 44100 * 10  # Playback ring buffer size (~10 s at 44.1 kHz mono)
+PLAYBACK_BLOCK_SIZE = 1024  # Samples written to the output stream per call
 
 # Supported languages
 LANGUAGES = {
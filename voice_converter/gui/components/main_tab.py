@@ -1,6 +1,10 @@
+import logging
 import tkinter as tk
 from tkinter import ttk
 from voice_converter import config
+from voice_converter.gui.components.meters_panel import MetersPanelComponent
+
+logger = logging.getLogger(__name__)
 
 class MainTabComponent:
     def __init__(self, parent, audio_manager, api_client, voice_converter, status_bar, toggle_recording_callback):
@@ -93,6 +97,10 @@ def setup_ui(self):
         
         # Initially hide the red indicator
         self.set_recording_state(False)
+        
+        # Levels, queue and latency while the pipeline runs
+        self.meters_panel = MetersPanelComponent(self.parent, self.audio_manager.live_metrics)
+        self.meters_panel.start()
 
     def update_volume_label(self, value):
         """Update the volume percentage label"""
@@ -129,11 +137,11 @@ def select_voice(self, event=None):
             # Update the voice converter with the selected voice
             if self.voice_converter:
                 self.voice_converter.set_voice(voice_id)
-                print(f"Selected voice: {selected_voice} (ID: {voice_id})")
+                logger.info("Selected voice: %s (ID: %s)", selected_voice, voice_id)
             else:
-                print("Warning: Voice converter not available")
+                logger.warning("Voice converter not available")
         else:
-            print(f"Warning: Voice '{selected_voice}' not found in available voices")
+            logger.warning("Voice '%s' not found in available voices", selected_voice)
 
     def select_language(self, event=None):
         """Handle language selection from dropdown"""
@@ -148,25 +156,26 @@ def select_language(self, event=None):
                 if self.voice_converter.settings_manager:
                     self.voice_converter.settings_manager.set("language_code", language_code)
                     
-                print(f"Selected language: {selected_language_name} (Code: {language_code})")
+                logger.info("Selected language: %s (Code: %s)", selected_language_name, language_code)
                 self.status_bar.set_status(f"Language set to {selected_language_name}")
             else:
-                print("Warning: Voice converter not available for language selection")
+                logger.warning("Voice converter not available for language selection")
         else:
-            print(f"Warning: Language '{selected_language_name}' not found in available languages")
+            logger.warning("Language '%s' not found in available languages", selected_language_name)
 
     def toggle_recording(self):
         """Toggle recording state by calling the parent callback"""
         self.toggle_recording_callback()
 
-    def update_voices(self, voices):
+    def update_voices(self, voices, selected=None):
         """Update the voice combobox with available voices
         
         Args:
-            voices (dict): Dictionary of voice names to voice IDs
+            voices: VoiceCatalog or dictionary of voice names to voice IDs
+            selected: Name of the voice to show as selected, the first voice if None or unknown
         """
         if not voices:
-            print("Warning: No voices available to display in dropdown")
+            logger.warning("No voices available to display in dropdown")
             return
         
         # Clear existing values
@@ -179,12 +188,15 @@ def update_voices(self, voices):
         # Store the voice dictionary for later reference
         self.voices = voices
         
-        # If there are voices, select the first one by default
-        if voice_names:
+        if selected in voices:
+            # Already the converter's voice, only show it
+            self.voice_combobox.set(selected)
+        elif voice_names:
+            # Otherwise select the first one by default
             self.voice_combobox.current(0)
             # Update the voice in the voice converter
             selected_voice = voice_names[0]
             voice_id = voices[selected_voice]
             self.voice_converter.set_voice(voice_id)
         
-        print(f"Updated voice dropdown with {len(voice_names)} options") 
\ No newline at end of file
+        logger.info("Updated voice dropdown with %d options", len(voice_names)) 
@@ -0,0 +1,179 @@
+import math
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from voice_converter import config
+
+# Pipeline stages shown in the latency rows: (label, latency span)
+LATENCY_ROWS = (
+    ("End to end", "end_to_end"),
+    ("Queue", "queue"),
+    ("Encode", "encode"),
+    ("API first byte", "api_first_byte"),
+    ("Decode", "decode"),
+    ("Playout", "playout_delay"),
+)
+
+METER_FLOOR_DB = -60.0  # Level at the left end of the meters
+PEAK_FALL_DB_PER_SECOND = 20.0  # How fast the peak marker falls back
+STALE_SECONDS = 0.5  # Levels older than this are shown as silence (stream stopped)
+
+BAR_LEFT = 110
+BAR_WIDTH = 300
+BAR_HEIGHT = 12
+ROW_HEIGHT = 22
+
+class MetersPanelComponent:
+    """Live input/output levels, pipeline state and latency per stage
+
+    Reads the LiveMetrics snapshot published by the audio manager and the
+    voice converter at most fps times a second and moves the existing canvas
+    items; nothing is created after setup and items whose value did not
+    change are not touched. Nothing is drawn while the panel is not visible.
+    """
+
+    def __init__(self, parent, live_metrics, fps=None):
+        self.parent = parent
+        self.live_metrics = live_metrics
+        self.interval_ms = max(1, int(1000 / (fps or config.METERS_FPS)))
+        self._after_id = None
+        self._drawn = {}  # Canvas item -> coordinates or text last drawn
+        self._peak_db = {"input": METER_FLOOR_DB, "output": METER_FLOOR_DB}
+        self._last_frame = time.monotonic()
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Create the canvas and all of its items once"""
+        frame = ttk.LabelFrame(self.parent, text="Live Monitor", padding=10)
+        frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+        height = ROW_HEIGHT * (3 + len(LATENCY_ROWS)) + 10
+        self.canvas = tk.Canvas(frame, height=height, highlightthickness=0)
+        self.canvas.pack(fill=tk.X)
+
+        self.meters = {}
+        for row, (section, label) in enumerate((("input", "Input"), ("output", "Output"))):
+            self.meters[section] = self._create_meter(row * ROW_HEIGHT + 5, label)
+        self.threshold_marker = self.canvas.create_line(0, 0, 0, 0, fill="orange", width=2)
+
+        y = 2 * ROW_HEIGHT + 5
+        self.vad_indicator = self.canvas.create_oval(10, y + 1, 20, y + 11, fill="grey", outline="")
+        self.vad_text = self.canvas.create_text(28, y + 6, anchor=tk.W, text="Silence")
+        self.pipeline_text = self.canvas.create_text(BAR_LEFT, y + 6, anchor=tk.W, text="")
+
+        self.latency_rows = {}
+        for row, (label, span) in enumerate(LATENCY_ROWS):
+            y = (3 + row) * ROW_HEIGHT + 5
+            self.canvas.create_text(10, y + 6, anchor=tk.W, text=label)
+            self.canvas.create_rectangle(BAR_LEFT, y, BAR_LEFT + BAR_WIDTH, y + BAR_HEIGHT,
+                                         fill="#eeeeee", outline="")
+            bar = self.canvas.create_rectangle(BAR_LEFT, y, BAR_LEFT, y + BAR_HEIGHT,
+                                               fill="steelblue" if row else "darkblue", outline="")
+            text = self.canvas.create_text(BAR_LEFT + BAR_WIDTH + 8, y + 6, anchor=tk.W, text="-")
+            self.latency_rows[span] = (bar, text, y)
+
+    def _create_meter(self, y, label):
+        self.canvas.create_text(10, y + 6, anchor=tk.W, text=label)
+        self.canvas.create_rectangle(BAR_LEFT, y, BAR_LEFT + BAR_WIDTH, y + BAR_HEIGHT, fill="#eeeeee", outline="")
+        bar = self.canvas.create_rectangle(BAR_LEFT, y, BAR_LEFT, y + BAR_HEIGHT, fill="green", outline="")
+        peak = self.canvas.create_line(BAR_LEFT, y, BAR_LEFT, y + BAR_HEIGHT, fill="black", width=2)
+        text = self.canvas.create_text(BAR_LEFT + BAR_WIDTH + 8, y + 6, anchor=tk.W, text="")
+        return bar, peak, text, y
+
+    def start(self):
+        """Start redrawing (Tk thread)"""
+        if self._after_id is None:
+            self._after_id = self.parent.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Stop redrawing (Tk thread)"""
+        if self._after_id is not None:
+            self.parent.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        if self.canvas.winfo_viewable():
+            self.redraw(self.live_metrics.snapshot())
+        self._after_id = self.parent.after(self.interval_ms, self._tick)
+
+    def redraw(self, snapshot):
+        """Move the canvas items to the values of a LiveMetrics snapshot"""
+        now = time.monotonic()
+        elapsed, self._last_frame = now - self._last_frame, now
+
+        for section, (bar, peak, text, y) in self.meters.items():
+            values = snapshot.get(section)
+            if values is None or now - values["time"] > STALE_SECONDS:
+                rms_db = peak_db = METER_FLOOR_DB
+            else:
+                rms_db, peak_db = level_db(values["rms"]), level_db(values["peak"])
+            # The peak marker holds the highest recent peak and falls back slowly
+            held = max(peak_db, self._peak_db[section] - PEAK_FALL_DB_PER_SECOND * elapsed)
+            self._peak_db[section] = held
+            self._coords(bar, BAR_LEFT, y, meter_x(rms_db), y + BAR_HEIGHT)
+            self._coords(peak, meter_x(held), y, meter_x(held), y + BAR_HEIGHT)
+            self._text(text, "-" if rms_db <= METER_FLOOR_DB else f"{rms_db:.0f} dBFS")
+
+        values = snapshot.get("input")
+        y = self.meters["input"][3]
+        if values is not None and now - values["time"] <= STALE_SECONDS:
+            x = meter_x(level_db(values["threshold"]))
+            self._coords(self.threshold_marker, x, y - 2, x, y + BAR_HEIGHT + 2)
+            speech = values["speech"]
+        else:
+            self._coords(self.threshold_marker, 0, 0, 0, 0)
+            speech = False
+        self._fill(self.vad_indicator, "limegreen" if speech else "grey")
+        self._text(self.vad_text, "Speech" if speech else "Silence")
+
+        pipeline = snapshot.get("pipeline")
+        output = snapshot.get("output")
+        parts = []
+        if pipeline is not None:
+            parts.append(f"Queued {pipeline['queued']}   Converting {pipeline['converting']}/{pipeline['max_in_flight']}")
+        if output is not None:
+            parts.append(f"Buffered {output['buffered_seconds']:.1f} s   Underruns {output['underruns']}")
+        self._text(self.pipeline_text, "   ".join(parts))
+
+        latency = snapshot.get("latency")
+        spans = latency["spans"] if latency is not None else {}
+        # All rows share one scale (the largest p95 shown), so the stages can be compared
+        scale = max([spans[span][1] for _, span in LATENCY_ROWS if span in spans] + [0.001])
+        for span, (bar, text, y) in self.latency_rows.items():
+            if span not in spans:
+                self._coords(bar, BAR_LEFT, y, BAR_LEFT, y + BAR_HEIGHT)
+                self._text(text, "-")
+                continue
+            p50, p95 = spans[span]
+            self._coords(bar, BAR_LEFT, y, BAR_LEFT + BAR_WIDTH * min(1.0, p50 / scale), y + BAR_HEIGHT)
+            self._text(text, f"{p50 * 1000:.0f} / {p95 * 1000:.0f} ms")
+
+    def _coords(self, item, *coords):
+        coords = tuple(round(value) for value in coords)
+        if self._drawn.get(item) != coords:
+            self._drawn[item] = coords
+            self.canvas.coords(item, *coords)
+
+    def _text(self, item, text):
+        if self._drawn.get(item) != text:
+            self._drawn[item] = text
+            self.canvas.itemconfigure(item, text=text)
+
+    def _fill(self, item, color):
+        if self._drawn.get((item, "fill")) != color:
+            self._drawn[(item, "fill")] = color
+            self.canvas.itemconfigure(item, fill=color)
+
+
+def level_db(level):
+    """Return an int16 amplitude in dB relative to full scale, at least METER_FLOOR_DB"""
+    if level <= 0:
+        return METER_FLOOR_DB
+    return max(METER_FLOOR_DB, 20 * math.log10(level / 32768.0))
+
+
+def meter_x(db):
+    """Return the canvas x of a level in dBFS on the meter scale"""
+    return BAR_LEFT + BAR_WIDTH * (db - METER_FLOOR_DB) / -METER_FLOOR_DB
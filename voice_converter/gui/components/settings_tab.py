@@ -1,13 +1,17 @@
+import logging
 import tkinter as tk
 from tkinter import ttk
-import numpy as np
+
+logger = logging.getLogger(__name__)
 
 class SettingsTabComponent:
-    def __init__(self, parent, audio_manager, voice_converter, status_bar):
+    def __init__(self, parent, audio_manager, voice_converter, status_bar, ui_events, on_api_key_saved=None):
         self.parent = parent
         self.audio_manager = audio_manager
         self.voice_converter = voice_converter
         self.status_bar = status_bar
+        self.ui_events = ui_events  # Calibration callbacks arrive on the capture thread
+        self.on_api_key_saved = on_api_key_saved
         
         self.setup_ui()
         
@@ -61,6 +65,21 @@ def setup_ui(self):
         )
         self.calibrate_button.grid(column=1, row=3, sticky=tk.W, padx=5, pady=10)
         
+        # Continuous recalibration while recording
+        auto_calibrate = False
+        if self.voice_converter.settings_manager:
+            auto_calibrate = self.voice_converter.settings_manager.get("auto_calibration", False)
+        self.auto_calibrate = tk.BooleanVar(value=auto_calibrate)
+        self.auto_calibrate_check = ttk.Checkbutton(
+            audio_frame,
+            text="Adjust threshold to background noise while recording",
+            variable=self.auto_calibrate,
+            command=self.toggle_auto_calibration
+        )
+        self.auto_calibrate_check.grid(column=1, row=4, sticky=tk.W, padx=5)
+        if auto_calibrate:
+            self.toggle_auto_calibration()
+        
         # API settings section
         api_frame = ttk.LabelFrame(self.parent, text="API Settings", padding=10)
         api_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -177,61 +196,52 @@ def select_output_device(self, event):
             self.status_bar.set_status("Invalid output device selected")
 
     def calibrate_threshold(self):
-        """Automatically calibrate the silence threshold"""
-        self.status_bar.set_status("Calibrating threshold, please remain quiet for a moment...")
+        """Automatically calibrate the silence threshold
         
-        # Start a short recording to analyze background noise
-        try:
-            # Create a short recording stream
-            stream = self.audio_manager.p.open(
-                format=self.audio_manager.p.get_format_from_width(2),
-                channels=1,
-                rate=44100,
-                input=True,
-                input_device_index=self.audio_manager.input_device,
-                frames_per_buffer=1024
+        The audio manager measures the noise floor on its capture thread; its
+        callbacks are handed to the Tk thread through the UI event bridge.
+        """
+        self.status_bar.set_status("Calibrating threshold, please remain quiet for a moment...")
+        self.calibrate_button.config(state=tk.DISABLED)
+        started = self.audio_manager.calibrate(
+            on_progress=lambda progress: self.ui_events.post("status", self._show_calibration_progress, progress),
+            on_done=lambda threshold, stats: self.ui_events.call(self._finish_calibration, threshold, stats)
+        )
+        if not started:
+            self.calibrate_button.config(state=tk.NORMAL)
+            self.status_bar.set_status("Calibration error - See log for details")
+    
+    def _show_calibration_progress(self, progress):
+        self.status_bar.set_status(f"Calibration in progress: {progress}% (please remain quiet)")
+    
+    def _finish_calibration(self, threshold, stats):
+        """Apply a calibrated threshold (Tk thread)"""
+        self.calibrate_button.config(state=tk.NORMAL)
+        self._show_threshold(threshold)
+        self.voice_converter.on_threshold_change(threshold)
+        self.status_bar.set_status(f"Microphone calibrated to threshold {threshold} "
+                                   f"(noise floor {stats['noise_floor']:.0f})")
+    
+    def toggle_auto_calibration(self):
+        """Turn continuous recalibration during recording on or off"""
+        enabled = self.auto_calibrate.get()
+        if enabled:
+            self.audio_manager.start_auto_calibration(
+                on_update=lambda threshold: self.ui_events.post("auto_threshold", self._apply_auto_threshold, threshold)
             )
-            
-            # Collect 2 seconds of ambient audio
-            frames = []
-            samples = int(44100 / 1024 * 2)  # 2 seconds of audio
-            
-            # Visual feedback during calibration
-            for i in range(samples):
-                data = stream.read(1024)
-                frames.append(data)
-                if i % 5 == 0:  # Update status every few frames
-                    progress = int((i / samples) * 100)
-                    self.status_bar.set_status(f"Calibration in progress: {progress}% (please remain quiet)")
-                    self.parent.update()  # Update UI
-            
-            # Stop and close the stream
-            stream.stop_stream()
-            stream.close()
-            
-            # Analyze audio to determine threshold
-            if frames:
-                # Convert all frames to numpy arrays
-                audio_arrays = [np.frombuffer(frame, dtype=np.int16) for frame in frames]
-                all_audio = np.concatenate(audio_arrays)
-                
-                # Calculate RMS
-                rms = np.sqrt(np.mean(np.square(all_audio.astype(float))))
-                
-                # Set threshold to 2.5x the ambient noise (minimum 150)
-                new_threshold = max(int(rms * 2.5), 150)
-                
-                # Update threshold in the UI and system
-                self.threshold_slider.set(new_threshold)
-                self.threshold_label.config(text=str(new_threshold))
-                self.voice_converter.on_threshold_change(new_threshold)
-                
-                self.status_bar.set_status(f"Microphone calibrated to threshold {new_threshold}")
-            else:
-                self.status_bar.set_status("Calibration failed: No audio data recorded")
-        except Exception as e:
-            print(f"Error during calibration: {e}")
-            self.status_bar.set_status("Calibration error - See console for details")
+        else:
+            self.audio_manager.stop_auto_calibration()
+        if self.voice_converter.settings_manager:
+            self.voice_converter.settings_manager.set("auto_calibration", enabled)
+    
+    def _apply_auto_threshold(self, threshold):
+        """Show and save a threshold set by continuous recalibration (Tk thread)"""
+        self._show_threshold(threshold)
+        self.voice_converter.on_threshold_change(threshold)
+    
+    def _show_threshold(self, threshold):
+        self.threshold_slider.set(threshold)
+        self.threshold_label.config(text=str(threshold))
 
     def save_api_key(self):
         """Save the API key and update the client"""
@@ -251,4 +261,5 @@ def save_api_key(self):
         self.status_bar.set_status("API key saved successfully")
         
         # Refresh voice list with new API key
-        self.parent.after(500, lambda: self.parent.master.after(500, self.parent.master.load_voices)) 
\ No newline at end of file
+        if self.on_api_key_saved:
+            self.on_api_key_saved()
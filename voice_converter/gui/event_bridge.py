@@ -0,0 +1,104 @@
+import itertools
+import logging
+import threading
+import tkinter as tk
+
+from voice_converter import config
+
+logger = logging.getLogger(__name__)
+
+class UIEventBridge:
+    """Hands updates from worker and audio threads to the Tk thread
+
+    Tk must only be touched from the thread running its mainloop. Workers
+    post() updates here instead of calling widgets or root.after() directly;
+    a timer on the Tk thread applies them every interval_ms. Updates posted
+    under the same key replace each other until they are applied, so a
+    burst of status messages costs one widget update per tick, and posting
+    only holds a lock long enough to store the update.
+
+    Args:
+        root: The Tk root (or any widget) whose after() drives the bridge
+        interval_ms: Milliseconds between applying pending updates
+    """
+
+    def __init__(self, root, interval_ms=None):
+        self.root = root
+        self.interval_ms = interval_ms or config.UI_UPDATE_INTERVAL_MS
+        self._pending = {}  # key -> (callback, args), in order of first posting
+        self._lock = threading.Lock()
+        self._unique = itertools.count()  # Keys of updates that are never replaced
+        self._after_id = None
+        self.posted = 0
+        self.coalesced = 0  # Updates replaced by a later one before they were applied
+        self.applied = 0
+
+    def start(self):
+        """Start applying updates (Tk thread)"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Stop applying updates; pending ones are discarded (Tk thread)"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass  # Window already destroyed
+            self._after_id = None
+        with self._lock:
+            self._pending.clear()
+
+    def post(self, key, callback, *args):
+        """Call callback(*args) on the Tk thread, replacing a pending update with the same key
+
+        Safe to call from any thread. Use one key per thing shown (a status
+        line, a progress value) so only its latest value is drawn.
+        """
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (callback, args)
+            self.posted += 1
+
+    def call(self, callback, *args):
+        """Call callback(*args) on the Tk thread, never replaced by later updates
+
+        For one-off events such as results or dialogs. Safe to call from any thread.
+        """
+        self.post(("call", next(self._unique)), callback, *args)
+
+    def _tick(self):
+        self._after_id = None
+        self.apply_pending()
+        try:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+        except tk.TclError:
+            pass  # Window destroyed while applying
+
+    def apply_pending(self):
+        """Apply the updates posted since the last call (Tk thread)
+
+        Returns:
+            int: Number of updates applied
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+        for callback, args in pending.values():
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception("UI update %r failed", callback)
+        self.applied += len(pending)
+        return len(pending)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "posted": self.posted,
+                "coalesced": self.coalesced,
+                "applied": self.applied,
+                "pending": len(self._pending),
+            }
@@ -3,6 +3,8 @@
 import threading
 import time
 
+from voice_converter import config
+from voice_converter.gui.event_bridge import UIEventBridge
 from voice_converter.gui.components.main_tab import MainTabComponent
 from voice_converter.gui.components.settings_tab import SettingsTabComponent
 from voice_converter.gui.components.status_bar import StatusBarComponent
@@ -14,13 +16,17 @@ def __init__(self, root, audio_manager, api_client, voice_converter):
         self.api_client = api_client
         self.voice_converter = voice_converter
         
-        # Status-Callback registrieren
+        # Worker and audio threads reach the widgets only through this bridge
+        self.ui_events = UIEventBridge(self.root)
+        self._quota_dialog_open = False
+        
+        # Status-Callback registrieren (called from conversion threads)
         self.voice_converter.set_status_callback(self.show_api_error)
         
         # Configure the root window
         self.root.title("Voice Converter")
-        self.root.geometry("600x500")
-        self.root.minsize(500, 400)
+        self.root.geometry("600x720")
+        self.root.minsize(560, 640)
         
         # Set up the main frame
         self.main_frame = ttk.Frame(self.root, padding="20")
@@ -64,14 +70,18 @@ def __init__(self, root, audio_manager, api_client, voice_converter):
             self.settings_tab,
             self.audio_manager,
             self.voice_converter,
-            self.status_bar
+            self.status_bar,
+            self.ui_events,
+            on_api_key_saved=self.load_voices
         )
         
-        # Fetch voices on startup in a separate thread
-        threading.Thread(target=self.load_voices, daemon=True).start()
+        self.ui_events.start()
+        
+        # Show the cached voices now and refresh them in a separate thread
+        self.load_voices()
         
     def load_voices(self):
-        """Load voices in a background thread"""
+        """Show the cached voices, then bring them up to date in a background thread"""
         # Check if API key is available
         api_key = self.api_client.settings_manager.get("api_key")
         if not api_key:
@@ -80,33 +90,29 @@ def load_voices(self):
             self.tab_control.select(self.settings_tab)
             return
         
-        self.status_bar.set_status("Loading voices...")
-        voices, languages = self.api_client.get_voices()
+        cached = self.api_client.cached_voices()
+        if cached:
+            self.update_voices_ui(cached, config.LANGUAGES)
+        else:
+            self.status_bar.set_status("Loading voices...")
+        threading.Thread(target=self.refresh_voices, daemon=True).start()
+    
+    def refresh_voices(self):
+        """Check the voice list with the API in a background thread"""
+        voices, changed = self.api_client.refresh_voices()
         
-        if voices:
+        if changed:
             # Update UI on main thread
-            self.root.after(0, lambda: self.update_voices_ui(voices, languages))
-        else:
-            self.status_bar.set_status("Error loading voices. Check your API key.")
+            self.ui_events.call(self.update_voices_ui, voices, config.LANGUAGES)
+        elif not voices:
+            self.ui_events.post("status", self.status_bar.set_status, "Error loading voices. Check your API key.")
     
     def update_voices_ui(self, voices, languages):
         """Update UI with voice data"""
-        if isinstance(voices, dict):
-            # If voices is a dictionary (name -> id)
-            self.main_tab_component.update_voices(voices)
-            
-            # Set the voice from saved settings
-            saved_voice_id = self.voice_converter.voice_id
-            if saved_voice_id:
-                # Find voice name for the saved ID
-                for voice_name, voice_id in voices.items():
-                    if voice_id == saved_voice_id:
-                        # Set the combobox to this voice
-                        self.main_tab_component.voice_combobox.set(voice_name)
-                        break
-        else:
-            # If voices is not in the expected format, log an error
-            print(f"Warning: Unexpected voices format: {type(voices)}")
+        # Keep the saved voice selected if it is still available
+        saved_voice_id = self.voice_converter.voice_id
+        selected = voices.name_for(saved_voice_id) if saved_voice_id else None
+        self.main_tab_component.update_voices(voices, selected=selected)
         
         self.voices_loaded = True
         self.status_bar.set_status("Voices loaded successfully")
@@ -127,11 +133,26 @@ def toggle_recording_callback(self):
         self.is_recording = not self.is_recording 
 
     def show_api_error(self, message):
-        """Shows API error messages in a dialog or in the status bar"""
-        self.status_bar.set_status(message)
+        """Shows API error messages in a dialog or in the status bar
+        
+        Called from the conversion threads; only the latest message of a
+        burst reaches the status bar.
+        """
+        self.ui_events.post("status", self.status_bar.set_status, message)
         
         # For important errors like quota exceeded, also show a dialog
         if "Quota exceeded" in message:
-            import tkinter.messagebox as messagebox
+            self.ui_events.post("quota_dialog", self._show_quota_dialog, message)
+    
+    def _show_quota_dialog(self, message):
+        # The dialog runs a nested event loop that keeps applying updates,
+        # so every failing segment would open another one on top
+        if self._quota_dialog_open:
+            return
+        import tkinter.messagebox as messagebox
+        self._quota_dialog_open = True
+        try:
             messagebox.showwarning("API Quota Exceeded", 
-                f"{message}\n\nPlease wait until your quota is reset, or upgrade your plan at ElevenLabs.") 
\ No newline at end of file
+                f"{message}\n\nPlease wait until your quota is reset, or upgrade your plan at ElevenLabs.")
+        finally:
+            self._quota_dialog_open = False
\ No newline at end of file
@@ -1,17 +1,31 @@
-import tkinter as tk
 import sys
 import os
 
 # Add project root to path so package can be run from any directory
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from voice_converter.audio.audio_manager import AudioManager
+from voice_converter import config
 from voice_converter.api.elevenlabs_client import ElevenLabsClient
+from voice_converter.api.voice_catalog import VoiceCatalogCache
+from voice_converter.utils.conversion_cache import create_cache
+from voice_converter.utils.log import setup_logging
 from voice_converter.utils.settings_manager import SettingsManager
-from voice_converter.gui.gui import VoiceConverterGUI
-from voice_converter.voice_converter import VoiceConverter
 
 def main():
+    if sys.argv[1:2] == ["batch"]:
+        # Offline file conversion, no GUI
+        from voice_converter.batch import main as batch_main
+        return batch_main(sys.argv[2:])
+
+    # Imported only here, so batch runs on machines without Tk or PortAudio
+    import tkinter as tk
+    from voice_converter.audio.audio_manager import AudioManager
+    from voice_converter.gui.gui import VoiceConverterGUI
+    from voice_converter.voice_converter import VoiceConverter
+
+    # Log through a background writer, so the audio thread never waits for the console
+    setup_logging()
+    
     # Initialize settings manager
     settings_manager = SettingsManager()
     
@@ -19,10 +33,16 @@ def main():
     audio_manager = AudioManager(settings_manager)
     
     # Initialize API client
-    api_client = ElevenLabsClient(settings_manager)
+    voice_cache = VoiceCatalogCache(config.VOICE_CACHE_PATH, config.VOICE_CACHE_TTL) if config.VOICE_CACHE_PATH else None
+    api_client = ElevenLabsClient(settings_manager, cache=create_cache(), voice_cache=voice_cache)
+    if config.API_WARM_UP:
+        # Connect in the background so the first utterance skips the handshake
+        api_client.warm_up()
     
     # Initialize voice converter
     voice_converter = VoiceConverter(audio_manager, api_client, settings_manager)
+    if config.METRICS_PORT:
+        voice_converter.latency.serve_prometheus(config.METRICS_PORT)
     
     # Set up GUI
     root = tk.Tk()
@@ -30,6 +50,9 @@ def main():
     
     # Start the application
     root.mainloop()
+    voice_converter.latency.close()
+    api_client.close()
+    settings_manager.flush()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
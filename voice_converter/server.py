@@ -0,0 +1,377 @@
+"""Headless conversion server.
+
+Runs the conversion engine without the GUI: clients open a WebSocket session,
+stream 16-bit mono PCM in as binary messages and receive the converted audio
+back the same way. Every session has its own voice, language, VAD and
+AsyncVoiceConverter; all sessions share one event loop, one API client and
+its connection pool.
+
+Protocol (ws://host:port/v1/session?voice_id=...&language_code=...&sample_rate=16000):
+
+    client -> server  binary            PCM at sample_rate
+    client -> server  {"type": "config", "voice_id": ..., "language_code": ...}
+    client -> server  {"type": "flush"}  end the current utterance now
+    client -> server  {"type": "end"}    finish converting, then close
+    server -> client  {"type": "ready", "session": ..., "output_format": ...}
+    server -> client  {"type": "audio_start"}, binary chunks, {"type": "audio_end"}
+    server -> client  {"type": "error", "message": ...}  also for malformed messages
+    server -> client  {"type": "stats", ...} in reply to {"type": "stats"}
+
+Backpressure: converted audio is sent no faster than the client reads it
+(SERVER_WRITE_LIMIT); a session that falls behind keeps its conversion slots
+busy, so its segments wait in a bounded queue whose overflow policy drops or
+merges them. Sessions beyond SERVER_MAX_SESSIONS are refused with HTTP 503
+(or closed with code 1013 if their handshakes raced past that check), and
+invalid query parameters with HTTP 400.
+Plain HTTP GET /health, /stats and /metrics (Prometheus) are answered on the same port.
+
+Needs the websockets package (pip install voice-converter[server]).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import signal
+import urllib.parse
+from http import HTTPStatus
+
+from voice_converter import config
+from voice_converter.api.async_client import AsyncElevenLabsClient
+from voice_converter.api.scheduler import RequestScheduler
+from voice_converter.api.transport import HttpTransport
+from voice_converter.async_voice_converter import AsyncVoiceConverter
+from voice_converter.audio.encoders import UploadEncoder
+from voice_converter.audio.vad import SpeechSegmenter, create_vad
+from voice_converter.utils.latency import LatencyTracer
+from voice_converter.utils.log import setup_logging
+from voice_converter.utils.segment_queue import DROP_NEWEST, DROP_OLDEST, MERGE
+from voice_converter.utils.settings_manager import load_api_key
+
+logger = logging.getLogger(__name__)
+
+try:
+    from websockets.asyncio.server import serve
+    from websockets.exceptions import ConnectionClosed
+except ImportError:  # Optional dependency for the server
+    serve = None
+    ConnectionClosed = Exception
+
+SESSION_PATH = "/v1/session"
+CLOSE_TRY_AGAIN_LATER = 1013  # WebSocket close code for sessions beyond the limit
+
+# The event loop must never block, so the "block" overflow policy is not offered
+SESSION_OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, MERGE)
+
+
+def session_params(path):
+    """Parse and check the query parameters of a session request
+
+    Returns:
+        dict: The parameters, with sample_rate as an int and threshold as a float
+
+    Raises:
+        ValueError: If a parameter is malformed
+    """
+    params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(path).query))
+    try:
+        params["sample_rate"] = int(params.get("sample_rate", config.RATE))
+    except ValueError:
+        raise ValueError("sample_rate must be an integer") from None
+    if not 8000 <= params["sample_rate"] <= 192000:
+        raise ValueError("sample_rate must be between 8000 and 192000")
+    try:
+        params["threshold"] = float(params.get("threshold", config.DEFAULT_SILENCE_THRESHOLD))
+    except ValueError:
+        raise ValueError("threshold must be a number") from None
+    if not params["threshold"] >= 0:  # Also refuses nan
+        raise ValueError("threshold must not be negative")
+    return params
+
+
+class SessionAudio:
+    """Stands in for AudioManager in a session: encodes uploads and sends converted audio to the client"""
+
+    def __init__(self, connection, sample_rate):
+        self.connection = connection
+        self.upload_encoder = UploadEncoder(input_rate=sample_rate)
+        self.segments_sent = 0
+        self.bytes_sent = 0
+
+    def record_to_file(self, segment):
+        return self.upload_encoder.encode(segment)
+
+    async def play_audio_stream_async(self, chunks, sample_rate=None, trace=None):
+        """Forward converted chunks to the client, waiting while it is not reading
+
+        The trace's playback events mark when the audio was handed to the
+        connection, the client's own buffering is not included.
+        """
+        played = False
+        await self.connection.send(json.dumps({"type": "audio_start"}))
+        try:
+            async for chunk in chunks:
+                await self.connection.send(chunk)
+                if trace:
+                    trace.mark("first_played")
+                self.bytes_sent += len(chunk)
+                played = True
+            if trace:
+                trace.mark("decode_done")
+                trace.mark("last_played")
+        finally:
+            await self.connection.send(json.dumps({"type": "audio_end"}))
+        self.segments_sent += 1
+        return played
+
+
+class ConversionSession:
+    """One client connection: segments its audio and converts it with its own settings"""
+
+    def __init__(self, session_id, connection, api_client, params, latency=None):
+        self.session_id = session_id
+        self.connection = connection
+        self.sample_rate = params["sample_rate"]
+        self.frame_bytes = config.FRAMES_PER_BUFFER * 2
+
+        self.audio = SessionAudio(connection, self.sample_rate)
+        self.converter = AsyncVoiceConverter(self.audio, api_client, max_in_flight=config.SERVER_SESSION_IN_FLIGHT,
+                                             latency=latency)
+        self.converter.voice_id = params.get("voice_id") or config.DEFAULT_VOICE_ID
+        self.converter.language_code = params.get("language_code", "en")
+        self.converter.set_status_callback(self._send_error)
+
+        queue = self.converter.audio_queue
+        queue.maxsize = config.SERVER_SESSION_QUEUE_SIZE
+        policy = params.get("overflow", DROP_OLDEST)
+        queue.policy = policy if policy in SESSION_OVERFLOW_POLICIES else DROP_OLDEST
+
+        vad = create_vad(params.get("vad", config.VAD_ENGINE), self.sample_rate, params["threshold"])
+        self.segmenter = SpeechSegmenter(vad, frames_per_buffer=config.FRAMES_PER_BUFFER)
+        self._pending = bytearray()  # Received PCM not yet analysed
+
+    async def run(self):
+        """Serve the session until the client disconnects or ends it"""
+        runner = asyncio.ensure_future(self.converter.run())
+        try:
+            await self.connection.send(json.dumps({
+                "type": "ready",
+                "session": self.session_id,
+                "output_format": config.STREAM_OUTPUT_FORMAT,
+            }))
+            async for message in self.connection:
+                if isinstance(message, bytes):
+                    self._receive_audio(message)
+                    continue
+                try:
+                    message = json.loads(message)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    await self._reply_error("Control messages must be JSON objects")
+                elif not await self._control(message):
+                    break
+        except ConnectionClosed:
+            pass
+        finally:
+            self.converter.stop()
+            await runner
+
+    def _receive_audio(self, data):
+        """Feed received PCM to the segmenter in whole buffers"""
+        self._pending += data
+        frame_bytes = self.frame_bytes
+        usable = len(self._pending) - len(self._pending) % frame_bytes
+        for offset in range(0, usable, frame_bytes):
+            segment = self.segmenter.process(bytes(self._pending[offset:offset + frame_bytes]))
+            if segment:
+                self.converter.add_audio_to_queue(segment)
+        del self._pending[:usable]
+
+    async def _control(self, message):
+        """Handle a control message
+
+        Returns:
+            bool: False when the session should end
+        """
+        kind = message.get("type")
+        if kind == "config":
+            values = {key: message.get(key) for key in ("language_code", "voice_id")}
+            if any(value is not None and not isinstance(value, str) for value in values.values()):
+                await self._reply_error("voice_id and language_code must be strings")
+                return True
+            if values["language_code"]:
+                self.converter.language_code = values["language_code"]
+            if values["voice_id"]:
+                self.converter.set_voice(values["voice_id"])
+        elif kind == "flush":
+            self._flush()
+        elif kind == "stats":
+            await self.connection.send(json.dumps(dict(self.stats(), type="stats")))
+        elif kind == "end":
+            self._flush()
+            while not self.converter.idle():
+                await asyncio.sleep(0.05)
+            await self.connection.send(json.dumps(dict(self.stats(), type="done")))
+            return False
+        else:
+            await self._reply_error(f"Unknown message type: {kind!r}")
+        return True
+
+    def _flush(self):
+        segment = self.segmenter.flush()
+        self.segmenter.reset()
+        if segment:
+            self.converter.add_audio_to_queue(segment)
+
+    def _send_error(self, message):
+        asyncio.ensure_future(self._reply_error(message))
+
+    async def _reply_error(self, message):
+        await self.connection.send(json.dumps({"type": "error", "message": message}))
+
+    def stats(self):
+        """Return segmentation, queue and output statistics of the session"""
+        return {
+            "session": self.session_id,
+            "segmentation": self.segmenter.stats(),
+            "queue": self.converter.get_queue_stats(),
+            "segments_sent": self.audio.segments_sent,
+            "bytes_sent": self.audio.bytes_sent,
+        }
+
+
+class ConversionServer:
+    """WebSocket server running many conversion sessions on one event loop
+
+    Args:
+        api_key: ElevenLabs API key
+        base_url: API endpoint override
+        host: Interface to listen on
+        port: Port to listen on
+        max_sessions: Concurrent sessions before new clients are refused
+    """
+
+    def __init__(self, api_key, base_url=None, host=config.SERVER_HOST, port=config.SERVER_PORT,
+                 max_sessions=config.SERVER_MAX_SESSIONS):
+        if serve is None:
+            raise RuntimeError("The conversion server needs the websockets package")
+
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.transport = HttpTransport(base_url, max_connections=config.SERVER_MAX_CONNECTIONS)
+        # All sessions share the rate limit and the request slots
+        scheduler = RequestScheduler(rate=config.SERVER_API_RATE_LIMIT, max_concurrent=config.SERVER_MAX_CONNECTIONS)
+        self.api_client = AsyncElevenLabsClient(base_url=base_url, transport=self.transport, scheduler=scheduler)
+        self.api_client.set_api_key(api_key)
+        # Segment latencies of all sessions together
+        self.latency = LatencyTracer(jsonl_path=config.LATENCY_TRACE_PATH)
+
+        self.sessions = {}
+        self._session_ids = itertools.count(1)
+        self.sessions_started = 0
+        self.sessions_refused = 0
+
+    async def serve(self, stop=None):
+        """Accept sessions until stop (an awaitable) completes, forever if None"""
+        await self.api_client.warm_up()
+        async with serve(self._handle, self.host, self.port,
+                         process_request=self._process_request,
+                         write_limit=config.SERVER_WRITE_LIMIT,
+                         compression=None) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            logger.info("Conversion server listening on ws://%s:%d%s", self.host, self.port, SESSION_PATH)
+            await (stop if stop is not None else asyncio.Future())
+        await self.api_client.aclose()
+
+    def _process_request(self, connection, request):
+        """Answer plain HTTP requests and refuse sessions beyond the limit"""
+        path = urllib.parse.urlsplit(request.path).path
+        if path == "/health":
+            return connection.respond(HTTPStatus.OK, "ok\n")
+        if path == "/stats":
+            response = connection.respond(HTTPStatus.OK, json.dumps(self.stats()) + "\n")
+            response.headers["Content-Type"] = "application/json"
+            return response
+        if path == "/metrics":
+            response = connection.respond(HTTPStatus.OK, self.latency.prometheus_text())
+            response.headers["Content-Type"] = "text/plain; version=0.0.4"
+            return response
+        if path != SESSION_PATH:
+            return connection.respond(HTTPStatus.NOT_FOUND, "Not found\n")
+        try:
+            session_params(request.path)
+        except ValueError as e:
+            return connection.respond(HTTPStatus.BAD_REQUEST, f"{e}\n")
+        if len(self.sessions) >= self.max_sessions:
+            self.sessions_refused += 1
+            return connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, "Too many sessions, try again later\n")
+        return None
+
+    async def _handle(self, connection):
+        # Handshakes complete concurrently, so all of them may have passed the check
+        # in _process_request; sessions are registered here without awaiting in between
+        if len(self.sessions) >= self.max_sessions:
+            self.sessions_refused += 1
+            await connection.close(CLOSE_TRY_AGAIN_LATER, "Too many sessions, try again later")
+            return
+        session_id = next(self._session_ids)
+
+        params = session_params(connection.request.path)  # Checked in _process_request
+        session = ConversionSession(session_id, connection, self.api_client, params, self.latency)
+        self.sessions[session_id] = session
+        self.sessions_started += 1
+        try:
+            await session.run()
+        finally:
+            del self.sessions[session_id]
+
+    def stats(self):
+        """Return server-wide statistics"""
+        return {
+            "sessions": len(self.sessions),
+            "sessions_started": self.sessions_started,
+            "sessions_refused": self.sessions_refused,
+            "segments_sent": sum(session.audio.segments_sent for session in self.sessions.values()),
+            "api": self.api_client.scheduler.stats(),
+            "latency": self.latency.stats(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless voice conversion server")
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--max-sessions", type=int, default=config.SERVER_MAX_SESSIONS)
+    parser.add_argument("--base-url", default=config.API_BASE_URL, help="API endpoint override")
+    parser.add_argument("--api-key", help="ElevenLabs API key (default: $ELEVENLABS_API_KEY or the saved settings)")
+    parser.add_argument("--log-level", default=config.LOG_LEVEL, help="DEBUG, INFO, WARNING or ERROR")
+    args = parser.parse_args()
+    setup_logging(args.log_level.upper())
+
+    api_key = load_api_key(args.api_key)
+    if not api_key:
+        parser.error("No API key: pass --api-key or set ELEVENLABS_API_KEY")
+
+    server = ConversionServer(api_key, args.base_url, args.host, args.port, args.max_sessions)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+            except NotImplementedError:  # Windows
+                pass
+        await server.serve(stop)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
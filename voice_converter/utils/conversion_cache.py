@@ -0,0 +1,297 @@
+import collections
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import time
+
+from voice_converter import config
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(audio, voice_id, model_id, **settings):
+    """Hash the uploaded audio and everything else that shapes the converted result
+
+    Args:
+        audio: Input audio as bytes, a memoryview or a seekable file object
+        voice_id: Target voice
+        model_id: Conversion model
+        settings: Other request parameters (output format, language, ...)
+
+    Returns:
+        str: Hex digest identifying the conversion
+    """
+    digest = hashlib.sha256()
+    for name, value in [("voice_id", voice_id), ("model_id", model_id)] + sorted(settings.items()):
+        digest.update(f"{name}={value}\n".encode())
+    if hasattr(audio, "getbuffer"):
+        digest.update(audio.getbuffer())
+    elif hasattr(audio, "read"):
+        position = audio.tell()
+        digest.update(audio.read())
+        audio.seek(position)
+    else:
+        digest.update(audio)
+    return digest.hexdigest()
+
+
+def create_cache(enabled=None):
+    """Return a ConversionCache configured from config, or None if caching is disabled
+
+    Args:
+        enabled: Whether to cache, config.CACHE_ENABLED (live conversion) if None
+    """
+    if not (config.CACHE_ENABLED if enabled is None else enabled):
+        return None
+    return ConversionCache()
+
+
+class ConversionCache:
+    """Converted audio by cache_key(), in a memory LRU backed by files on disk
+
+    Small entries are kept in memory up to memory_bytes; entries of
+    mmap_threshold bytes or more are only stored on disk and memory-mapped
+    when read, so they cost no heap and no copy. The disk store is limited
+    to disk_bytes (least recently used files go first) and entries older
+    than max_age seconds are discarded. Safe to use from several threads.
+
+    Args:
+        directory: Where the entries are stored, None for memory only
+        memory_bytes: Size of the in-memory LRU
+        disk_bytes: Size of the disk store
+        max_age: Seconds an entry stays valid, None to keep entries until evicted
+        mmap_threshold: Entries this large are memory-mapped instead of held in memory
+    """
+
+    def __init__(self, directory=config.CACHE_DIR, memory_bytes=config.CACHE_MEMORY_BYTES,
+                 disk_bytes=config.CACHE_DISK_BYTES, max_age=config.CACHE_MAX_AGE,
+                 mmap_threshold=config.CACHE_MMAP_THRESHOLD):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.max_age = max_age
+        self.mmap_threshold = mmap_threshold
+
+        self._memory = collections.OrderedDict()  # key -> (bytes, stored at), least recent first
+        self._memory_size = 0
+        self._disk = collections.OrderedDict()  # key -> (size, last used), least recent first
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expired = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".bin")
+
+    def _load_index(self):
+        """Index the entries left on disk by earlier runs, dropping expired ones"""
+        entries = []
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(directory, name)
+                if not name.endswith(".bin"):
+                    if name.endswith(".tmp"):  # Interrupted write
+                        self._remove(path)
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self._is_expired(stat.st_mtime):
+                    self._remove(path)
+                    self.expired += 1
+                    continue
+                entries.append((stat.st_atime, name[:-4], stat.st_size))
+
+        for used, key, size in sorted(entries):
+            self._disk[key] = (size, used)
+            self._disk_size += size
+        for path in self._evict_disk():
+            self._remove(path)
+
+    def _is_expired(self, stored):
+        return self.max_age is not None and time.time() - stored > self.max_age
+
+    def get(self, key):
+        """Return the cached audio for key, or None
+
+        Returns:
+            bytes or mmap.mmap: The converted audio (a read-only mapping for large entries)
+        """
+        stale = None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, stored = entry
+                if not self._is_expired(stored):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return data
+                stale = self._discard(key)
+                self.expired += 1
+
+            on_disk = key in self._disk
+            if not on_disk:
+                self.misses += 1
+        self._remove(stale)
+        if not on_disk:
+            return None
+
+        # The file is read without the lock, so a slow disk does not hold up other threads' lookups
+        path = self._path(key)
+        data = None
+        expired = False
+        try:
+            stat = os.stat(path)
+            expired = self._is_expired(stat.st_mtime)
+            if not expired:
+                size = stat.st_size
+                with open(path, 'rb') as f:
+                    if size >= self.mmap_threshold:
+                        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    else:
+                        data = f.read()
+        except (OSError, ValueError):
+            pass
+
+        if data is None:
+            with self._lock:
+                stale = self._discard(key)
+                self.expired += expired
+                self.misses += 1
+            self._remove(stale)
+            return None
+
+        # Record the use in the access time, which orders the LRU of the next run
+        now = time.time()
+        try:
+            os.utime(path, (now, stat.st_mtime))
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._disk:  # Unless it was evicted meanwhile
+                self._disk[key] = (size, now)
+                self._disk.move_to_end(key)
+            if size < self.mmap_threshold:
+                self._remember(key, data, stat.st_mtime)
+            self.disk_hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store converted audio under key"""
+        data = bytes(data)
+        with self._lock:
+            self.stores += 1
+            if len(data) < self.mmap_threshold or not self.directory:
+                self._remember(key, data, time.time())
+        if not self.directory:
+            return
+
+        # Written without the lock, under a temporary name per thread so readers
+        # never see a partial entry and concurrent stores of one key don't collide
+        path = self._path(key)
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.error("Error writing conversion cache: %s", e)
+            self._remove(temporary)
+            return
+
+        with self._lock:
+            if key in self._disk:
+                self._disk_size -= self._disk[key][0]
+            self._disk[key] = (len(data), time.time())
+            self._disk.move_to_end(key)
+            self._disk_size += len(data)
+            evicted = self._evict_disk()
+        for stale in evicted:
+            self._remove(stale)
+
+    def _remember(self, key, data, stored):
+        """Add an entry to the memory LRU, evicting the least recently used ones"""
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key)[0])
+        self._memory[key] = (data, stored)
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.evictions += 1
+
+    def _evict_disk(self):
+        """Drop least recently used disk entries over disk_bytes from the index
+
+        Returns:
+            list: Paths of the evicted files, to be removed once the lock is released
+        """
+        evicted = []
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, (size, _) = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(self._path(key))
+            self.evictions += 1
+        return evicted
+
+    def _discard(self, key):
+        """Forget an entry everywhere
+
+        Returns:
+            str: Path of its file, to be removed once the lock is released, or None
+        """
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key)[0])
+        if key in self._disk:
+            self._disk_size -= self._disk.pop(key)[0]
+            return self._path(key)
+        return None
+
+    def _remove(self, path):
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except OSError:  # Already gone, or still mapped on Windows
+            pass
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            stale = [self._discard(key) for key in list(self._memory) + list(self._disk)]
+        for path in stale:
+            self._remove(path)
+
+    def stats(self):
+        """Return hit/miss counts and the sizes of the memory and disk stores"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+            }
@@ -0,0 +1,221 @@
+import collections
+import json
+import logging
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from voice_converter import config
+
+logger = logging.getLogger(__name__)
+
+# Pipeline events of a segment, in the order they happen
+EVENTS = (
+    "onset",  # VAD detected speech
+    "close",  # Segment ended (hangover elapsed or cut)
+    "enqueue",  # Put on the conversion queue
+    "dequeue",  # Taken by a free conversion slot
+    "upload_start",  # Encoded, request about to be sent
+    "first_byte",  # First converted chunk received
+    "last_byte",  # Response complete
+    "decode_done",  # Last chunk decoded and queued for playback
+    "first_played",  # First sample handed to the output device
+    "last_played",  # Last sample handed to the output device
+)
+
+# Named intervals between two events, aggregated into histograms
+SPANS = (
+    ("capture", "onset", "close"),
+    ("queue", "enqueue", "dequeue"),
+    ("encode", "dequeue", "upload_start"),
+    ("api_first_byte", "upload_start", "first_byte"),
+    ("download", "first_byte", "last_byte"),
+    ("decode", "last_byte", "decode_done"),
+    ("playout_delay", "first_byte", "first_played"),
+    ("playback", "first_played", "last_played"),
+    ("end_to_end", "close", "first_played"),  # End of speech to first converted sample
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class SegmentTrace:
+    """time.monotonic() timestamps of one segment's way through the pipeline
+
+    Each event keeps the first time it was marked. Marking "last_played"
+    completes the trace and calls on_complete(trace), if set.
+    """
+
+    __slots__ = ("times", "on_complete", "merged")
+
+    def __init__(self):
+        self.times = {}
+        self.on_complete = None
+        self.merged = []  # Traces of segments merged into this one
+
+    def mark(self, event, when=None):
+        if event in self.times:
+            return
+        self.times[event] = time.monotonic() if when is None else when
+        for trace in self.merged:
+            trace.mark(event, self.times[event])
+        if event == "last_played" and self.on_complete is not None:
+            self.on_complete(self)
+
+    def merge(self, other):
+        """Take along the trace of a segment appended to this one
+
+        other keeps the events it already has (its own close and enqueue),
+        gets every later event of this trace and completes with it.
+        """
+        self.merged.append(other)
+
+    def span(self, start, end):
+        """Seconds from event start to event end, None if either is missing"""
+        if start in self.times and end in self.times:
+            return self.times[end] - self.times[start]
+        return None
+
+
+class LatencyTracer:
+    """Aggregates completed segment traces into latency histograms
+
+    Keeps the spans of the most recent `window` segments per span for the
+    percentiles, and optionally appends every completed trace to a JSONL
+    file (written on a background thread so the playback thread never waits
+    for the disk).
+
+    Args:
+        window: Recent segments the percentiles are computed over
+        jsonl_path: File to append completed traces to, None to disable
+    """
+
+    def __init__(self, window=config.LATENCY_WINDOW, jsonl_path=None):
+        self.spans = {name: collections.deque(maxlen=window) for name, _, _ in SPANS}
+        self.totals = {name: [0, 0.0] for name, _, _ in SPANS}  # Count and sum since start, for Prometheus
+        self.completed = 0
+        self._lock = threading.Lock()
+
+        self.jsonl_path = jsonl_path
+        self._records = None
+        if jsonl_path:
+            self._records = queue.Queue()
+            threading.Thread(target=self._write_jsonl, daemon=True).start()
+
+        self._server = None
+
+    def trace(self):
+        """Return a new trace that reports to this tracer when it completes"""
+        trace = SegmentTrace()
+        trace.on_complete = self.record
+        return trace
+
+    def record(self, trace):
+        """Add the spans of a completed trace"""
+        with self._lock:
+            self.completed += 1
+            for name, start, end in SPANS:
+                value = trace.span(start, end)
+                if value is not None:
+                    self.spans[name].append(value)
+                    self.totals[name][0] += 1
+                    self.totals[name][1] += value
+        if self._records is not None:
+            self._records.put(dict(trace.times))
+
+    def stats(self):
+        """Return per-span latency statistics in seconds
+
+        Returns:
+            dict: span name -> {"count", "mean", "p50", "p95", "p99", "max"}
+            over the recent window, for spans with at least one value
+        """
+        with self._lock:
+            spans = {name: list(values) for name, values in self.spans.items()}
+        result = {}
+        for name, values in spans.items():
+            if not values:
+                continue
+            p50, p95, p99 = np.percentile(values, [q * 100 for q in QUANTILES])
+            result[name] = {
+                "count": len(values),
+                "mean": float(np.mean(values)),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+                "max": float(max(values)),
+            }
+        return result
+
+    def prometheus_text(self):
+        """Return the histograms in the Prometheus text exposition format (summaries)"""
+        stats = self.stats()
+        with self._lock:
+            totals = {name: tuple(total) for name, total in self.totals.items()}
+        lines = [
+            "# HELP voice_converter_segment_latency_seconds Latency of the pipeline stages per segment",
+            "# TYPE voice_converter_segment_latency_seconds summary",
+        ]
+        for name, _, _ in SPANS:
+            count, total = totals[name]
+            if name in stats:
+                for quantile in QUANTILES:
+                    value = stats[name][f"p{int(quantile * 100)}"]
+                    lines.append(f'voice_converter_segment_latency_seconds{{span="{name}",quantile="{quantile}"}} '
+                                 f'{value:.6f}')
+            lines.append(f'voice_converter_segment_latency_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'voice_converter_segment_latency_seconds_count{{span="{name}"}} {count}')
+        lines.append("# TYPE voice_converter_segments_traced_total counter")
+        lines.append(f"voice_converter_segments_traced_total {self.completed}")
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port, host="127.0.0.1"):
+        """Serve prometheus_text() at http://host:port/metrics on a background thread
+
+        Returns:
+            int: The port listened on (useful with port 0)
+        """
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        """Stop the metrics endpoint"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _write_jsonl(self):
+        while True:
+            times = self._records.get()
+            # Events in seconds after the first one, which is also given as monotonic time
+            start = min(times.values())
+            record = {"monotonic": start}
+            record.update({event: round(times[event] - start, 6) for event in EVENTS if event in times})
+            try:
+                with open(self.jsonl_path, 'a') as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                logger.error("Error writing latency trace: %s", e)
@@ -0,0 +1,127 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+from voice_converter import config
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through the first `burst` records of a message per interval
+
+    Records are grouped by logger, level and unformatted message, so "Queue
+    overloaded" logged for every buffer counts as one message whatever its
+    arguments. The first record let through after a suppressed run says how
+    many were dropped.
+
+    There is no lock: the filter runs on whichever thread logs, including the
+    audio callback, and a race between two threads can only miscount.
+
+    Args:
+        interval: Seconds over which repeats are counted
+        burst: Records of one message let through per interval
+    """
+
+    def __init__(self, interval=config.LOG_REPEAT_INTERVAL, burst=config.LOG_REPEAT_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}  # key -> [window start, records in window, suppressed since last let through]
+        self.suppressed = 0
+
+    def filter(self, record):
+        if not self.interval:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            window = self._windows[key] = [now, 0, suppressed]
+        window[1] += 1
+        if window[1] > self.burst:
+            window[2] += 1
+            self.suppressed += 1
+            return False
+        if window[2]:
+            record.msg = f"{record.getMessage()} ({window[2]} similar messages suppressed)"
+            record.args = None
+            window[2] = 0
+        return True
+
+
+class RealtimeQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never takes a lock or touches a file on the logging thread
+
+    The record is formatted where it is logged (so the message cannot change
+    before it is written) and put on a queue.SimpleQueue, which does not block;
+    a QueueListener writes it out on its own thread.
+    """
+
+    def handle(self, record):
+        # logging.Handler.handle() would hold the handler lock around emit()
+        if self.filter(record):
+            self.enqueue(self.prepare(record))
+        return record
+
+    def enqueue(self, record):
+        self.queue.put_nowait(record)
+
+
+_listener = None
+_handler = None
+
+
+def setup_logging(level=None, path=None):
+    """Send the voice_converter loggers through a background writer
+
+    Log calls, including those on the audio thread, only format the record and
+    put it on a queue; a listener thread writes it to stderr and optionally a
+    file. Safe to call more than once, later calls only change the level.
+
+    Args:
+        level: Level name or number, defaults to config.LOG_LEVEL
+        path: File to append the log to as well, defaults to config.LOG_FILE
+
+    Returns:
+        logging.Logger: The package logger
+    """
+    global _listener, _handler
+    logger = logging.getLogger("voice_converter")
+    logger.setLevel(level or config.LOG_LEVEL)
+    if _listener is not None:
+        return logger
+
+    handlers = [logging.StreamHandler(sys.stderr)]
+    path = path or config.LOG_FILE
+    if path:
+        handlers.append(logging.FileHandler(path, encoding="utf-8"))
+
+    records = queue.SimpleQueue()
+    _handler = RealtimeQueueHandler(records)
+    _handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _handler.addFilter(RateLimitFilter(config.LOG_REPEAT_INTERVAL, config.LOG_REPEAT_BURST))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+    # Records arrive formatted, the listener's handlers write them as they are
+    _listener = logging.handlers.QueueListener(records, *handlers)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return logger
+
+
+def shutdown_logging():
+    """Write out the queued records and stop the background writer"""
+    global _listener, _handler
+    if _listener is not None:
+        logger = logging.getLogger("voice_converter")
+        logger.removeHandler(_handler)
+        logger.propagate = True
+        _listener.stop()
+        _listener = None
+        _handler = None
@@ -0,0 +1,28 @@
+import time
+
+class LiveMetrics:
+    """Latest pipeline values for live displays, published and read without locks
+
+    Every publisher owns a section ("input", "output", "pipeline", "latency")
+    and replaces it as a whole with a fresh dict, a single reference
+    assignment. A reader's snapshot() therefore sees each section either
+    before or after an update, never half-written, and the audio threads
+    never wait for a reader. Values are the latest ones only; nothing is
+    queued, so a slow reader simply skips updates.
+    """
+
+    def __init__(self):
+        self._sections = {}
+
+    def publish(self, section, **values):
+        """Replace a section; its time.monotonic() is stored under "time" """
+        values["time"] = time.monotonic()
+        self._sections[section] = values
+
+    def get(self, section):
+        """Return the latest values of one section, or None if never published"""
+        return self._sections.get(section)
+
+    def snapshot(self):
+        """Return section name -> values; the dicts must not be modified"""
+        return self._sections.copy()
@@ -0,0 +1,128 @@
+import collections
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Overflow policies for a full SegmentQueue
+DROP_OLDEST = "drop_oldest"  # Discard the oldest queued segment to make room
+DROP_NEWEST = "drop_newest"  # Discard the incoming segment
+BLOCK = "block"  # Wait for room (never use from the audio callback without a timeout)
+MERGE = "merge"  # Append the incoming segment to the newest queued one
+
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK, MERGE)
+
+
+class SegmentQueue:
+    """Thread-safe bounded FIFO for speech segments
+
+    Consumers block in get() and are woken through a condition variable as
+    soon as a segment is put, so no polling delay is added. The time each
+    segment spent in the queue is recorded.
+
+    Args:
+        maxsize: Maximum number of queued segments
+        policy: What to do when the queue is full, one of OVERFLOW_POLICIES
+        merge: Function combining two adjacent segments, required for MERGE
+        block_timeout: Seconds put() waits under BLOCK before dropping the
+            incoming segment, None to wait forever
+    """
+
+    def __init__(self, maxsize, policy=DROP_OLDEST, merge=None, block_timeout=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        if policy == MERGE and merge is None:
+            raise ValueError("The merge policy needs a merge function")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.merge = merge
+        self.block_timeout = block_timeout
+
+        # (segment, enqueue time) pairs
+        self._items = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        # Statistics
+        self.put_count = 0
+        self.dropped = 0
+        self.merged = 0
+        self.wait_times = collections.deque(maxlen=1000)  # Queue wait of recent segments (s)
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, segment):
+        """Add a segment, applying the overflow policy if the queue is full
+
+        Returns:
+            bool: False if the incoming segment was dropped
+        """
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                    logger.warning("Queue overloaded - discarded oldest segment")
+                elif self.policy == DROP_NEWEST:
+                    self.dropped += 1
+                    logger.warning("Queue overloaded - discarded newest segment")
+                    return False
+                elif self.policy == MERGE:
+                    previous, enqueued_at = self._items.pop()
+                    self._items.append((self.merge(previous, segment), enqueued_at))
+                    self.merged += 1
+                    self.put_count += 1
+                    self._not_empty.notify()
+                    return True
+                elif not self._not_full.wait_for(lambda: len(self._items) < self.maxsize, self.block_timeout):
+                    self.dropped += 1
+                    logger.warning("Queue overloaded - timed out waiting for room, discarded newest segment")
+                    return False
+
+            self._items.append((segment, time.monotonic()))
+            self.put_count += 1
+            self._not_empty.notify()
+            return True
+
+    def get(self, timeout=None):
+        """Remove and return the oldest segment, waiting until one is available
+
+        Returns:
+            tuple: (segment, seconds it waited in the queue), or None on timeout
+        """
+        with self._lock:
+            if not self._not_empty.wait_for(lambda: self._items, timeout):
+                return None
+            segment, enqueued_at = self._items.popleft()
+            self._not_full.notify()
+
+        wait = time.monotonic() - enqueued_at
+        self.wait_times.append(wait)
+        return segment, wait
+
+    def clear(self):
+        """Drop all queued segments"""
+        with self._lock:
+            self._items.clear()
+            self._not_full.notify_all()
+
+    def stats(self):
+        """Return queue statistics
+
+        Returns:
+            dict: Current size, segments put, dropped and merged, and the
+            average and maximum queue wait of recent segments in seconds
+        """
+        waits = list(self.wait_times)
+        return {
+            "size": len(self._items),
+            "put": self.put_count,
+            "dropped": self.dropped,
+            "merged": self.merged,
+            "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_max": max(waits) if waits else 0.0,
+        }
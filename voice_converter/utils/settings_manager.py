@@ -1,9 +1,35 @@
+import atexit
 import json
+import logging
 import os
+import threading
+import time
+
+from voice_converter import config
+
+logger = logging.getLogger(__name__)
 
 class SettingsManager:
-    def __init__(self, config_path="user_settings.json"):
+    """User settings kept in memory and written to a JSON file in the background
+    
+    set() only changes the in-memory value and notifies subscribers; the file
+    is written by a background thread once no change has come in for
+    flush_delay seconds (at the latest max_delay seconds after the first
+    unsaved change), so dragging a slider costs a few writes instead of one
+    per callback. The file is replaced atomically, so a crash leaves either
+    the old or the new settings. Call flush() before exiting.
+    
+    Args:
+        config_path: JSON file the settings are loaded from and saved to
+        flush_delay: Seconds without changes before unsaved settings are written
+        max_delay: Longest time a change stays unsaved while changes keep coming in
+    """
+    
+    def __init__(self, config_path="user_settings.json", flush_delay=config.SETTINGS_FLUSH_DELAY,
+                 max_delay=config.SETTINGS_FLUSH_MAX_DELAY):
         self.config_path = config_path
+        self.flush_delay = flush_delay
+        self.max_delay = max_delay
         self.settings = {
             "input_device": None,
             "output_device": None,
@@ -13,6 +39,15 @@ def __init__(self, config_path="user_settings.json"):
             "language_code": "en",
             "api_key": None
         }
+        self.writes = 0  # Times the file was written
+        
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # Serialises writers of the file
+        self._dirty_since = None  # time.monotonic() of the first unsaved change
+        self._last_change = 0.0
+        self._subscribers = []
+        self._flusher = None
         self.load_settings()
     
     def load_settings(self):
@@ -24,24 +59,103 @@ def load_settings(self):
                     self.settings.update(loaded_settings)
                 return True
         except Exception as e:
-            print(f"Error loading settings: {e}")
+            logger.error("Error loading settings: %s", e)
         return False
     
     def save_settings(self):
-        """Save current settings to the config file"""
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self.settings, f, indent=4)
-            return True
-        except Exception as e:
-            print(f"Error saving settings: {e}")
+        """Write the current settings to the config file now"""
+        with self._write_lock:
+            with self._lock:
+                snapshot = dict(self.settings)
+                self._dirty_since = None
+            try:
+                temp_path = self.config_path + ".tmp"
+                with open(temp_path, 'w') as f:
+                    json.dump(snapshot, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.config_path)
+                self.writes += 1
+                return True
+            except Exception as e:
+                logger.error("Error saving settings: %s", e)
+                with self._lock:
+                    # Try again after flush_delay
+                    self._last_change = time.monotonic()
+                    if self._dirty_since is None:
+                        self._dirty_since = self._last_change
         return False
     
+    def flush(self):
+        """Write unsaved changes now (call on shutdown)
+        
+        Returns:
+            bool: False if unsaved changes could not be written
+        """
+        with self._lock:
+            if self._dirty_since is None:
+                return True
+        return self.save_settings()
+    
     def get(self, key, default=None):
         """Get a setting value"""
         return self.settings.get(key, default)
     
     def set(self, key, value):
-        """Set a setting value and save"""
-        self.settings[key] = value
-        return self.save_settings() 
\ No newline at end of file
+        """Set a setting value, notify subscribers and schedule saving it
+        
+        Returns:
+            bool: True if the value changed
+        """
+        with self._lock:
+            if key in self.settings and self.settings[key] == value:
+                return False
+            self.settings[key] = value
+            self._last_change = time.monotonic()
+            if self._dirty_since is None:
+                self._dirty_since = self._last_change
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_when_idle, daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+            self._changed.notify()
+        
+        for callback in list(self._subscribers):
+            try:
+                callback(key, value)
+            except Exception as e:
+                logger.error("Error in settings subscriber: %s", e)
+        return True
+    
+    def subscribe(self, callback):
+        """Call callback(key, value) after every change, on the thread that made it"""
+        self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _flush_when_idle(self):
+        """Background thread: save once changes have stopped for flush_delay seconds"""
+        while True:
+            with self._lock:
+                while self._dirty_since is None:
+                    self._changed.wait()
+                # Wait for the burst of changes to end, but not longer than max_delay
+                while self._dirty_since is not None:
+                    due = min(self._last_change + self.flush_delay, self._dirty_since + self.max_delay)
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+                if self._dirty_since is None:
+                    continue  # flush() got there first
+            self.save_settings()
+
+
+def load_api_key(api_key=None):
+    """Return api_key if given, else $ELEVENLABS_API_KEY, else the key saved in the settings
+    
+    Used by the command line tools, which run without the Settings tab.
+    """
+    return api_key or os.environ.get("ELEVENLABS_API_KEY") or SettingsManager().get("api_key")
@@ -1,8 +1,37 @@
-import time
+import logging
+import queue
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from voice_converter import config
+from voice_converter.api.elevenlabs_client import ConversionError
+from voice_converter.audio.segment_buffer import SegmentBuffer, merge_segments
+from voice_converter.utils.latency import LatencyTracer
+from voice_converter.utils.metrics import LiveMetrics
+from voice_converter.utils.segment_queue import SegmentQueue
+
+logger = logging.getLogger(__name__)
+
+
+class _ConversionJob:
+    """A segment on its way through the API and the converted chunks received so far"""
+    
+    def __init__(self, seq, segment, stop_event, queue_wait=0.0, in_flight=None):
+        self.seq = seq
+        self.segment = segment
+        self.stop_event = stop_event
+        # Semaphore the job's conversion slot was taken from; start_processing()
+        # replaces the converter's, so the slot is given back to this one
+        self.in_flight = in_flight
+        self.queue_wait = queue_wait  # Seconds the segment waited for a conversion slot
+        # Past this time.monotonic() the segment is dropped instead of sent or retried
+        self.deadline = time.monotonic() - queue_wait + config.SEGMENT_DEADLINE
+        self.chunks = queue.Queue()  # bytes, an exception, or None when finished
+
 
 class VoiceConverter:
-    def __init__(self, audio_manager, api_client, settings_manager=None):
+    def __init__(self, audio_manager, api_client, settings_manager=None, max_in_flight=None, latency=None):
         self.audio_manager = audio_manager
         self.api_client = api_client
         self.settings_manager = settings_manager
@@ -11,122 +40,237 @@ def __init__(self, audio_manager, api_client, settings_manager=None):
         self.voice_id = None
         self.language_code = "en"
         self.silence_threshold = 200
+        overflow_policy = config.QUEUE_OVERFLOW_POLICY
         
         if settings_manager:
             self.voice_id = settings_manager.get("voice_id")
             self.language_code = settings_manager.get("language_code", "en")
             self.silence_threshold = settings_manager.get("silence_threshold", 200)
+            overflow_policy = settings_manager.get("queue_overflow_policy", overflow_policy)
+        
+        # Number of segments that may be converted by the API at the same time
+        self.max_in_flight = max_in_flight or config.MAX_IN_FLIGHT_CONVERSIONS
         
         # Audio processing state
         self.running = False
-        self.audio_queue = []
+        self.audio_queue = SegmentQueue(
+            config.AUDIO_QUEUE_SIZE,
+            policy=overflow_policy,
+            merge=merge_segments,
+            block_timeout=config.QUEUE_BLOCK_TIMEOUT
+        )
         self.processing_thread = None
+        self.playback_thread = None
         self.status_callback = None  # Callback für Statusmeldungen an die GUI
+        
+        # Per-segment timestamps from speech onset to playback, aggregated by the tracer
+        self.latency = latency or LatencyTracer(jsonl_path=config.LATENCY_TRACE_PATH)
+        
+        # Queue depth, conversions in flight and latency percentiles for live displays,
+        # next to the audio manager's levels (other audio sinks, e.g. server sessions, have none)
+        self.live_metrics = getattr(audio_manager, "live_metrics", None) or LiveMetrics()
+        self._converting = set()  # Jobs waiting for the API (sequence numbers, or tasks in the async pipeline)
+        
+        # Conversion pipeline state
+        self._executor = None
+        self._in_flight = None
+        self._jobs = None  # Jobs in recording order, consumed by the playback thread
+        self._stop_event = None
+        self._sequence = 0
     
     def start_processing(self):
-        """Start the speech processing thread"""
+        """Start the conversion pipeline threads"""
         if not self.running:
             self.running = True
-            self.audio_queue = []  # Clear any pending audio
+            self.audio_queue.clear()  # Clear any pending audio
+            
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+            self._in_flight = threading.Semaphore(self.max_in_flight)
+            self._jobs = queue.Queue()
+            self._stop_event = threading.Event()
+            
             self.processing_thread = threading.Thread(target=self.process_audio_queue)
             self.processing_thread.daemon = True
             self.processing_thread.start()
+            
+            self.playback_thread = threading.Thread(target=self._play_in_order, args=(self._jobs,))
+            self.playback_thread.daemon = True
+            self.playback_thread.start()
     
     def stop_processing(self):
-        """Stop the speech processing thread"""
+        """Stop the conversion pipeline and cancel running conversions"""
         self.running = False
-        if self.processing_thread:
-            self.processing_thread.join(timeout=1.0)
-            self.processing_thread = None
+        if self._stop_event:
+            self._stop_event.set()
+        if self._jobs:
+            self._jobs.put(None)
+        
+        for thread in (self.processing_thread, self.playback_thread):
+            if thread:
+                thread.join(timeout=1.0)
+        self.processing_thread = None
+        self.playback_thread = None
+        
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
     
-    def add_audio_to_queue(self, frames):
-        """Add audio frames to the processing queue
+    def add_audio_to_queue(self, segment):
+        """Add a speech segment to the processing queue
         
         Args:
-            frames: Either a single audio frame or a list of frames
+            segment: A SegmentBuffer, a single audio frame or a list of frames
         """
         if not self.running:
             return
         
-        # Limit queue size to maximum 3 elements
-        # If queue becomes too large, discard oldest elements
-        MAX_QUEUE_SIZE = 3
-        
-        if len(self.audio_queue) >= MAX_QUEUE_SIZE:
-            # Remove oldest element
-            old_frames = self.audio_queue.pop(0)
-            print(f"Queue overloaded - discarded oldest audio ({len(old_frames)} frames)")
+        if not isinstance(segment, SegmentBuffer):
+            # Raw frames are copied into a segment once here
+            frames = segment if isinstance(segment, list) else [segment]
+            segment = SegmentBuffer.from_frames(frames)
         
-        if isinstance(frames, list):
-            # If we got a list of frames, process them as a single speech segment
-            self.audio_queue.append(frames)
+        if segment.trace is None:
+            segment.trace = self.latency.trace()
+            segment.trace.mark("close")
         else:
-            # If we got a single frame, add it directly
-            self.audio_queue.append([frames])
+            segment.trace.on_complete = self.latency.record
+        segment.trace.mark("enqueue")
         
-        print(f"Audio data added to queue (size: {len(self.audio_queue)})")
+        # Segments only pile up here while all conversion slots are busy,
+        # the queue applies its overflow policy when it is full
+        if self.audio_queue.put(segment):
+            logger.debug("Audio data added to queue (size: %d)", len(self.audio_queue))
+        self._publish_pipeline()
     
     def process_audio_queue(self):
+        """Send queued segments to the API, keeping up to max_in_flight conversions running"""
+        in_flight = self._in_flight
         while self.running:
-            if len(self.audio_queue) > 0:
-                try:
-                    # Get the oldest audio in the queue
-                    frames = self.audio_queue.pop(0)
-                    
-                    # Convert the raw audio frames to a wav file in memory
-                    audio_data = self.audio_manager.record_to_file(frames)
-                    
-                    print(f"Processing audio segment ({len(frames)} frames)")
-                    
-                    # Send to API for conversion
-                    result = self.api_client.convert_speech(
-                        audio_data=audio_data,
-                        voice_id=self.voice_id,
-                        language_code=self.language_code
-                    )
-                    
-                    # Überprüfen, ob ein Fehler zurückgegeben wurde
-                    if isinstance(result, tuple) and len(result) == 2:
-                        audio_data, error_info = result
-                        
-                        if error_info and "type" in error_info:
-                            # Fehlermeldung an UI senden
-                            if hasattr(self, 'status_callback') and self.status_callback:
-                                self.status_callback(error_info["message"])
-                            
-                            # Je nach Fehlertyp unterschiedlich reagieren
-                            if error_info["type"] == "quota_exceeded":
-                                print(f"QUOTA EXCEEDED: {error_info['message']}")
-                                # Optional: Pause recording until user responds
-                            else:
-                                print(f"API ERROR: {error_info['message']}")
-                                
-                            # Output details to console
-                            print(f"Error details: {error_info['details']}")
-                            continue
-                    else:
-                        # Frühere API-Antwort ohne Fehlerinfos
-                        audio_data = result
-                    
-                    if audio_data:
-                        print("Received converted audio, playing...")
-                        # Play the converted audio through the audio manager
-                        self.audio_manager.play_audio(audio_data)
-                    else:
-                        print("Warning: Received empty audio data from API")
-                        
-                except Exception as e:
-                    print(f"Error in speech conversion: {e}")
+            # Wait for a free conversion slot before taking the next segment
+            if not in_flight.acquire(timeout=0.1):
+                continue
+            
+            # Block until a segment arrives; the timeout only lets us notice a stop
+            entry = self.audio_queue.get(timeout=0.1)
+            if entry is None:
+                in_flight.release()
+                continue
+            segment, queue_wait = entry
+            segment.trace.mark("dequeue")
+            
+            self._sequence += 1
+            job = _ConversionJob(self._sequence, segment, self._stop_event, queue_wait, in_flight)
+            self._converting.add(job.seq)
+            self._publish_pipeline()
+            self._jobs.put(job)
+            self._executor.submit(self._run_conversion, job)
+    
+    def _run_conversion(self, job):
+        """Convert one segment on a pool thread, collecting the chunks on the job"""
+        try:
+            # Wrap the segment as an in-memory upload file
+            audio_data = self.audio_manager.record_to_file(job.segment)
+            trace = job.segment.trace
+            trace.mark("upload_start")
+            
+            logger.debug("Processing audio segment #%d (%.2f s, queued %.0f ms)",
+                         job.seq, job.segment.duration, job.queue_wait * 1000)
+            
+            chunks = self.api_client.convert_speech_stream(
+                audio_data=audio_data,
+                voice_id=self.voice_id,
+                language_code=self.language_code,
+                output_format=config.STREAM_OUTPUT_FORMAT,
+                deadline=job.deadline
+            )
+            for chunk in chunks:
+                if job.stop_event.is_set():
+                    chunks.close()
+                    break
+                trace.mark("first_byte")
+                job.chunks.put(chunk)
             else:
-                # Sleep briefly when queue is empty to reduce CPU usage
-                time.sleep(0.1)
+                trace.mark("last_byte")
+        except Exception as e:
+            job.chunks.put(e)
+        finally:
+            job.chunks.put(None)
+            self._converting.discard(job.seq)
+            self._publish_pipeline()
+            job.in_flight.release()
+    
+    def _play_in_order(self, jobs):
+        """Play converted segments in recording order
+        
+        Later segments keep converting in the background while an earlier
+        one is still streaming, and are played as soon as it is done.
+        """
+        while True:
+            job = jobs.get()
+            if job is None or job.stop_event.is_set():
+                break
+            
+            try:
+                # Stream the converted audio to the speakers as it arrives
+                if not self.audio_manager.play_audio_stream(self._job_chunks(job), trace=job.segment.trace):
+                    logger.warning("Received empty audio data from API (segment #%d)", job.seq)
+            except ConversionError as e:
+                self._report_error(e.error_info)
+            except Exception as e:
+                logger.error("Error in speech conversion: %s", e)
+            self._publish_latency()
+    
+    def _job_chunks(self, job):
+        """Yield a job's converted chunks as they arrive, re-raising conversion errors"""
+        while True:
+            item = job.chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    
+    def _publish_pipeline(self):
+        """Publish queue depth and conversions in flight for live displays"""
+        self.live_metrics.publish(
+            "pipeline",
+            queued=len(self.audio_queue),
+            converting=len(self._converting),
+            max_in_flight=self.max_in_flight,
+            dropped=self.audio_queue.dropped,
+        )
+    
+    def _publish_latency(self):
+        """Publish p50/p95 per pipeline stage after a segment was played (not on the audio thread)"""
+        stats = self.latency.stats()
+        self.live_metrics.publish(
+            "latency",
+            spans={name: (values["p50"], values["p95"]) for name, values in stats.items()},
+            segments=self.latency.completed,
+        )
+    
+    def _report_error(self, error_info):
+        """Forward an API error to the UI and the console"""
+        # Fehlermeldung an UI senden
+        if self.status_callback:
+            self.status_callback(error_info["message"])
+        
+        # Je nach Fehlertyp unterschiedlich reagieren
+        if error_info["type"] == "quota_exceeded":
+            logger.error("QUOTA EXCEEDED: %s", error_info['message'])
+            # Optional: Pause recording until user responds
+        else:
+            logger.error("API ERROR: %s", error_info['message'])
+        
+        # Output details to the log
+        logger.debug("Error details: %s", error_info['details'])
     
     def convert_speech(self, frames):
         try:
             # Convert frames to WAV format in memory
             wav_data = self.audio_manager.record_to_file(frames)
             
-            print("Converting speech...")
+            logger.debug("Converting speech...")
             # Use the API client to convert speech
             audio_data = self.api_client.convert_speech(
                 audio_data=wav_data, 
@@ -138,10 +282,10 @@ def convert_speech(self, frames):
                 # Play the converted audio through the audio manager
                 self.audio_manager.play_audio(audio_data)
             else:
-                print("Warning: Received empty audio data from API")
+                logger.warning("Received empty audio data from API")
                 
         except Exception as e:
-            print(f"Error in speech conversion: {e}")
+            logger.error("Error in speech conversion: %s", e)
     
     def on_threshold_change(self, threshold):
         """Set the silence threshold"""
@@ -165,9 +309,9 @@ def set_voice(self, voice_id):
             # Save to settings if available
             if self.settings_manager:
                 self.settings_manager.set("voice_id", self.voice_id)
-            print(f"Voice set to: {voice_id}")
+            logger.info("Voice set to: %s", voice_id)
         else:
-            print("Warning: Attempted to set empty voice ID")
+            logger.warning("Attempted to set empty voice ID")
 
     def start_recording(self):
         """Start recording and processing"""
@@ -180,10 +324,10 @@ def start_recording(self):
         if not result:
             # If audio capture failed, stop processing too
             self.stop_processing()
-            print("Failed to start recording")
+            logger.error("Failed to start recording")
             return False
         
-        print("Recording and processing started")
+        logger.info("Recording and processing started")
         return True
 
     def stop_recording(self):
@@ -194,9 +338,27 @@ def stop_recording(self):
         # Stop processing
         self.stop_processing()
         
-        print("Recording and processing stopped")
+        logger.info("Recording and processing stopped")
         return True
 
+    def get_queue_stats(self):
+        """Return segment queue statistics (size, drops, merges, queue wait times)"""
+        return self.audio_queue.stats()
+
+    def get_api_stats(self):
+        """Return request, retry, dropped-segment and credit counters of the API scheduler"""
+        scheduler = getattr(self.api_client, "scheduler", None)
+        return scheduler.stats() if scheduler is not None else None
+
+    def get_latency_stats(self):
+        """Return per-stage latency percentiles of recent segments (see LatencyTracer.stats())"""
+        return self.latency.stats()
+
+    def get_cache_stats(self):
+        """Return conversion cache statistics (hits, misses, sizes), None without a cache"""
+        cache = getattr(self.api_client, "cache", None)
+        return cache.stats() if cache is not None else None
+
     def set_status_callback(self, callback):
         """Set a callback function that will be called with status messages"""
         self.status_callback = callback 
\ No newline at end of file